@@ -0,0 +1,340 @@
+"""
+Reproducible benchmarks for the board and the search, with results as JSON.
+
+Three suites:
+    perft    leaf counts of the full move tree to a fixed depth, on both board backends, from the start
+             positions, fixed game positions and board4by4nearEnd.json. The counts are a correctness
+             check as much as a timing: they must match the known 8x8 values, each other across
+             backends, and the baseline
+    micro    microseconds per call of calc_valid_moves, make_move + undo_move, calc_scores, deepcopy
+             and snapshot on a fixed midgame position
+    search   nodes, time and nodes per second of one get_move for each MinimaxPlayerG3 factory on
+             fixed positions
+
+Every position is a fixed move list from the start, so runs on different code compare like with like.
+Every time is the median of several repeats, each measured against a fixed calibration loop of plain
+Python timed just before and after it, and runs are compared in those calibration units, so a slower
+or busier machine than the baseline's doesn't make everything look slower.
+
+    python -m reversi.benchmark run --output results.json
+    python -m reversi.benchmark compare results.json
+
+compare checks results against the baseline (benchmark_baseline.json next to this file by default):
+any perft count that differs is an error, and makes the exit status 1. A calibrated time more than
+--tolerance slower (and slower by more than the NOISE floor) is reported as a warning, and only
+counts as a failure with --strict. run --baseline does both in one go, and run --save-baseline writes
+the new baseline.
+"""
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from reversi.player3 import all_players
+from reversi.reversi_board import ReversiBoard
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+NEAR_END_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'board4by4nearEnd.json')
+TOLERANCE = 0.25  # a calibrated time more than this fraction over the baseline is slower
+NOISE = {'perft': 0.01, 'micro': 0.2, 'search': 0.002}  # ...unless it's only this much slower (s, us, s)
+REPEATS = 3  # perft times are the median of this many samples, the others of 2 * REPEATS + 1
+
+# perft from the 8x8 start position, by depth
+KNOWN_PERFT = [1, 4, 12, 56, 244, 1396, 8200, 55092, 390216]
+
+# one random game, X first (there are no passes in it); positions are prefixes of it
+GAME = [(2, 4), (4, 5), (5, 5), (2, 3), (2, 2), (1, 4), (4, 6), (3, 2), (0, 4), (3, 5), (4, 1), (1, 2), (0, 1),
+        (1, 3), (5, 4), (2, 1), (3, 0), (0, 5), (2, 6), (0, 2), (3, 1), (0, 0), (2, 5), (5, 7), (0, 3), (2, 0),
+        (1, 0), (1, 5), (4, 7), (3, 7), (3, 6), (6, 4), (6, 5), (5, 2), (6, 1), (1, 1), (1, 6), (5, 6), (6, 3),
+        (2, 7), (0, 6), (5, 0), (5, 3), (0, 7)]
+POSITIONS = {'start': 0, 'midgame': 20, 'endgame': 44}  # plies of GAME played, X to move in each
+
+# (name, board size or file, plies of GAME, depth, quick depth)
+PERFT_CASES = [
+    ('start 8x8', 8, 0, 7, 5),
+    ('start 6x6', 6, 0, 7, 5),
+    ('midgame 8x8', 8, 20, 4, 3),
+    ('endgame 8x8', 8, 44, 5, 4),
+    ('4x4 near end', NEAR_END_FILE, 0, 10, 10),
+]
+SEARCH_PLAYERS = ['get_default_player', 'get_player_a', 'get_player_b', 'get_player_c', 'get_player_d',
+                  'get_combined_player']
+
+
+def make_board(source, plies=0, bitboard=True):
+    # source is a board size or a JSON board file; plies moves of GAME are played on it, X first
+    if isinstance(source, int):
+        board = ReversiBoard(source, bitboard=bitboard)
+    else:
+        board = ReversiBoard(board_filename=source, bitboard=bitboard)
+    symbol = 'X'
+    for move in GAME[:plies]:
+        board.make_move(symbol, move)
+        symbol = board.get_opponent_symbol(symbol)
+    return board
+
+
+def perft(board, symbol, depth):
+    """
+    :returns: the number of leaves of the move tree depth plies deep; a pass is a ply, and a
+        finished game is a leaf wherever it happens
+    """
+    if depth == 0:
+        return 1
+    moves = board.generate_moves(symbol)
+    opponent = board.get_opponent_symbol(symbol)
+    if not moves:
+        if not board.calc_valid_moves(opponent):
+            return 1
+        return perft(board, opponent, depth - 1)
+    if depth == 1:
+        return len(moves)
+    leaves = 0
+    for move in moves:
+        board.make_move(symbol, move)
+        leaves += perft(board, opponent, depth - 1)
+        board.undo_move()
+    return leaves
+
+
+def run_perft(quick=False):
+    results = []
+    for name, source, plies, depth, quick_depth in PERFT_CASES:
+        if quick:
+            depth = quick_depth
+        for bitboard in (True, False):
+            board = make_board(source, plies, bitboard)
+            seconds, relative, leaves = _timed(lambda: perft(board, 'X', depth), 1 if quick else REPEATS)
+            results.append({'name': name, 'backend': 'bitboard' if bitboard else 'list', 'depth': depth,
+                            'leaves': leaves, 'seconds': seconds, 'relative': relative,
+                            'leaves_per_second': leaves / seconds})
+    return results
+
+
+def check_perft(results):
+    """
+    :returns: a list of problems: counts that disagree with KNOWN_PERFT or between the backends
+    """
+    problems = []
+    counts = {}
+    for result in results:
+        if result['name'] == 'start 8x8' and result['depth'] < len(KNOWN_PERFT) and \
+                result['leaves'] != KNOWN_PERFT[result['depth']]:
+            problems.append("perft %s (%s) depth %d: %d leaves, expected %d" % (
+                result['name'], result['backend'], result['depth'], result['leaves'], KNOWN_PERFT[result['depth']]))
+        key = (result['name'], result['depth'])
+        if counts.setdefault(key, result['leaves']) != result['leaves']:
+            problems.append("perft %s depth %d: the backends disagree (%d and %d leaves)" % (
+                result['name'], result['depth'], counts[key], result['leaves']))
+    return problems
+
+
+def _calibration_loop():
+    # plain interpreter work of the kind the board does: small int arithmetic, bit operations, a dict
+    table = {}
+    total = 0
+    for i in range(5000):
+        total = (total + (i & 7) * 3) & 0xffffff
+        table[i & 255] = total >> 2
+    return total
+
+
+def _calibration_time():
+    # the best of three, since this should measure the machine's speed rather than its hiccups
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        _calibration_loop()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _timed(function, repeats, number=1):
+    """
+    Times repeats samples of number calls each, with the calibration loop timed just before and after
+    every sample, so a sample taken while the machine was slow is measured against a slow loop too.
+    :returns: (median seconds per call, median time per call in calibration loops, last result)
+    """
+    seconds = []
+    relative = []
+    for _ in range(repeats):
+        before = _calibration_time()
+        start = time.perf_counter()
+        for _ in range(number):
+            result = function()
+        elapsed = (time.perf_counter() - start) / number
+        calibration = (before + _calibration_time()) / 2
+        seconds.append(elapsed)
+        relative.append(elapsed / calibration)
+    return statistics.median(seconds), statistics.median(relative), result
+
+
+def run_micro(quick=False):
+    number = 200 if quick else 2000
+    repeats = 3 if quick else 2 * REPEATS + 1
+    results = []
+    for bitboard in (True, False):
+        board = make_board(8, POSITIONS['midgame'], bitboard)
+        move = board.calc_valid_moves('X')[0]
+
+        def make_and_undo():
+            board.make_move('X', move)
+            board.undo_move()
+
+        def valid_moves():
+            board._move_masks.clear()  # time generating the moves, not the bitboard backend's cache
+            board.calc_valid_moves('X')
+
+        timings = {
+            'make_move+undo_move': _timed(make_and_undo, repeats, number),
+            'calc_valid_moves': _timed(valid_moves, repeats, number),
+            'calc_scores': _timed(board.calc_scores, repeats, number * 10),
+            'deepcopy': _timed(lambda: copy.deepcopy(board), repeats, number),
+            'snapshot': _timed(board.snapshot, repeats, number * 10),
+        }
+        for name, (seconds, relative, _) in timings.items():
+            results.append({'name': name, 'backend': 'bitboard' if bitboard else 'list',
+                            'microseconds': seconds * 1e6, 'relative': relative})
+    return results
+
+
+def run_search(quick=False):
+    # each run with a new board and player, so none of them starts with a filled table
+    results = []
+    positions = ['midgame'] if quick else list(POSITIONS)
+    for factory in SEARCH_PLAYERS:
+        for position in positions:
+            players = []
+
+            def search():
+                board = make_board(8, POSITIONS[position])
+                players.append(getattr(all_players, factory)('X'))
+                return players[-1].get_move(board)
+
+            seconds, relative, move = _timed(search, 1 if quick else 2 * REPEATS + 1)
+            nodes = players[-1].nodes
+            results.append({'player': factory, 'position': position, 'move': list(move), 'nodes': nodes,
+                            'seconds': seconds, 'relative': relative, 'nodes_per_second': nodes / seconds})
+    return results
+
+
+def run(suites=('perft', 'micro', 'search'), quick=False, verbose=True):
+    """
+    :returns: the results as saved to JSON
+    """
+    results = {'meta': {'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                        'python': platform.python_version(), 'platform': platform.platform(), 'quick': quick}}
+    for suite in suites:
+        start = time.perf_counter()
+        results[suite] = {'perft': run_perft, 'micro': run_micro, 'search': run_search}[suite](quick)
+        if verbose:
+            print("%s: %.1f s" % (suite, time.perf_counter() - start))
+    return results
+
+
+def _keyed(results):
+    # {(suite, identifying fields): result}
+    keyed = {}
+    for result in results.get('perft', []):
+        keyed[('perft', result['name'], result['backend'], result['depth'])] = result
+    for result in results.get('micro', []):
+        keyed[('micro', result['name'], result['backend'])] = result
+    for result in results.get('search', []):
+        keyed[('search', result['player'], result['position'])] = result
+    return keyed
+
+
+def compare(results, baseline, tolerance=TOLERANCE, strict=False):
+    """
+    Times are compared in calibration loops (see _timed), so a machine that is slower or busier
+    than the baseline's doesn't make everything look slower.
+    :returns: (lines to report, number of failures: perft errors, and slower times if strict)
+    """
+    lines = []
+    failures = 0
+    for problem in check_perft(results.get('perft', [])):
+        lines.append("ERROR " + problem)
+        failures += 1
+    old = _keyed(baseline)
+    for key, result in sorted(_keyed(results).items()):
+        before = old.get(key)
+        label = " ".join(str(part) for part in key)
+        if before is None:
+            lines.append("new        %s" % label)
+            continue
+        if key[0] == 'perft' and result['leaves'] != before['leaves']:
+            lines.append("ERROR      %s: %d leaves, baseline %d" % (label, result['leaves'], before['leaves']))
+            failures += 1
+        if key[0] == 'search' and (result['move'] != before['move'] or result['nodes'] != before['nodes']):
+            # not an error: a change to the search can rightly change both
+            lines.append("changed    %s: move %s nodes %d, baseline move %s nodes %d" % (
+                label, result['move'], result['nodes'], before['move'], before['nodes']))
+        field = {'perft': 'seconds', 'micro': 'microseconds', 'search': 'seconds'}[key[0]]
+        ratio = result['relative'] / before['relative'] if before['relative'] > 0 else 1.0
+        scaled = before[field] * ratio  # what it would have taken on the baseline's machine
+        status = "ok"
+        if ratio > 1 + tolerance and scaled - before[field] > NOISE[key[0]]:
+            if strict:
+                status = "SLOWER"
+                failures += 1
+            else:
+                status = "slower?"
+        elif ratio < 1 / (1 + tolerance):
+            status = "faster"
+        lines.append("%-10s %s: %.4g %s (%.4g scaled), baseline %.4g (%+.0f%%)" % (
+            status, label, result[field], field, scaled, before[field], 100 * (ratio - 1)))
+    return lines, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the board and the search.")
+    subparsers = parser.add_subparsers(dest="command")
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("--output", default=None, help="JSON file for the results")
+    run_parser.add_argument("--suites", nargs="+", choices=["perft", "micro", "search"],
+                            default=["perft", "micro", "search"])
+    run_parser.add_argument("--quick", action="store_true", help="shallower perft, fewer repeats and positions")
+    run_parser.add_argument("--baseline", nargs="?", const=BASELINE_FILE, default=None,
+                            help="compare with this baseline (default: the stored one)")
+    run_parser.add_argument("--save-baseline", action="store_true", help="write the results as the stored baseline")
+    run_parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    run_parser.add_argument("--strict", action="store_true", help="fail on slower times too, not only perft errors")
+    compare_parser = subparsers.add_parser("compare")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("baseline", nargs="?", default=BASELINE_FILE)
+    compare_parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    compare_parser.add_argument("--strict", action="store_true", help="fail on slower times too, not only perft errors")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args.suites, args.quick)
+        problems = check_perft(results.get('perft', []))
+        for problem in problems:
+            print("ERROR", problem)
+        for path in ([args.output] if args.output else []) + ([BASELINE_FILE] if args.save_baseline else []):
+            with open(path, "w") as f:
+                json.dump(results, f, indent=1)
+        if args.baseline is not None:
+            with open(args.baseline) as f:
+                lines, failures = compare(results, json.load(f), args.tolerance, args.strict)
+            print("\n".join(lines))
+            sys.exit(1 if failures else 0)
+        sys.exit(1 if problems else 0)
+    elif args.command == "compare":
+        with open(args.results) as f:
+            results = json.load(f)
+        with open(args.baseline) as f:
+            lines, failures = compare(results, json.load(f), args.tolerance, args.strict)
+        print("\n".join(lines))
+        sys.exit(1 if failures else 0)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Bitboard move generation for reversi.
+
+A position is two ints, one per player, with the square (x, y) stored at bit x*size + y.
+For 8x8 these are plain 64-bit masks; other sizes just use wider Python ints.
+"""
+
+
+class Geometry:
+    # Precomputed masks and shift amounts for one board size.
+
+    def __init__(self, size):
+        self.size = size
+        self.full = (1 << (size * size)) - 1
+        first_col = 0
+        last_col = 0
+        for x in range(size):
+            first_col |= 1 << (x * size)
+            last_col |= 1 << (x * size + size - 1)
+        not_first_col = self.full & ~first_col
+        not_last_col = self.full & ~last_col
+        # (shift, mask) for each of the 8 directions. A positive shift moves bits to higher
+        # squares; the mask clears squares that were reached by wrapping around a row.
+        self.directions = []
+        for dx, dy in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
+            shift = dx * size + dy
+            if dy == 1:
+                mask = not_first_col
+            elif dy == -1:
+                mask = not_last_col
+            else:
+                mask = self.full
+            self.directions.append((shift, mask))
+        self.square_bits = [1 << sq for sq in range(size * size)]
+        # rays[square] lists (ray mask, increasing) for every direction that leaves the square
+        # with at least two squares on the board (fewer can never flip anything)
+        self.rays = []
+        for x in range(size):
+            for y in range(size):
+                square_rays = []
+                for dx, dy in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
+                    ray = 0
+                    rx, ry = x + dx, y + dy
+                    while 0 <= rx < size and 0 <= ry < size:
+                        ray |= 1 << (rx * size + ry)
+                        rx += dx
+                        ry += dy
+                    if bin(ray).count("1") >= 2:
+                        square_rays.append((ray, dx * size + dy > 0))
+                self.rays.append(square_rays)
+
+
+_geometries = {}
+
+
+def get_geometry(size):
+    geometry = _geometries.get(size)
+    if geometry is None:
+        geometry = Geometry(size)
+        _geometries[size] = geometry
+    return geometry
+
+
+def _shift(bits, shift, mask):
+    if shift > 0:
+        return (bits << shift) & mask
+    return (bits >> -shift) & mask
+
+
+def valid_moves_mask(own, opp, geometry):
+    # Returns a mask of every empty square where `own` can play.
+    empty = geometry.full & ~(own | opp)
+    moves = 0
+    steps = max(geometry.size - 3, 0)
+    for shift, mask in geometry.directions:
+        if shift > 0:
+            run = (own << shift) & mask & opp
+            for _ in range(steps):
+                run |= (run << shift) & mask & opp
+            moves |= (run << shift) & mask & empty
+        else:
+            shift = -shift
+            run = (own >> shift) & mask & opp
+            for _ in range(steps):
+                run |= (run >> shift) & mask & opp
+            moves |= (run >> shift) & mask & empty
+    return moves
+
+
+def flip_mask(own, opp, square, geometry):
+    # Returns the mask of discs flipped if `own` plays at square (0 if nothing flips).
+    # Along each ray the first square that isn't an opponent disc must be ours; everything
+    # on the ray before it flips.
+    flips = 0
+    for ray, increasing in geometry.rays[square]:
+        blockers = ray & ~opp
+        if not blockers:
+            continue
+        if increasing:
+            first = blockers & -blockers
+            if first & own:
+                flips |= ray & (first - 1)
+        else:
+            first = 1 << (blockers.bit_length() - 1)
+            if first & own:
+                flips |= ray & ~((first << 1) - 1)
+    return flips
+
+
+def popcount(bits):
+    return bin(bits).count("1")
+
+
+if hasattr(int, "bit_count"):  # Python 3.10+, the same count without building a string
+    popcount = int.bit_count
+
+
+def iter_squares(bits):
+    # Yields square indices of the set bits, lowest first.
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def square_to_position(square, size):
+    return [square // size, square % size]
+
+
+def position_to_square(position, size):
+    return position[0] * size + position[1]
@@ -0,0 +1,331 @@
+"""
+Exact endgame solver.
+
+Searches to the end of the game on raw bitboards (see reversi/bitboard.py) and returns the exact
+final disc difference (own discs minus opponent discs) for the side to move. It uses
+ - fastest-first ordering (fewest opponent replies first) while many squares are empty,
+ - parity ordering (squares in regions with an odd number of empties first) near the end,
+ - a stable-disc upper bound to cut nodes that can't reach alpha,
+ - special cases for the last three empties that skip move generation.
+
+    python -m reversi.endgame --empties 20 --positions 5
+benchmarks it on random positions with 20 empty squares.
+"""
+import argparse
+import random
+import time
+
+from reversi import bitboard as bitboard_ops
+from reversi.reversi_board import ReversiBoard
+from reversi.transposition_table import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+INFINITY = 10000
+FASTEST_FIRST_EMPTIES = 5  # use fastest-first ordering above this many empties, parity below
+STABILITY_EMPTIES = 6  # only look for stable discs above this many empties
+SMALL_EMPTIES = 3  # the last few empties are solved without move generation
+TABLE_EMPTIES = 6  # positions with at least this many empties go in the transposition table
+
+popcount = bitboard_ops.popcount
+
+
+class SolveTimeout(Exception):
+    # raised when the solver's deadline passes mid-solve
+    pass
+
+
+class EndgameSolver:
+
+    def __init__(self, size=8, table_size=2 ** 16):
+        self.size = size
+        self.table = TranspositionTable(table_size)
+        self.deadline = None  # time.perf_counter() value to give up at, checked every 1024 nodes
+        self.geometry = bitboard_ops.get_geometry(size)
+        self.nodes = 0
+        full = self.geometry.full
+        directions = self.geometry.directions
+        # squares with no neighbour in direction i
+        self.edges = [full & ~bitboard_ops._shift(full, *directions[(i + 4) % 8]) for i in range(8)]
+        # every line of the board, grouped by axis (the axis of direction i and i + 4)
+        self.lines = [[], [], [], []]
+        for x in range(size):
+            for y in range(size):
+                for axis, (dx, dy) in enumerate([(0, 1), (1, 1), (1, 0), (1, -1)]):
+                    if 0 <= x - dx < size and 0 <= y - dy < size:
+                        continue  # not the start of a line
+                    line = 0
+                    lx, ly = x, y
+                    while 0 <= lx < size and 0 <= ly < size:
+                        line |= 1 << (lx * size + ly)
+                        lx += dx
+                        ly += dy
+                    self.lines[axis].append(line)
+        # parity regions: the four quadrants
+        half = (size + 1) // 2
+        self.regions = []
+        for qx in (range(0, half), range(half, size)):
+            for qy in (range(0, half), range(half, size)):
+                region = 0
+                for x in qx:
+                    for y in qy:
+                        region |= 1 << (x * size + y)
+                self.regions.append(region)
+        corners = [0, size - 1, (size - 1) * size, size * size - 1]
+        self.corners = 0
+        for corner in corners:
+            self.corners |= 1 << corner
+
+    def solve_board(self, board, symbol, alpha=-INFINITY, beta=INFINITY):
+        # exact final disc difference for symbol, with symbol to move on board
+        x_bits, o_bits = board.get_bitboards()
+        if symbol == 'X':
+            return self.solve(x_bits, o_bits, alpha, beta)
+        return self.solve(o_bits, x_bits, alpha, beta)
+
+    def best_move(self, board, symbol):
+        """
+        :returns: (best move as a tuple, exact final disc difference for symbol)
+        """
+        x_bits, o_bits = board.get_bitboards()
+        own, opp = (x_bits, o_bits) if symbol == 'X' else (o_bits, x_bits)
+        alpha = -INFINITY
+        best_move = None
+        for square in self.ordered_moves(own, opp, bitboard_ops.valid_moves_mask(own, opp, self.geometry)):
+            flips = bitboard_ops.flip_mask(own, opp, square, self.geometry)
+            bit = self.geometry.square_bits[square]
+            if best_move is None:
+                val = -self.solve(opp & ~flips, own | flips | bit, -INFINITY, INFINITY)
+            else:
+                # only need to know the exact value if it beats the best so far
+                val = -self.solve(opp & ~flips, own | flips | bit, -alpha - 1, -alpha)
+                if val > alpha:
+                    val = -self.solve(opp & ~flips, own | flips | bit, -INFINITY, -val)
+            if best_move is None or val > alpha:
+                alpha = val
+                best_move = tuple(bitboard_ops.square_to_position(square, self.size))
+        return best_move, alpha
+
+    def solve(self, own, opp, alpha, beta):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise SolveTimeout()
+        empties = self.geometry.full & ~(own | opp)
+        empty_count = popcount(empties)
+        if empty_count <= SMALL_EMPTIES:
+            return self.solve_small(own, opp, list(bitboard_ops.iter_squares(empties)), alpha, beta, False)
+
+        moves = bitboard_ops.valid_moves_mask(own, opp, self.geometry)
+        if not moves:
+            if not bitboard_ops.valid_moves_mask(opp, own, self.geometry):
+                return popcount(own) - popcount(opp)
+            return -self.solve(opp, own, -beta, -alpha)
+
+        # we can't end up more than every square minus twice the opponent's stable discs ahead,
+        # which can only be <= alpha if the opponent has enough discs to begin with
+        if empty_count > STABILITY_EMPTIES and self.size * self.size - 2 * popcount(opp) <= alpha:
+            upper = self.size * self.size - 2 * popcount(self.stable_discs(opp, own | opp))
+            if upper <= alpha:
+                return upper
+
+        original_alpha = alpha
+        table_square = None
+        if empty_count >= TABLE_EMPTIES:
+            key = hash((own, opp))
+            entry = self.table.probe(key)
+            if entry is not None:
+                value, flag, table_square = entry[1], entry[2], entry[3]
+                if flag == EXACT:
+                    return value
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        best = -INFINITY
+        best_square = None
+        first = True
+        for square in self.ordered_moves(own, opp, moves, empties, empty_count, table_square):
+            flips = bitboard_ops.flip_mask(own, opp, square, self.geometry)
+            bit = self.geometry.square_bits[square]
+            new_own = opp & ~flips
+            new_opp = own | flips | bit
+            if first:
+                val = -self.solve(new_own, new_opp, -beta, -alpha)
+                first = False
+            else:
+                # null window first, search again only if the move beats alpha
+                val = -self.solve(new_own, new_opp, -alpha - 1, -alpha)
+                if alpha < val < beta:
+                    val = -self.solve(new_own, new_opp, -beta, -val)
+            if val > best:
+                best = val
+                best_square = square
+                if val > alpha:
+                    alpha = val
+                    if alpha >= beta:
+                        break
+        if empty_count >= TABLE_EMPTIES:
+            if best <= original_alpha:
+                flag = UPPER_BOUND
+            elif best >= beta:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            self.table.store(key, empty_count, best, flag, best_square)
+        return best
+
+    def ordered_moves(self, own, opp, moves, empties=None, empty_count=None, table_square=None):
+        if empties is None:
+            empties = self.geometry.full & ~(own | opp)
+            empty_count = popcount(empties)
+        squares = list(bitboard_ops.iter_squares(moves))
+        if empty_count > FASTEST_FIRST_EMPTIES:
+            # fastest first: leave the opponent as few replies as possible, corners before anything else
+            scored = []
+            for square in squares:
+                flips = bitboard_ops.flip_mask(own, opp, square, self.geometry)
+                bit = self.geometry.square_bits[square]
+                replies = popcount(bitboard_ops.valid_moves_mask(opp & ~flips, own | flips | bit, self.geometry))
+                if bit & self.corners:
+                    replies -= 2
+                scored.append((replies, square))
+            scored.sort()
+            ordered = [square for _, square in scored]
+        else:
+            ordered = self.parity_order(squares, empties)
+        if table_square is not None and table_square in ordered:
+            ordered.remove(table_square)
+            ordered.insert(0, table_square)
+        return ordered
+
+    def parity_order(self, squares, empties):
+        # squares in regions with an odd number of empties first, so we get the last move there
+        odd = []
+        even = []
+        for square in squares:
+            bit = self.geometry.square_bits[square]
+            for region in self.regions:
+                if region & bit:
+                    if popcount(region & empties) & 1:
+                        odd.append(square)
+                    else:
+                        even.append(square)
+                    break
+        return odd + even
+
+    def solve_small(self, own, opp, empty_squares, alpha, beta, passed):
+        # last few empties: try each empty square directly instead of generating moves
+        self.nodes += 1
+        if len(empty_squares) == 1:
+            return self.solve_last(own, opp, empty_squares[0])
+        if not empty_squares:
+            return popcount(own) - popcount(opp)
+        best = -INFINITY
+        for i in range(len(empty_squares)):
+            square = empty_squares[i]
+            flips = bitboard_ops.flip_mask(own, opp, square, self.geometry)
+            if not flips:
+                continue
+            bit = self.geometry.square_bits[square]
+            rest = empty_squares[:i] + empty_squares[i + 1:]
+            val = -self.solve_small(opp & ~flips, own | flips | bit, rest, -beta, -alpha, False)
+            if val > best:
+                best = val
+                if val > alpha:
+                    alpha = val
+                    if alpha >= beta:
+                        return best
+        if best == -INFINITY:
+            if passed:  # neither side can move
+                return popcount(own) - popcount(opp)
+            return -self.solve_small(opp, own, empty_squares, -beta, -alpha, True)
+        return best
+
+    def solve_last(self, own, opp, square):
+        # one empty square left: we play it, or else the opponent does, or else nobody can
+        bit = self.geometry.square_bits[square]
+        flips = bitboard_ops.flip_mask(own, opp, square, self.geometry)
+        if flips:
+            return popcount(own | flips | bit) - popcount(opp & ~flips)
+        flips = bitboard_ops.flip_mask(opp, own, square, self.geometry)
+        if flips:
+            return popcount(own & ~flips) - popcount(opp | flips | bit)
+        return popcount(own) - popcount(opp)
+
+    def stable_discs(self, bits, occupied):
+        # discs in bits that can never be flipped: on every axis the line is full, or the disc
+        # touches the edge or another stable disc of its colour
+        full_lines = []
+        for axis in range(4):
+            full = 0
+            for line in self.lines[axis]:
+                if line & occupied == line:
+                    full |= line
+            full_lines.append(full)
+        directions = self.geometry.directions
+        stable = 0
+        while True:
+            candidates = bits
+            for axis in range(4):
+                ok = full_lines[axis] | self.edges[axis] | self.edges[axis + 4]
+                ok |= bitboard_ops._shift(stable, *directions[axis + 4])
+                ok |= bitboard_ops._shift(stable, *directions[axis])
+                candidates &= ok
+            if candidates == stable:
+                return stable
+            stable = candidates
+
+
+def random_position(empties, size=8, rng=random):
+    """
+    :returns: (board, symbol to move) after random play leaves `empties` empty squares, or None
+        if the game ended first or the side to move has to pass
+    """
+    board = ReversiBoard(size)
+    symbol = 'X'
+    while size * size - sum(board.calc_scores().values()) > empties:
+        moves = board.calc_valid_moves(symbol)
+        if moves:
+            board.make_move(symbol, rng.choice(moves))
+        elif not board.game_continues():
+            return None
+        symbol = board.get_opponent_symbol(symbol)
+    if not board.calc_valid_moves(symbol):
+        return None
+    return board, symbol
+
+
+def benchmark(empties=20, positions=5, size=8, seed=0):
+    rng = random.Random(seed)
+    total_nodes = 0
+    total_time = 0
+    solved = 0
+    while solved < positions:
+        position = random_position(empties, size, rng)
+        if position is None:
+            continue
+        board, symbol = position
+        solver = EndgameSolver(size)
+        start = time.perf_counter()
+        move, score = solver.best_move(board, symbol)
+        dt = time.perf_counter() - start
+        solved += 1
+        total_nodes += solver.nodes
+        total_time += dt
+        print(symbol, "plays", move, "final disc difference", score, "nodes", solver.nodes, "seconds", round(dt, 2))
+    print("total nodes", total_nodes, "seconds", round(total_time, 2), "nodes/sec", int(total_nodes / total_time))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the exact endgame solver on random positions.")
+    parser.add_argument('--empties', type=int, default=20)
+    parser.add_argument('--positions', type=int, default=5)
+    parser.add_argument('--size', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(args.empties, args.positions, args.size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Position evaluators for MinimaxPlayerG3.
+
+An evaluator scores positions for the side to move, as an int, from raw bitboards (see bitboard.py):
+    evaluate(own, opp)              one position
+    evaluate_board(board, symbol)   one ReversiBoard, for symbol to move; the player's leaves come
+                                    through here, so an evaluator can keep state on the board
+    evaluate_batch(boards)          a NumPy array of packed boards, shape (n, 2) uint64 [own, opp],
+                                    returning n scores
+With batch_eval=True the player calls evaluate_batch once for all the children of a node one ply above
+the leaves instead of evaluate once per leaf, so an evaluator that does real work per position pays
+the Python overhead once per node rather than once per leaf.
+
+NumPy is needed for evaluate_batch, so the player only imports this module when it's asked to.
+reversi/pattern_eval.py has a learned evaluator.
+"""
+import numpy as np
+
+from reversi import bitboard as bitboard_ops
+
+
+def pack_boards(positions):
+    """
+    :param positions: (own, opp) pairs
+    :returns: (n, 2) uint64 array
+    """
+    return np.array(positions, dtype=np.uint64).reshape(-1, 2)
+
+
+def popcount_batch(bits):
+    # (n,) uint64 -> (n,) disc counts
+    return np.unpackbits(bits.astype('<u8').view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1, dtype=np.int64)
+
+
+class DiscCountEvaluator:
+    # own discs minus opponent discs, the same score as MinimaxPlayerG3.eval_board
+
+    def evaluate(self, own, opp):
+        return bitboard_ops.popcount(own) - bitboard_ops.popcount(opp)
+
+    def evaluate_board(self, board, symbol):
+        x_bits, o_bits = board.get_bitboards()
+        if symbol == "X":
+            return self.evaluate(x_bits, o_bits)
+        return self.evaluate(o_bits, x_bits)
+
+    def evaluate_batch(self, boards):
+        return popcount_batch(boards[:, 0]) - popcount_batch(boards[:, 1])
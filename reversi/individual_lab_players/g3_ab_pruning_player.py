@@ -1,6 +1,4 @@
 # adapted by Toby Dragon from original source code by Al Sweigart, available with creative commons license: https://inventwithpython.com/#donate
-import random
-import copy
 
 """
 Minimax player implementation
@@ -18,9 +16,9 @@ class G3MinimaxPlayerABPruning:
         # for each move, call minimax and get the evaluation
         # store in dictionary max node (key is move, value is value)
         for i in range(len(valid_moves)):
-            board2 = copy.deepcopy(board)
-            board2.make_move(self.symbol, valid_moves[i])
-            move_val = self.minimax(board2, self.max_depth, 1, False,ab_val)
+            board.make_move(self.symbol, valid_moves[i])
+            move_val = self.minimax(board, self.max_depth, 1, False,ab_val)
+            board.undo_move()
             ab_val=max(ab_val,move_val)
             max_node[tuple(valid_moves[i])] = move_val
 
@@ -52,9 +50,9 @@ class G3MinimaxPlayerABPruning:
 
             values = set()
             for i in range(len(move_list)):
-                board2 = copy.deepcopy(board)
-                board2.make_move(self.symbol, move_list[i])
-                val = self.minimax(board2, max_depth, current_depth + 1, False, ab_val)
+                board.make_move(self.symbol, move_list[i])
+                val = self.minimax(board, max_depth, current_depth + 1, False, ab_val)
+                board.undo_move()
                 # AB pruning
                 # if one of our children is less than our parent's AB, then we'll pick it or worse,
                 # and our parent node doesn't care about us
@@ -82,9 +80,9 @@ class G3MinimaxPlayerABPruning:
 
             values = set()
             for i in range(len(move_list)):
-                board2 = copy.deepcopy(board)
-                board2.make_move(board2.get_opponent_symbol(self.symbol), move_list[i])
-                val = self.minimax(board2, max_depth, current_depth + 1, True, ab_val)
+                board.make_move(board.get_opponent_symbol(self.symbol), move_list[i])
+                val = self.minimax(board, max_depth, current_depth + 1, True, ab_val)
+                board.undo_move()
                 # AB pruning
                 # if one of our children is less than our parent's AB, then we'll pick it or worse,
                 # and our parent node doesn't care about us
@@ -1,6 +1,4 @@
 # adapted by Toby Dragon from original source code by Al Sweigart, available with creative commons license: https://inventwithpython.com/#donate
-import random
-import copy
 import heapq
 
 
@@ -19,9 +17,9 @@ class G3MinimaxPlayerBeamSearch:
         #for each move, call minimax and get the evaluation
         #store in dictionary max node (key is move, value is value)
         for i in range(len(valid_moves)):
-            board2 = copy.deepcopy(board)
-            board2.make_move(self.symbol, valid_moves[i])
-            move_val = self.minimax(board2, 2, 1, False)
+            board.make_move(self.symbol, valid_moves[i])
+            move_val = self.minimax(board, 2, 1, False)
+            board.undo_move()
             max_node[tuple(valid_moves[i])] = move_val
 
 
@@ -47,16 +45,16 @@ class G3MinimaxPlayerBeamSearch:
             if len(move_list) == 0:  # end of tree or invalid move
                 return self.minimax(board, max_depth, current_depth+1, False)
 
-            if current_depth == max_depth:  # deep as can go
+            if current_depth >= max_depth:  # deep as can go
                 return self.eval_board(board)
 
             values = set()
-            beam_search_moves=self.beam_search(board,2,move_list)
+            beam_search_moves=self.beam_search(board,2,move_list,self.symbol)
             #beam_search_moves=move_list
             for i in range(len(beam_search_moves)):
-                board2 = copy.deepcopy(board)
-                board2.make_move(self.symbol, beam_search_moves[i])
-                val = self.minimax(board2, max_depth, current_depth + 1, False)
+                board.make_move(self.symbol, beam_search_moves[i])
+                val = self.minimax(board, max_depth, current_depth + 1, False)
+                board.undo_move()
                 values.add(val)
 
             return max(values)
@@ -71,29 +69,33 @@ class G3MinimaxPlayerBeamSearch:
             if len(move_list) == 0:  # end of tree or invalid move
                 return self.minimax(board, max_depth, current_depth+1, True)
 
-            if current_depth == max_depth:    # deep as can go
+            if current_depth >= max_depth:    # deep as can go
                 return self.eval_board(board)
 
             values = set()
-            beam_search_moves = self.beam_search(board, 2, move_list)
+            beam_search_moves = self.beam_search(board, 2, move_list, board.get_opponent_symbol(self.symbol))
             #beam_search_moves=move_list
             for i in range(len(beam_search_moves)):
-                board2 = copy.deepcopy(board)
-                board2.make_move(board2.get_opponent_symbol(self.symbol), beam_search_moves[i])
-                val = self.minimax(board2, max_depth, current_depth + 1, True)
+                board.make_move(board.get_opponent_symbol(self.symbol), beam_search_moves[i])
+                val = self.minimax(board, max_depth, current_depth + 1, True)
+                board.undo_move()
                 values.add(val)
 
             return min(values)
 
-    def beam_search(self,board,n,possible_moves):
+    def beam_search(self,board,n,possible_moves,symbol):
+        # keeps the n moves that leave symbol (the side playing them) furthest ahead
         if n>=len(possible_moves):
             return possible_moves
         else:
             moves_values_queue = []
             for move in possible_moves:
-                board2 = copy.deepcopy(board)
-                board2.make_move(self.symbol, move)
+                if not board.make_move(symbol, move):
+                    continue
                 value = self.eval_board(board)
+                board.undo_move()
+                if symbol != self.symbol:
+                    value = -value
                 heapq.heappush(moves_values_queue, (value, move))
             best_moves = heapq.nlargest(n, moves_values_queue)
             best_moves_list = []
@@ -110,4 +112,4 @@ class G3MinimaxPlayerBeamSearch:
         scores = board.calc_scores()
         if self.symbol == "X":
             return scores.get("X")-scores.get("O")
-        return scores.get("O")-scores.get("X")
\ No newline at end of file
+        return scores.get("O")-scores.get("X")
\ No newline at end of file
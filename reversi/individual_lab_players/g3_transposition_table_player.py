@@ -1,6 +1,5 @@
 # adapted by Toby Dragon from original source code by Al Sweigart, available with creative commons license: https://inventwithpython.com/#donate
-import random
-import copy
+from reversi import symmetry
 
 
 """
@@ -17,17 +16,18 @@ class G3MinimaxPlayerTranspositionTable:
 
         #for each move, call minimax and get the evaluation
         #store in dictionary max node (key is move, value is value)
+        opponent = board.get_opponent_symbol(self.symbol)
         for i in range(len(valid_moves)):
-            board2 = copy.deepcopy(board)
-            board2.make_move(self.symbol, valid_moves[i])
+            board.make_move(self.symbol, valid_moves[i])
+            key = board_key(board, opponent, 1)
 
-            if(self.in_transposition_table(board2, seen_boards) == True): #already seen board state
-                move_val = seen_boards[board2]
-                max_node[tuple(valid_moves[i])] = move_val
+            if(key in seen_boards): #already seen board state
+                move_val = seen_boards[key]
             else: #if the board state hasn't been seen
-                move_val = self.minimax(board2, 3, 1, False, seen_boards)
-                max_node[tuple(valid_moves[i])] = move_val
-                seen_boards[board] = move_val
+                move_val = self.minimax(board, 3, 1, False, seen_boards)
+                seen_boards[key] = move_val
+            board.undo_move()
+            max_node[tuple(valid_moves[i])] = move_val
 
 
         #find the node with the highest max val, return it
@@ -52,20 +52,21 @@ class G3MinimaxPlayerTranspositionTable:
             if len(move_list) == 0:  # end of tree or invalid move
                 return self.minimax(board, max_depth, current_depth+1, False, seen_boards)
 
-            if current_depth == max_depth:  # deep as can go
+            if current_depth >= max_depth:  # deep as can go
                 return self.eval_board(board)
 
             values = set()
             for i in range(len(move_list)):
-                board2 = copy.deepcopy(board)
-                board2.make_move(self.symbol, move_list[i])
+                board.make_move(self.symbol, move_list[i])
+                key = board_key(board, board.get_opponent_symbol(self.symbol), current_depth + 1)
 
-                if(self.in_transposition_table(board2, seen_boards) == True):
-                    values.add(seen_boards[board2])
+                if(key in seen_boards):
+                    values.add(seen_boards[key])
                 else:
-                    val = self.minimax(board2, max_depth, current_depth + 1, False, seen_boards)
+                    val = self.minimax(board, max_depth, current_depth + 1, False, seen_boards)
                     values.add(val)
-                    seen_boards[board] = val
+                    seen_boards[key] = val
+                board.undo_move()
 
             return max(values)
 
@@ -79,20 +80,21 @@ class G3MinimaxPlayerTranspositionTable:
             if len(move_list) == 0:  # end of tree or invalid move
                 return self.minimax(board, max_depth, current_depth+1, True, seen_boards)
 
-            if current_depth == max_depth:    # deep as can go
+            if current_depth >= max_depth:    # deep as can go
                 return self.eval_board(board)
 
             values = set()
             for i in range(len(move_list)):
-                board2 = copy.deepcopy(board)
-                board2.make_move(board2.get_opponent_symbol(self.symbol), move_list[i])
+                board.make_move(board.get_opponent_symbol(self.symbol), move_list[i])
+                key = board_key(board, self.symbol, current_depth + 1)
 
-                if (self.in_transposition_table(board2, seen_boards) == True):
-                    values.add(seen_boards[board2])
+                if (key in seen_boards):
+                    values.add(seen_boards[key])
                 else:
-                    val = self.minimax(board2, max_depth, current_depth + 1, True, seen_boards)
+                    val = self.minimax(board, max_depth, current_depth + 1, True, seen_boards)
                     values.add(val)
-                    seen_boards[board] = val
+                    seen_boards[key] = val
+                board.undo_move()
 
             return min(values)
 
@@ -105,20 +107,9 @@ class G3MinimaxPlayerTranspositionTable:
             return scores.get("X")-scores.get("O")
         return scores.get("O")-scores.get("X")
 
-    def in_transposition_table(self, board, seen_boards):
-        #rotate and check all 4 possible perspectives
-        #return true if it was already in the transposition table
-        #false if it is new
-
-        if (board in seen_boards): #actual state
-            return True
-
-        for i in range(3): #equivilant states
-            board2 = copy.deepcopy(board)
-            board2.rotate_board()
-            #will currently check board from one perspective, rotate implementation next
-            if(board2 in seen_boards):
-                return True
-
-        return False
 
+def board_key(board, symbol_to_move, depth):
+    # canonical form of the board under all 8 symmetries (the transform itself isn't needed here),
+    # so one lookup checks every equivalent state, plus whose turn it is and the depth it's searched
+    # at, since the same discs with the other side to move, or searched less deep, have other values
+    return symmetry.canonical_board(board)[:2] + (symbol_to_move, depth)
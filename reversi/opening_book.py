@@ -0,0 +1,190 @@
+"""
+Opening book: best moves for every position in the first few plies, searched ahead of time.
+
+The book is a binary file of fixed-size records sorted by key, so it can be opened with mmap and
+searched with a binary search without reading it into memory:
+    header: magic, version, board size, record count
+    record: book_key of the position and side to move, best move square (in canonical
+            orientation), score for the side to move
+Positions are stored once for all eight symmetries (see reversi/symmetry.py), and once for both
+colours: with O to move the colours are swapped first, so the book built from games X starts
+also covers every game O starts.
+
+    python -m reversi.opening_book build --plies 7 --depth 8 --workers 4
+builds the default book next to this file with MinimaxPlayerG3 doing the searching.
+"""
+import argparse
+import copy
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from reversi import symmetry
+from reversi.reversi_board import ReversiBoard
+
+BOOK_FILE = os.path.join(os.path.dirname(__file__), 'opening_book.bin')
+MAGIC = b'RVBK'
+VERSION = 2
+HEADER = struct.Struct('<4sHHI')  # magic, version, board size, record count
+RECORD = struct.Struct('<QHh')  # key, move square, score
+
+
+class OpeningBook:
+
+    def __init__(self, filename=BOOK_FILE):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d opening book" % (filename, VERSION))
+
+    def close(self):
+        self._map.close()
+
+    def find(self, key):
+        """
+        :returns: (move square, score) stored for key, or None
+        """
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            record_key, square, score = RECORD.unpack_from(self._map, HEADER.size + mid * RECORD.size)
+            if record_key < key:
+                low = mid + 1
+            elif record_key > key:
+                high = mid
+            else:
+                return square, score
+        return None
+
+    def lookup(self, board, symbol):
+        """
+        :returns: the book move for symbol on board as a tuple, or None if the position isn't in the book
+        """
+        if board.get_size() != self.size:
+            return None
+        key, transform = book_key(board, symbol)
+        found = self.find(key)
+        if found is None:
+            return None
+        canonical_move = [found[0] // self.size, found[0] % self.size]
+        move = symmetry.transform_position(canonical_move, symmetry.inverse(transform), self.size)
+        if not board.is_valid_move(symbol, move):  # hash collision
+            return None
+        return tuple(move)
+
+
+def book_key(board, symbol):
+    """
+    :returns: (key, transform) for board with symbol to move: the hash of the canonical position with
+        the side to move playing X, and the transform that got there
+    """
+    x_bits, o_bits = board.get_bitboards()
+    if symbol == 'O':
+        x_bits, o_bits = o_bits, x_bits
+    size = board.get_size()
+    x_bits, o_bits, transform = symmetry.canonical(x_bits, o_bits, size)
+    return symmetry.hash_bits(x_bits, o_bits, size), transform
+
+
+_default_book = None
+
+
+def load_default_book(size=8):
+    # the book shipped with the package, or None if it hasn't been built for this size.
+    # The file is mapped once per process and shared by every player
+    global _default_book
+    if _default_book is None:
+        if not os.path.exists(BOOK_FILE):
+            return None
+        _default_book = OpeningBook(BOOK_FILE)
+    if _default_book.size != size:
+        return None
+    return _default_book
+
+
+def write_book(filename, size, entries):
+    """
+    :param entries: {key: (move square, score)}
+    """
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size, len(entries)))
+        for key in sorted(entries):
+            square, score = entries[key]
+            f.write(RECORD.pack(key, square, score))
+
+
+def _search_position(job):
+    # runs in a worker process: best move and score for one book position
+    from reversi.player3.all_players import MinimaxPlayerG3
+
+    board, symbol, depth = job
+    player = MinimaxPlayerG3(symbol, max_depth=depth, ab_pruning=True, transposition_table=True,
+                             beam_search_enabled=False, move_ordering_enabled=True)
+    player.reset_ordering(board)
+    return player.search_root(board, depth, board.calc_valid_moves(symbol))
+
+
+def expand_positions(plies, size=8):
+    """
+    :returns: {key: (board, symbol to move, transform)} for every distinct position (up to symmetry)
+        reachable in fewer than `plies` moves from the start
+    """
+    positions = {}
+    frontier = [(ReversiBoard(size), 'X')]
+    for ply in range(plies):
+        next_frontier = []
+        for board, symbol in frontier:
+            moves = board.calc_valid_moves(symbol)
+            if not moves:
+                if not board.game_continues():
+                    continue
+                symbol = board.get_opponent_symbol(symbol)
+                moves = board.calc_valid_moves(symbol)
+            key, transform = book_key(board, symbol)
+            if key in positions:
+                continue
+            positions[key] = (board, symbol, transform)
+            for move in moves:
+                child = copy.deepcopy(board)
+                child.make_move(symbol, move)
+                next_frontier.append((child, board.get_opponent_symbol(symbol)))
+        frontier = next_frontier
+    return positions
+
+
+def build(filename=BOOK_FILE, plies=7, depth=8, size=8, workers=None):
+    positions = expand_positions(plies, size)
+    keys = list(positions)
+    jobs = [(positions[key][0], positions[key][1], depth) for key in keys]
+    entries = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for key, (move, score) in zip(keys, executor.map(_search_position, jobs, chunksize=8)):
+            transform = positions[key][2]
+            x, y = symmetry.transform_position(move, transform, size)
+            entries[key] = (x * size + y, score)
+    write_book(filename, size, entries)
+    print(len(entries), "positions written to", filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the opening book.")
+    subparsers = parser.add_subparsers(dest='command')
+    build_parser = subparsers.add_parser('build')
+    build_parser.add_argument('--out', default=BOOK_FILE)
+    build_parser.add_argument('--plies', type=int, default=7)
+    build_parser.add_argument('--depth', type=int, default=8)
+    build_parser.add_argument('--size', type=int, default=8)
+    build_parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build(args.out, args.plies, args.depth, args.size, args.workers)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
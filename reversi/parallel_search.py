@@ -0,0 +1,161 @@
+"""
+Multi-process search for MinimaxPlayerG3 (workers > 1).
+
+Python threads share one core through the GIL, so the extra searchers are processes. Each helper
+process holds a copy of the player and waits for jobs on a pipe:
+
+    Lazy SMP (players with a transposition table): every helper searches the same root position
+        with iterative deepening, odd helpers one ply ahead and each with the root moves rotated
+        differently. They share nothing but the SharedTranspositionTable, so the main search finds
+        cutoffs and best moves the helpers already worked out. The main process's result is the
+        one played.
+    Root splitting (players without a table): the root moves are dealt out round robin, every
+        process searches its share with the same window, and the best value wins.
+
+A job ends when the main process sets the stop event; helpers still searching time out the same
+way a timed get_move does and report how many nodes they searched.
+"""
+import copy
+import math
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+from multiprocessing import connection
+
+from reversi import endgame
+from reversi.transposition_table import SharedTranspositionTable
+
+LAZY_SMP = "lazy"
+ROOT_SPLIT = "split"
+
+
+def _stop_when_set(stop, player):
+    stop.wait()
+    player.set_deadline(0)
+
+
+def _helper_main(conn, stop, player, index):
+    from reversi.player3.all_players import SearchTimeout
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        kind, board, depth, moves, alpha, beta = job
+        player.prepare_search(board)
+        player.set_deadline(math.inf)
+        watcher = threading.Thread(target=_stop_when_set, args=(stop, player))
+        watcher.start()
+        if kind == LAZY_SMP:
+            shift = index % len(moves)
+            player.iterative_deepening(board, player.symbol, moves[shift:] + moves[:shift], first_depth=1 + index % 2)
+        else:
+            result = None
+            if moves:
+                try:
+                    result = player.search_root(board, depth, moves, alpha, beta)
+                except (SearchTimeout, endgame.SolveTimeout):
+                    pass
+            conn.send(("result", result))
+        watcher.join()
+        player.set_deadline(None)
+        conn.send(("done", player.nodes))
+    conn.close()
+
+
+def _shutdown(owner_pid, conns, processes, table):
+    if os.getpid() != owner_pid:  # a copy of the object in a forked process
+        return
+    for conn in conns:
+        try:
+            conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for process in processes:
+        process.join(1)
+        if process.is_alive():
+            process.terminate()
+    if table is not None:
+        table.close(unlink=True)
+
+
+class ParallelSearch:
+
+    def __init__(self, player, workers):
+        """
+        Starts workers - 1 helper processes for player. If the player uses a transposition table it
+        is replaced by a SharedTranspositionTable of the same size.
+        """
+        self.player = player
+        self.workers = workers
+        self.mode = LAZY_SMP if player.transposition_table else ROOT_SPLIT
+        table = None
+        if self.mode == LAZY_SMP:
+            table = SharedTranspositionTable(player.table_size)
+            player.table = table
+        self.stop = multiprocessing.Event()
+        self.conns = []
+        self.processes = []
+        helper = copy.copy(player)
+        helper.killers = []
+        helper.history = {}
+        for index in range(1, workers):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_helper_main, args=(child_conn, self.stop, helper, index), daemon=True)
+            process.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+        self.helper_nodes = 0
+        self._finalizer = weakref.finalize(self, _shutdown, os.getpid(), self.conns, self.processes, table)
+
+    def close(self):
+        self._finalizer()
+
+    def start_helpers(self, board, valid_moves):
+        # Lazy SMP: set every helper searching the root while the main process searches it too
+        self._send_jobs([(LAZY_SMP, board, None, list(valid_moves), None, None)] * len(self.conns))
+
+    def finish(self):
+        # stop the helpers and wait until they are idle again
+        self.stop.set()
+        for conn in self.conns:
+            while True:
+                kind, value = conn.recv()
+                if kind == "done":
+                    self.helper_nodes += value
+                    break
+        self.stop.clear()
+
+    def split_root(self, board, depth, valid_moves, alpha, beta):
+        """
+        Root splitting: the main process searches every workers-th root move and the helpers the rest.
+        :returns: (best move, value) like MinimaxPlayerG3.search_moves
+        :raises SearchTimeout: when the player's deadline passes first
+        """
+        from reversi.player3.all_players import SearchTimeout
+
+        shares = [valid_moves[i::self.workers] for i in range(self.workers)]
+        self._send_jobs([(ROOT_SPLIT, board, depth, share, alpha, beta) for share in shares[1:]])
+        try:
+            results = [self.player.search_moves(board, depth, shares[0], alpha, beta, self.player.symbol)]
+            pending = list(self.conns)
+            while pending:
+                timeout = None
+                if self.player.deadline is not None:
+                    timeout = max(0, self.player.deadline - time.perf_counter())
+                ready = connection.wait(pending, timeout)
+                if not ready:
+                    raise SearchTimeout()
+                for conn in ready:
+                    results.append(conn.recv()[1])
+                    pending.remove(conn)
+        finally:
+            self.finish()
+        return max((result for result in results if result is not None), key=lambda result: result[1])
+
+    def _send_jobs(self, jobs):
+        for conn, job in zip(self.conns, jobs):
+            conn.send(job)
@@ -0,0 +1,458 @@
+"""
+Pattern evaluation: a learned 8x8 evaluator for MinimaxPlayerG3 (see reversi/evaluation.py).
+
+The score for the side to move is a sum of table lookups plus two small features:
+    patterns   each group of squares below, in all of its orientations, reads its squares as a
+               base-3 number (empty 0, own 1, opponent 2) and looks up its weight
+    mobility   empty squares next to opponent discs minus empty squares next to own discs (potential
+               mobility: counting the legal moves is several times the cost of everything else here)
+    parity     1 if an odd number of squares is empty, so the side to move gets the last move
+with a separate set of weights for each game stage (by disc count).
+
+Against a board the pattern indices are kept up to date as moves are made and undone, through
+ReversiBoard.add_listener, so a leaf costs one lookup per pattern instead of reading every square.
+
+The weights are int16 in 1/SCALE discs, zlib compressed in pattern_weights.bin next to this file:
+    header: magic, version, board size, stage count, scale
+    body:   for each stage, each pattern's 3**n weights in PATTERNS order, then the mobility,
+            parity and constant weights
+They are fitted to the final disc difference of self-play games (NumPy is needed for that, and for
+evaluate_batch, but not to evaluate positions one at a time):
+
+    python -m reversi.pattern_eval collect samples.npz --games 20000
+    python -m reversi.pattern_eval fit samples.npz
+"""
+import argparse
+import os
+import struct
+import sys
+import zlib
+from array import array
+from operator import getitem
+
+from reversi import bitboard as bitboard_ops
+from reversi import symmetry
+
+WEIGHTS_FILE = os.path.join(os.path.dirname(__file__), 'pattern_weights.bin')
+MAGIC = b'RVPW'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHH')  # magic, version, board size, stage count, scale
+SIZE = 8
+STAGES = 4
+SCALE = 16  # weights are in 1/SCALE discs
+FEATURES = ('mobility', 'parity', 'constant')
+
+# (name, squares) in one orientation; the other orientations are the symmetry.TRANSFORMS images
+PATTERNS = [
+    ('edge_2x', [(0, 0), (0, 1), (0, 2), (0, 3), (0, 4), (0, 5), (0, 6), (0, 7), (1, 1), (1, 6)]),
+    ('corner_3x3', [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2), (2, 0), (2, 1), (2, 2)]),
+    ('corner_2x5', [(0, 0), (0, 1), (0, 2), (0, 3), (0, 4), (1, 0), (1, 1), (1, 2), (1, 3), (1, 4)]),
+    ('diagonal_8', [(i, i) for i in range(8)]),
+    ('diagonal_7', [(i, i + 1) for i in range(7)]),
+    ('diagonal_6', [(i, i + 2) for i in range(6)]),
+    ('diagonal_5', [(i, i + 3) for i in range(5)]),
+    ('diagonal_4', [(i, i + 4) for i in range(4)]),
+]
+
+_SWAP = (0, 2, 1)  # a square's digit with the colours swapped
+
+
+def stage(discs):
+    # discs on the board (4 to 64) -> 0 .. STAGES - 1
+    return min((discs - 4) * STAGES // 61, STAGES - 1)
+
+
+class Patterns:
+    # Every placement of every pattern on the board, and what one square adds to their indices.
+
+    def __init__(self):
+        self.instances = []  # [(pattern number, squares)]
+        for number, (name, cells) in enumerate(PATTERNS):
+            seen = set()
+            for t in symmetry.TRANSFORMS:
+                squares = []
+                for cell in cells:
+                    x, y = symmetry.transform_position(cell, t, SIZE)
+                    squares.append(x * SIZE + y)
+                if frozenset(squares) not in seen:  # a pattern that is its own mirror image
+                    seen.add(frozenset(squares))
+                    self.instances.append((number, squares))
+        # square_terms[square] lists (instance, 3**k) for every instance with the square at digit k
+        self.square_terms = [[] for _ in range(SIZE * SIZE)]
+        for i, (number, squares) in enumerate(self.instances):
+            for k, square in enumerate(squares):
+                self.square_terms[square].append((i, 3 ** k))
+        geometry = bitboard_ops.get_geometry(SIZE)
+        self.full = geometry.full
+        self.not_first_column = geometry.directions[0][1]
+        self.not_last_column = geometry.directions[4][1]
+
+    def indices(self, x_bits, o_bits):
+        # the index of every instance with X as 1 and O as 2
+        indices = [0] * len(self.instances)
+        for bits, digit in ((x_bits, 1), (o_bits, 2)):
+            for square in bitboard_ops.iter_squares(bits):
+                for i, power in self.square_terms[square]:
+                    indices[i] += digit * power
+        return indices
+
+    def near(self, bits):
+        # the squares next to a disc of bits, spreading along the rows and then across them
+        row = bits | ((bits << 1) & self.not_first_column) | ((bits >> 1) & self.not_last_column)
+        return (row | (row << SIZE) | (row >> SIZE)) & self.full
+
+    def potential_mobility(self, own, opp):
+        # empty squares next to opponent discs minus empty squares next to own discs
+        empty = ~(own | opp)
+        return bitboard_ops.popcount(self.near(opp) & empty) - bitboard_ops.popcount(self.near(own) & empty)
+
+
+def _swap_permutation(length):
+    # _swap_permutation(n)[index] is the index with every digit's colours swapped
+    permutation = [0]
+    for k in range(length):
+        power = 3 ** k
+        permutation = [value + _SWAP[digit] * power for digit in range(3) for value in permutation]
+    return permutation
+
+
+class PatternIndices:
+    # A board listener (see ReversiBoard.add_listener) keeping every instance's index current.
+
+    def __init__(self, patterns, x_bits, o_bits):
+        self.square_terms = patterns.square_terms
+        self.indices = patterns.indices(x_bits, o_bits)
+
+    def on_move(self, symbol, placed, flips):
+        indices = self.indices
+        terms = self.square_terms
+        # placing adds the mover's digit; a flip from the other colour is +1 for O (1 -> 2), -1 for X
+        digit = 1 if symbol == 'X' else 2
+        change = 1 if symbol == 'O' else -1
+        for i, power in terms[placed.bit_length() - 1]:
+            indices[i] += digit * power
+        while flips:
+            low = flips & -flips
+            for i, power in terms[low.bit_length() - 1]:
+                indices[i] += change * power
+            flips ^= low
+
+    def on_undo(self, symbol, placed, flips):
+        indices = self.indices
+        terms = self.square_terms
+        digit = 1 if symbol == 'X' else 2
+        change = 1 if symbol == 'O' else -1
+        for i, power in terms[placed.bit_length() - 1]:
+            indices[i] -= digit * power
+        while flips:
+            low = flips & -flips
+            for i, power in terms[low.bit_length() - 1]:
+                indices[i] -= change * power
+            flips ^= low
+
+
+def read_weights(filename=WEIGHTS_FILE):
+    """
+    :returns: {stage: ([one array('h') per pattern], [mobility, parity, constant])}
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    magic, version, size, stages, scale = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION or size != SIZE or stages != STAGES or scale != SCALE:
+        raise ValueError("%s is not a version %d pattern weight file" % (filename, VERSION))
+    values = array('h')
+    values.frombytes(zlib.decompress(data[HEADER.size:]))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    weights = {}
+    offset = 0
+    for s in range(STAGES):
+        tables = []
+        for name, cells in PATTERNS:
+            tables.append(values[offset:offset + 3 ** len(cells)])
+            offset += 3 ** len(cells)
+        weights[s] = (tables, list(values[offset:offset + len(FEATURES)]))
+        offset += len(FEATURES)
+    if offset != len(values):
+        raise ValueError("%s has %d weights, expected %d" % (filename, len(values), offset))
+    return weights
+
+
+def write_weights(weights, filename=WEIGHTS_FILE):
+    # weights as returned by read_weights (lists of ints are fine too)
+    values = array('h')
+    for s in range(STAGES):
+        tables, features = weights[s]
+        for table in tables:
+            values.extend(table)
+        values.extend(features)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, SIZE, STAGES, SCALE))
+        f.write(zlib.compress(values.tobytes(), 9))
+
+
+_patterns = None
+_default_weights = None
+
+
+def get_patterns():
+    global _patterns
+    if _patterns is None:
+        _patterns = Patterns()
+    return _patterns
+
+
+def load_default_weights():
+    global _default_weights
+    if _default_weights is None:
+        _default_weights = read_weights()
+    return _default_weights
+
+
+class PatternEvaluator:
+    # The evaluation.py interface for 8x8 boards; other sizes get the plain disc difference.
+
+    def __init__(self, weights=None):
+        self.patterns = get_patterns()
+        self.weights = load_default_weights() if weights is None else weights
+        self.batch_weights = None  # the weights as NumPy arrays, made by the first evaluate_batch
+        # lookup[side][stage]: one table per instance, read with X's indices; side 1 (O to move)
+        # has each table with the colours swapped, so O's discs count as own
+        self.lookup = [[], []]
+        self.features = []
+        for s in range(STAGES):
+            tables, features = self.weights[s]
+            swapped = [array('h', [table[j] for j in _swap_permutation(len(cells))])
+                       for table, (name, cells) in zip(tables, PATTERNS)]
+            self.lookup[0].append([tables[number] for number, squares in self.patterns.instances])
+            self.lookup[1].append([swapped[number] for number, squares in self.patterns.instances])
+            self.features.append(features)
+
+    def _score(self, indices, side, own, opp):
+        discs = bitboard_ops.popcount(own | opp)
+        s = stage(discs)
+        mobility, parity, constant = self.features[s]
+        total = sum(map(getitem, self.lookup[side][s], indices))
+        total += mobility * self.patterns.potential_mobility(own, opp) + constant
+        if discs & 1:  # an odd number of empty squares
+            total += parity
+        return (total + SCALE // 2) // SCALE
+
+    def evaluate(self, own, opp):
+        # the indices are read as X to move
+        return self._score(self.patterns.indices(own, opp), 0, own, opp)
+
+    def evaluate_board(self, board, symbol):
+        x_bits, o_bits = board.get_bitboards()
+        if board.get_size() != SIZE:
+            own, opp = (x_bits, o_bits) if symbol == 'X' else (o_bits, x_bits)
+            return bitboard_ops.popcount(own) - bitboard_ops.popcount(opp)
+        tracker = None
+        for listener in board.get_listeners():
+            if isinstance(listener, PatternIndices):
+                tracker = listener
+                break
+        if tracker is None:
+            tracker = PatternIndices(self.patterns, x_bits, o_bits)
+            board.add_listener(tracker)
+        if symbol == 'X':
+            return self._score(tracker.indices, 0, x_bits, o_bits)
+        return self._score(tracker.indices, 1, o_bits, x_bits)
+
+    def evaluate_batch(self, boards):
+        import numpy as np
+
+        if self.batch_weights is None:
+            self.batch_weights = {s: ([np.asarray(table, dtype=np.int64) for table in tables], features)
+                                  for s, (tables, features) in self.weights.items()}
+        features = batch_features(boards)
+        scores = np.zeros(len(boards), dtype=np.int64)
+        for s in range(STAGES):
+            rows = features['stage'] == s
+            if rows.any():
+                scores[rows] = _predict(self.batch_weights[s], features, rows)
+        return (scores + SCALE // 2) // SCALE
+
+
+# Fitting, with NumPy
+
+def _digits(boards):
+    # (n, 2) uint64 [own, opp] -> (n, 64) base-3 digits, own 1 and opponent 2
+    import numpy as np
+
+    def unpack(bits):
+        return np.unpackbits(bits.astype('<u8').view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    return unpack(boards[:, 0]).astype(np.int32) + 2 * unpack(boards[:, 1]).astype(np.int32)
+
+
+def batch_features(boards):
+    """
+    :param boards: (n, 2) uint64 [own, opp], as from evaluation.pack_boards
+    :returns: {'indices': [(pattern number, (n, instances of it) indices)], 'mobility', 'parity', 'stage'}
+    """
+    import numpy as np
+
+    patterns = get_patterns()
+    digits = _digits(boards)
+    indices = []
+    for number, (name, cells) in enumerate(PATTERNS):
+        squares = np.array([squares for n, squares in patterns.instances if n == number])
+        index = np.zeros((len(boards), len(squares)), dtype=np.int32)
+        for k in range(len(cells)):
+            index += digits[:, squares[:, k]] * 3 ** k
+        indices.append((number, index))
+    own = (digits == 1).reshape(-1, SIZE, SIZE)
+    opp = (digits == 2).reshape(-1, SIZE, SIZE)
+    empty = (digits == 0).reshape(-1, SIZE, SIZE)
+    discs = (digits != 0).sum(axis=1)
+    return {
+        'indices': indices,
+        'mobility': (_near(opp) & empty).sum(axis=(1, 2)) - (_near(own) & empty).sum(axis=(1, 2)),
+        'parity': (SIZE * SIZE - discs) & 1,
+        'stage': np.minimum((discs - 4) * STAGES // 61, STAGES - 1),
+    }
+
+
+def _near(discs):
+    # (n, 8, 8) bools -> squares next to a disc in any of the 8 directions
+    import numpy as np
+
+    padded = np.pad(discs, ((0, 0), (1, 1), (1, 1)))
+    near = np.zeros_like(discs)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            if dx or dy:
+                near |= padded[:, 1 + dx:1 + dx + SIZE, 1 + dy:1 + dy + SIZE]
+    return near
+
+
+def _predict(stage_weights, features, rows):
+    # unrounded scores in 1/SCALE discs for the rows of one stage; the tables as NumPy arrays
+    import numpy as np
+
+    tables, (mobility, parity, constant) = stage_weights
+    total = np.zeros(int(rows.sum()), dtype=np.int64)
+    for number, indices in features['indices']:
+        total += tables[number][indices[rows]].sum(axis=1)
+    total += mobility * features['mobility'][rows] + parity * features['parity'][rows] + constant
+    return total
+
+
+def collect(games, seed=0, epsilon=0.25):
+    """
+    Self-play with reversi/batch_selfplay.py, every policy pairing with epsilon random moves.
+    :returns: ((n, 2) uint64 positions as [own, opp], (n,) final disc difference for the side to move)
+    """
+    import numpy as np
+    from reversi import batch_selfplay
+
+    positions = []
+    outcomes = []
+    pairings = [(x, o) for x in batch_selfplay.POLICIES for o in batch_selfplay.POLICIES]
+    for number, (x_policy, o_policy) in enumerate(pairings):
+        seen = []
+
+        def record(game_ids, own, opp, x_to_move):
+            seen.append((game_ids, np.stack([own, opp], axis=1), x_to_move.copy()))
+
+        count = games // len(pairings)
+        x_discs, o_discs, plies = batch_selfplay.play_batch(count, x_policy, o_policy, SIZE, seed + number,
+                                                            epsilon, record)
+        difference = x_discs.astype(np.int64) - o_discs.astype(np.int64)
+        for game_ids, boards, x_to_move in seen:
+            positions.append(boards)
+            outcomes.append(np.where(x_to_move, difference[game_ids], -difference[game_ids]))
+    return np.concatenate(positions), np.concatenate(outcomes)
+
+
+def _mirrors(cells):
+    # index maps for the transforms that take the pattern onto its own squares in a different order
+    import numpy as np
+
+    cells = [tuple(cell) for cell in cells]
+    digits = np.arange(3 ** len(cells))[:, None] // 3 ** np.arange(len(cells)) % 3
+    maps = []
+    for t in symmetry.TRANSFORMS:
+        image = [tuple(symmetry.transform_position(cell, t, SIZE)) for cell in cells]
+        if set(image) == set(cells) and image != cells:
+            # digit k moves to the position of image[k] in the pattern's own order
+            powers = 3 ** np.array([cells.index(square) for square in image])
+            maps.append((digits * powers).sum(axis=1))
+    return maps
+
+
+def fit(positions, outcomes, sweeps=30, regularization=4.0):
+    """
+    Least squares on the final disc difference, stage by stage, one pattern at a time: every weight
+    moves by the mean residual of the positions that use it, split between the pattern's instances.
+    :returns: weights as for write_weights
+    """
+    import numpy as np
+
+    features = batch_features(positions)
+    target = outcomes.astype(np.float64) * SCALE
+    weights = {}
+    for s in range(STAGES):
+        rows = features['stage'] == s
+        y = target[rows]
+        pattern_indices = [(number, indices[rows]) for number, indices in features['indices']]
+        linear = np.stack([features['mobility'][rows], features['parity'][rows], np.ones(len(y))], axis=1)
+        tables = [np.zeros(3 ** len(cells)) for name, cells in PATTERNS]
+        mirrors = [_mirrors(cells) for name, cells in PATTERNS]
+        coefficients = np.zeros(len(FEATURES))
+        prediction = np.zeros(len(y))
+        for sweep in range(sweeps):
+            for number, indices in pattern_indices:
+                table = tables[number]
+                prediction -= table[indices].sum(axis=1)
+                # each weight takes its share of the mean residual of the rows it appears in
+                residual = np.repeat(y - prediction - table[indices].sum(axis=1), indices.shape[1])
+                flat = indices.ravel()
+                sums = np.bincount(flat, weights=residual, minlength=len(table))
+                counts = np.bincount(flat, minlength=len(table))
+                table += sums / (counts + regularization) / indices.shape[1]
+                # mirror images of a symmetric pattern score alike
+                for mirror in mirrors[number]:
+                    table[:] = (table + table[mirror]) / 2
+                prediction += table[indices].sum(axis=1)
+            prediction -= linear @ coefficients
+            coefficients = np.linalg.lstsq(linear, y - prediction, rcond=None)[0]
+            prediction += linear @ coefficients
+        error = np.sqrt(np.mean((y - prediction) ** 2)) / SCALE
+        print("stage %d: %d positions, rms error %.2f discs" % (s, len(y), error))
+        weights[s] = ([np.clip(np.rint(table), -32767, 32767).astype(int).tolist() for table in tables],
+                      np.clip(np.rint(coefficients), -32767, 32767).astype(int).tolist())
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the pattern evaluator's weights.")
+    subparsers = parser.add_subparsers(dest="command")
+    collect_parser = subparsers.add_parser("collect", help="play self-play games and save their positions")
+    collect_parser.add_argument("samples")
+    collect_parser.add_argument("--games", type=int, default=20000)
+    collect_parser.add_argument("--epsilon", type=float, default=0.25)
+    collect_parser.add_argument("--seed", type=int, default=0)
+    fit_parser = subparsers.add_parser("fit", help="fit weights to saved positions and write them")
+    fit_parser.add_argument("samples")
+    fit_parser.add_argument("--sweeps", type=int, default=30)
+    fit_parser.add_argument("--output", default=WEIGHTS_FILE)
+    args = parser.parse_args()
+
+    import numpy as np
+
+    if args.command == "collect":
+        positions, outcomes = collect(args.games, args.seed, args.epsilon)
+        np.savez_compressed(args.samples, positions=positions, outcomes=outcomes)
+        print(len(positions), "positions")
+    elif args.command == "fit":
+        samples = np.load(args.samples)
+        write_weights(fit(samples['positions'], samples['outcomes'], args.sweeps), args.output)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,158 +1,474 @@
-
-import random
 import copy
 import heapq
+import math
+import threading
+import time
+
+from reversi import bitboard as bitboard_ops
+from reversi import endgame
+from reversi import opening_book
+from reversi import parallel_search
+from reversi import probcut
+from reversi import symmetry
+from reversi import zobrist
+from reversi.transposition_table import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
 
 """
 Minimax player implementation
 """
 
+INFINITY = 10000
+ASPIRATION_WINDOW = 4  # discs either side of the previous iteration's score
+SYMMETRIC_PLIES = 4  # with symmetric_table, nodes this close to the root get canonical table keys
+
+
+class SearchTimeout(Exception):
+    # raised inside the search when a timed get_move runs out of time
+    pass
+
 
 class MinimaxPlayerG3:
 
-    def __init__(self, symbol, max_depth=3, ab_pruning=True, transposition_table=True,beam_search_enabled=True,move_ordering_enabled=True):
+    def __init__(self, symbol, max_depth=3, ab_pruning=True, transposition_table=True,beam_search_enabled=True,move_ordering_enabled=True,table_size=2**16,symmetric_table=False,time_limit=None,killer_moves=False,probcut_enabled=False,probcut_threshold=1.5,endgame_empties=0,book_enabled=False,ponder=False,workers=1,evaluator=None,batch_eval=False):
         self.symbol = symbol
         self.max_depth=max_depth
         self.ab_pruning=ab_pruning
         self.transposition_table=transposition_table
         self.beam_search_enabled=beam_search_enabled
         self.move_ordering_enabled=move_ordering_enabled
-        self.seen_boards = {}
+        # share table entries between positions that are rotations/reflections of each other, in the
+        # first SYMMETRIC_PLIES plies of the search only: a canonical key costs a hash of the whole
+        # board under all 8 transforms, where the plain key is kept up to date by the board
+        self.symmetric_table=symmetric_table
+        # values are stored for the side to move, and the key includes the side to move,
+        # so the table stays valid from one move to the next
+        self.table_size = table_size
+        self.table = TranspositionTable(table_size)
+        # seconds per move; when set, get_move deepens one ply at a time until the time runs out, and
+        # max_depth is not used
+        self.time_limit=time_limit
+        self.deadline = None
+        self.completed_depth = 0
+        self.nodes = 0
+        # move ordering: two killer moves per ply, and a history score per side and square
+        # that grows every time a move causes a cutoff or comes out best.
+        # Killers are off by default: with the disc-count eval they cost more cutoffs than they win
+        self.killer_moves=killer_moves
+        self.killers = []
+        self.history = {}
+        # selective search: cut nodes where a shallow search says the deep one will fall outside the
+        # window, with probcut_threshold standard deviations of confidence (see reversi/probcut.py).
+        # Only null-window nodes are cut, and not with an evaluator: the cut thresholds were fitted on
+        # disc-count search values
+        self.probcut_enabled=probcut_enabled
+        self.probcut_threshold=probcut_threshold
+        self.probcut_model = None
+        self.probcut_cuts = 0
+        # with this many empty squares or fewer, solve the rest of the game exactly instead of
+        # searching to max_depth with eval_board (0 turns it off)
+        self.endgame_empties=endgame_empties
+        self.endgame_solver = None
+        # play the first moves straight from the opening book when the position is in it
+        # (see reversi/opening_book.py)
+        self.book_enabled=book_enabled
+        # keep searching in a background thread while the opponent thinks: the position after the
+        # predicted reply if the table has one, otherwise the opponent's position (all replies).
+        # Results go into the same transposition table, so ponder needs transposition_table.
+        # The thread searches with its own copy of this player (ponderer) that shares only the table,
+        # so its nodes, history and killers stay out of get_move's; ponder_nodes counts its nodes.
+        # It only gains time the opponent doesn't use: an opponent in this process would lose the GIL
+        # to it, and its clock with it, so ReversiGame stops the ponder before a computer player moves.
+        # Pondering pays off against a human, or an engine in another process
+        if ponder and not transposition_table:
+            raise ValueError("ponder needs transposition_table: without one the ponder search is thrown away")
+        self.ponder=ponder and workers == 1  # the helper processes below only follow get_move's search
+        self.ponder_thread = None
+        self.ponderer = None
+        self.ponder_move = None  # the reply being pondered, or None when pondering all replies
+        self.ponder_result = None  # (board hash, best move, completed depth, score) of a finished ponder
+        self.ponder_error = None  # what killed the ponder thread, raised again by stop_pondering
+        self.ponder_hits = 0
+        self.ponder_nodes = 0
+        # search processes, counting this one: more than one starts helper processes that search the
+        # same root through a shared table, or split the root moves if there's no table
+        # (see reversi/parallel_search.py). 1 searches in this process only
+        self.workers=workers
+        self.parallel = None
+        # leaf evaluation: an evaluator from reversi/evaluation.py instead of eval_board's disc count,
+        # and with batch_eval the children of every node one ply above the leaves are scored in one
+        # evaluate_batch call (needs NumPy)
+        self.evaluator=evaluator
+        self.batch_eval=batch_eval
+        if batch_eval and evaluator is None:
+            from reversi import evaluation
+            self.evaluator = evaluation.DiscCountEvaluator()
 
     def get_move(self, board):
         # print('-'*10)
+        pondered = self.stop_pondering()
+        self.nodes = 0  # nodes counts this move's search, so none for a book move
+        if self.book_enabled:
+            book = opening_book.load_default_book(board.get_size())
+            if book is not None:
+                book_move = book.lookup(board, self.symbol)
+                if book_move is not None:
+                    return book_move
         valid_moves = board.calc_valid_moves(self.symbol) #all valid moves
-        max_node = {} #dictionary of moves to their values
-        ab_val = -10000
-
-        #for each move, call minimax and get the evaluation
-        #store in dictionary max node (key is move, value is value)
-        for i in range(len(valid_moves)):
-            board2 = copy.deepcopy(board)
-            board2.make_move(self.symbol, valid_moves[i])
-
-            if self.transposition_table and self.in_transposition_table(board2)  is not None: #already seen board state
-                move_val = self.seen_boards[tuple(map(tuple, board2._board))]
-                ab_val = max(ab_val, move_val)
-                max_node[tuple(valid_moves[i])] = move_val
-            else: #if the board state hasn't been seen
-                move_val = self.minimax(board2, self.max_depth, 1, False, ab_val)
-                ab_val = max(ab_val, move_val)
-                max_node[tuple(valid_moves[i])] = move_val
-                if self.transposition_table:
-                    self.seen_boards[tuple(map(tuple, board._board))] = move_val
-        # find the node with the highest max val, return it
-        max_val = max_node.get(tuple(valid_moves[0]))
-        max_val_key = tuple(valid_moves[0])  # the key that matches with the highest value
-        for x in max_node:
-            if max_node.get(x) > max_val:
-                max_val = max_node.get(x)
-                max_val_key = x
-        return max_val_key
-
-    # returns value of a node (move)
-
-
-    def minimax(self, board, max_depth, current_depth, my_turn, parent_ab_val):
-        # print(' '*current_depth+"*")
-        if my_turn:
-            move_list = board.calc_valid_moves(self.symbol)
-            ab_val = -10000
-
-            if not board.game_continues():
-                return self.eval_board(board)
-
-            if current_depth == max_depth:  # deep as can go
-                return self.eval_board(board)
-
-            if len(move_list) == 0:  # end of tree or invalid move
-                return self.minimax(board, max_depth, current_depth + 1, False, ab_val)
-
-            if self.beam_search_enabled:
-                beam_search_moves=self.beam_search(board,2,move_list,self.symbol)
-            elif self.move_ordering_enabled:
-                beam_search_moves=self.beam_search(board,len(move_list),move_list,self.symbol)
-            else:
-                beam_search_moves=move_list
-            # preallocate the list for speed
-            values = [None]*len(beam_search_moves)
-            for i in range(len(beam_search_moves)):
-                board2 = copy.deepcopy(board)
-                board2.make_move(self.symbol, beam_search_moves[i])
-                if self.transposition_table and self.in_transposition_table(board2) is not None:
-                    val = self.seen_boards[tuple(map(tuple, board2._board))]
+        self.prepare_search(board)
+        if self.endgame_empties and board.get_empty_count() <= self.endgame_empties:
+            return self.endgame_solver.best_move(board, self.symbol)[0]
+        # a ponder on this exact position already did the first iterations
+        if pondered is not None and pondered[0] != board.get_hash():
+            pondered = None
+        if self.workers > 1 and self.parallel is None:
+            self.parallel = parallel_search.ParallelSearch(self, self.workers)
+        lazy_smp = self.parallel is not None and self.parallel.mode == parallel_search.LAZY_SMP
+        if lazy_smp:
+            self.parallel.start_helpers(board, valid_moves)
+        try:
+            if self.time_limit is None:
+                if pondered is not None and pondered[2] >= self.max_depth:
+                    best_move = pondered[1]
                 else:
-                    val = self.minimax(board2, max_depth, current_depth + 1, False, ab_val)
-                # AB pruning
-                # if one of our children is less than our parent's AB, then we'll pick it or worse,
-                # and our parent node doesn't care about us
-                # my we're a dysfunctional family
-                if val > parent_ab_val and self.ab_pruning:
-                    # print("pruned")
-                    return val
-                ab_val = max(ab_val, val)
-                values[i]=val
-                if self.transposition_table:
-                    self.seen_boards[tuple(map(tuple, board._board))] = val
-            return max(values)
-
-
+                    best_move = self.search_root(board, self.max_depth, valid_moves)[0]
+            else:
+                self.set_deadline(time.perf_counter() + self.time_limit)
+                best_move = self.iterative_deepening(board, self.symbol, valid_moves, pondered)[0]
+        finally:
+            if lazy_smp:
+                self.parallel.finish()
+        if self.ponder:
+            self.start_pondering(board, best_move)
+        return best_move
+
+    def prepare_search(self, board):
+        # per-move setup before searching board
+        self.nodes = 0
+        self.reset_ordering(board)
+        if self.probcut_enabled and (self.probcut_model is None or self.probcut_model.size != board.get_size()):
+            self.probcut_model = probcut.load_model(board.get_size())
+        if self.endgame_empties:
+            if self.endgame_solver is None or self.endgame_solver.size != board.get_size():
+                self.endgame_solver = endgame.EndgameSolver(board.get_size())
+            self.endgame_solver.deadline = None
+
+    def iterative_deepening(self, board, symbol, valid_moves, start=None, first_depth=1):
+        # search one ply deeper each time, trying the last best move first, and when the deadline
+        # passes return the best move and score of the last search that finished.
+        # start is a pondered (hash, best move, depth, score) to carry on from
+        self.completed_depth = 0
+        start_move_count = board.get_move_count()
+        best_move = tuple(valid_moves[0])
+        score = None
+        if start is not None:
+            best_move, self.completed_depth, score = start[1:]
+        empties = board.get_size() ** 2 - sum(board.calc_scores().values())
+        try:
+            for depth in range(max(self.completed_depth + 1, first_depth), empties + 1):
+                ordered_moves = [list(best_move)] + [move for move in valid_moves if tuple(move) != best_move]
+                best_move, score = self.aspiration_search(board, depth, ordered_moves, score, symbol)
+                self.completed_depth = depth
+        except (SearchTimeout, endgame.SolveTimeout):
+            # put back the moves the aborted search was in the middle of
+            while board.get_move_count() > start_move_count:
+                board.undo_move()
+        finally:
+            self.set_deadline(None)
+        return best_move, score
+
+    def set_deadline(self, deadline):
+        self.deadline = deadline
+        if self.endgame_solver is not None:
+            self.endgame_solver.deadline = deadline
+
+    def start_pondering(self, board, move):
+        # board is get_move's own copy, so the thread can keep it
+        opponent = board.get_opponent_symbol(self.symbol)
+        board.make_move(self.symbol, move)
+        self.ponder_move = None
+        key, transform = self.table_key(board, opponent, 1)
+        entry = self.table.probe(key)
+        if entry is not None and entry[3] is not None:
+            reply = symmetry.transform_position(entry[3], symmetry.inverse(transform), board.get_size())
+            board.make_move(opponent, reply)
+            if board.calc_valid_moves(self.symbol):
+                self.ponder_move = tuple(reply)
+            else:
+                board.undo_move()
+        symbol = self.symbol if self.ponder_move is not None else opponent
+        valid_moves = board.calc_valid_moves(symbol)
+        if not valid_moves:
+            return
+        ponderer = copy.copy(self)
+        ponderer.nodes = 0
+        ponderer.probcut_cuts = 0
+        ponderer.history = {side: list(scores) for side, scores in self.history.items()}
+        ponderer.killers = [list(killers) for killers in self.killers]
+        ponderer.set_deadline(math.inf)
+        self.ponderer = ponderer
+        self.ponder_result = None
+        self.ponder_thread = threading.Thread(target=self.ponder_search, args=(board, symbol, valid_moves), daemon=True)
+        self.ponder_thread.start()
+
+    def ponder_search(self, board, symbol, valid_moves):
+        # a timeout is the normal end of a ponder; anything else is kept for stop_pondering to raise
+        try:
+            best_move, score = self.ponderer.iterative_deepening(board, symbol, valid_moves)
+        except Exception as error:
+            self.ponder_error = error
+            return
+        depth = self.ponderer.completed_depth
+        if self.ponder_move is not None and depth > 0:
+            self.ponder_result = (board.get_hash(), best_move, depth, score)
+
+    def stop_pondering(self):
+        """
+        :returns: the (board hash, best move, completed depth, score) of the predicted-reply ponder, or None
+        :raises Exception: whatever stopped the ponder search, other than running out of time
+        """
+        if self.ponder_thread is None:
+            return None
+        self.ponderer.set_deadline(0)  # the ponder search times out at its next check
+        self.ponder_thread.join()
+        self.ponder_thread = None
+        self.ponder_nodes += self.ponderer.nodes
+        self.ponderer.set_deadline(None)
+        self.ponderer = None
+        error, self.ponder_error = self.ponder_error, None
+        if error is not None:
+            self.ponder_result = None
+            raise error
+        return self.ponder_result
+
+    def opponent_moved(self, move):
+        # called by ReversiGame with the opponent's move: a ponder on another reply is wasted work
+        if self.ponder_thread is None:
+            return
+        if self.ponder_move is not None and tuple(move) == self.ponder_move:
+            self.ponder_hits += 1
         else:
-            move_list = board.calc_valid_moves(board.get_opponent_symbol(self.symbol))
-            ab_val = 10000
-
-            if not board.game_continues():
-                return self.eval_board(board)
-
-            if current_depth == max_depth:  # deep as can go
-                return self.eval_board(board)
-
-            if len(move_list) == 0:  # end of tree or invalid move
-                return self.minimax(board, max_depth, current_depth + 1, True, ab_val)
-
-            if self.beam_search_enabled:
-                beam_search_moves=self.beam_search(board,2,move_list,board.get_opponent_symbol(self.symbol))
-            elif self.move_ordering_enabled:
-                beam_search_moves=self.beam_search(board,len(move_list),move_list,board.get_opponent_symbol(self.symbol))
+            self.stop_pondering()
+
+    def game_over(self):
+        self.stop_pondering()
+
+    def aspiration_search(self, board, depth, valid_moves, previous_score, symbol=None):
+        # search a narrow window around the last iteration's score first,
+        # and only pay for the full window if the score falls outside it
+        if previous_score is None or not self.ab_pruning:
+            return self.search_root(board, depth, valid_moves, symbol=symbol)
+        alpha = previous_score - ASPIRATION_WINDOW
+        beta = previous_score + ASPIRATION_WINDOW
+        best_move, score = self.search_root(board, depth, valid_moves, alpha, beta, symbol)
+        if score <= alpha or score >= beta:
+            best_move, score = self.search_root(board, depth, valid_moves, symbol=symbol)
+        return best_move, score
+
+    def search_root(self, board, depth, valid_moves, alpha=-INFINITY, beta=INFINITY, symbol=None):
+        # returns the best move (as a tuple) and its value for symbol (this player by default)
+        symbol = symbol or self.symbol
+        if self.parallel is not None and self.parallel.mode == parallel_search.ROOT_SPLIT:
+            return self.parallel.split_root(board, depth, valid_moves, alpha, beta)
+        return self.search_moves(board, depth, valid_moves, alpha, beta, symbol)
+
+    def search_moves(self, board, depth, valid_moves, alpha, beta, symbol):
+        opponent = board.get_opponent_symbol(symbol)
+        best_move = tuple(valid_moves[0])
+        best_val = -INFINITY
+        for i in range(len(valid_moves)):
+            board.make_move(symbol, valid_moves[i])
+            val = -self.search_child(board, depth - 1, alpha, beta, opponent, i == 0, 1)
+            board.undo_move()
+            if val > best_val:
+                best_val = val
+                best_move = tuple(valid_moves[i])
+            if self.ab_pruning:
+                alpha = max(alpha, val)
+                if alpha >= beta:
+                    break
+        return best_move, best_val
+
+    # returns value of a node for the side to move (symbol)
+
+    def negamax(self, board, depth, alpha, beta, symbol, ply):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 255 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if self.endgame_empties and board.get_empty_count() <= self.endgame_empties:
+            return self.endgame_solver.solve_board(board, symbol, alpha, beta)
+        opponent = board.get_opponent_symbol(symbol)
+        # Move records, so ordering and make_move share the flips; a leaf only needs to know if there are any
+        move_list = board.generate_moves(symbol) if depth > 0 else board.calc_valid_moves(symbol)
+
+        if len(move_list) == 0:
+            if len(board.calc_valid_moves(opponent)) == 0:  # game over
+                return self.final_score(board, symbol)
+            if depth == 0:
+                return self.eval_for(board, symbol)
+            # we have to pass
+            return -self.negamax(board, depth - 1, -beta, -alpha, opponent, ply + 1)
+
+        if depth == 0:  # deep as can go
+            return self.eval_for(board, symbol)
+
+        original_alpha = alpha
+        table_move = None
+        if self.transposition_table:
+            key, transform = self.table_key(board, symbol, ply)
+            entry = self.table.probe(key)
+            if entry is not None and entry[3] is not None:
+                table_move = symmetry.transform_position(entry[3], symmetry.inverse(transform), board.get_size())
+            if entry is not None and entry[0] >= depth:  # only trust entries searched at least this deep
+                value, flag = entry[1], entry[2]
+                if flag == EXACT:
+                    return value
+                if self.ab_pruning:
+                    if flag == LOWER_BOUND:
+                        alpha = max(alpha, value)
+                    elif flag == UPPER_BOUND:
+                        beta = min(beta, value)
+                    if alpha >= beta:
+                        return value
+
+        if self.probcut_enabled and self.ab_pruning and beta - alpha == 1 and self.evaluator is None:
+            cut = self.probcut_cut(board, depth, alpha, beta, symbol, ply)
+            if cut is not None:
+                return cut
+
+        moves = self.order_moves(board, move_list, symbol, ply, table_move)
+        values = None
+        if depth == 1 and self.batch_eval and not (self.endgame_empties and board.get_empty_count() <= self.endgame_empties + 1):
+            values = self.evaluate_children(board, moves, symbol)
+        best_val = -INFINITY
+        best_move = moves[0].position
+        for i in range(len(moves)):
+            if values is not None:
+                val = values[i]
+            else:
+                board.make_move(symbol, moves[i])
+                val = -self.search_child(board, depth - 1, alpha, beta, opponent, i == 0, ply + 1)
+                board.undo_move()
+            if val > best_val:
+                best_val = val
+                best_move = moves[i].position
+            if self.ab_pruning:
+                alpha = max(alpha, val)
+                if alpha >= beta:  # our opponent already has something better than this, stop looking
+                    self.record_cutoff(board, moves[i].position, symbol, ply, depth)
+                    break
+        if self.ab_pruning and best_val > original_alpha and best_val < beta:  # best move of a PV node
+            self.record_cutoff(board, best_move, symbol, ply, depth)
+
+        if self.transposition_table:
+            if best_val <= original_alpha:
+                flag = UPPER_BOUND
+            elif best_val >= beta:
+                flag = LOWER_BOUND
             else:
-                beam_search_moves=move_list
+                flag = EXACT
+            self.store_table(board, key, depth, best_val, flag, best_move, transform)
+        return best_val
+
+    def search_child(self, board, depth, alpha, beta, symbol, first, ply):
+        # principal variation search: the first move gets the full window, the rest only have to be
+        # shown worse with a null window, and are searched again properly if they turn out better
+        if first or not self.ab_pruning:
+            return self.negamax(board, depth, -beta, -alpha, symbol, ply)
+        val = self.negamax(board, depth, -alpha - 1, -alpha, symbol, ply)
+        if alpha < -val < beta:
+            val = self.negamax(board, depth, -beta, -alpha, symbol, ply)
+        return val
+
+    def probcut_cut(self, board, depth, alpha, beta, symbol, ply):
+        # returns beta or alpha if a shallow search shows the node is almost surely outside the window
+        if self.probcut_model is None:
+            return None
+        params = self.probcut_model.get(depth, sum(board.calc_scores().values()))
+        if params is None:
+            return None
+        shallow, a, b, sigma = params
+        margin = self.probcut_threshold * sigma
+        # if the shallow value is at least bound, the deep value is very likely at least beta
+        bound = int(math.ceil((beta + margin - b) / a))
+        if bound < INFINITY and self.negamax(board, shallow, bound - 1, bound, symbol, ply) >= bound:
+            self.probcut_cuts += 1
+            return beta
+        # and if it is at most this bound, the deep value is very likely at most alpha
+        bound = int(math.floor((alpha - margin - b) / a))
+        if bound > -INFINITY and self.negamax(board, shallow, bound, bound + 1, symbol, ply) <= bound:
+            self.probcut_cuts += 1
+            return alpha
+        return None
 
-            # preallocate the list for speed
-            values = [None] * len(beam_search_moves)
-            for i in range(len(beam_search_moves)):
-                board2 = copy.deepcopy(board)
-                board2.make_move(board2.get_opponent_symbol(self.symbol), move_list[i])
+    def order_moves(self, board, move_list, symbol, ply, table_move):
+        # move_list holds Move records from board.generate_moves
+        if self.beam_search_enabled:
+            return self.beam_search(board,2,move_list,symbol)
+        if not self.move_ordering_enabled:
+            return move_list
+        # table move first, then this ply's killers, then by flips (edges count extra) with the
+        # history score breaking ties
+        size = board.get_size()
+        history = self.history[symbol]
+        killers = self.killers[ply] if self.killer_moves and ply < len(self.killers) else ()
+
+        def priority(move):
+            position = move.position
+            if position == table_move:
+                return (2, 0, 0)
+            if position in killers:
+                return (1, -killers.index(position), 0)
+            value = move.flip_count
+            if position[0] == 0 or position[0] == size - 1:
+                value *= 1.4
+            if position[1] == 0 or position[1] == size - 1:
+                value *= 1.4
+            return (0, value, history[move.square])
+        return sorted(move_list, key=priority, reverse=True)
+
+    def record_cutoff(self, board, move, symbol, ply, depth):
+        if not self.move_ordering_enabled:
+            return
+        self.history[symbol][move[0] * board.get_size() + move[1]] += depth * depth
+        if self.killer_moves and ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+    def reset_ordering(self, board):
+        squares = board.get_size() ** 2
+        # enough plies for every square to be played plus a pass for each
+        self.killers = [[None, None] for _ in range(2 * squares + 2)]
+        if len(self.history.get(self.symbol, ())) != squares:
+            self.history = {'X': [0] * squares, 'O': [0] * squares}
+        else:
+            # keep what we learned last move, but let this position's cutoffs take over
+            for symbol in self.history:
+                self.history[symbol] = [score // 2 for score in self.history[symbol]]
+
+    def table_key(self, board, symbol_to_move, ply):
+        # returns the table key and the symmetry transform it was taken under. A canonical key is the
+        # plain key of the canonical position, so entries stored either way agree
+        if self.symmetric_table and ply < SYMMETRIC_PLIES:
+            return symmetry.canonical_hash(board, symbol_to_move)
+        return board.get_hash() ^ zobrist.get_keys(board.get_size()).side_to_move(symbol_to_move), symmetry.IDENTITY
+
+    def store_table(self, board, key, depth, value, flag, best_move, transform):
+        # moves are stored in the canonical orientation
+        best_move = symmetry.transform_position(best_move, transform, board.get_size())
+        self.table.store(key, depth, value, flag, best_move)
 
-                if self.transposition_table and self.in_transposition_table(board2)  is not None:
-                    # already seen board state
-                    val = self.seen_boards[tuple(map(tuple, board2._board))]
-                else:
-                    val = self.minimax(board2, max_depth, current_depth + 1, True,ab_val)
-                # AB pruning
-                # if one of our children is less than our parent's AB, then we'll pick it or worse,
-                # and our parent node doesn't care about us
-                # my we're a dysfunctional family
-                if val < parent_ab_val and self.ab_pruning:
-                    # print("pruned")
-                    return val
-                ab_val = min(ab_val, val)
-                values[i] = val
-                if self.transposition_table:
-                    self.seen_boards[tuple(map(tuple, board._board))] = val
-
-            return min(values)
-
-    
     def beam_search(self,board,n,possible_moves,symbol):
         # if n>len(possible_moves):
         #     return possible_moves
         # else:
             moves_values_queue = []
-            for move in possible_moves:
-                value=len(board.is_valid_move(symbol, move))
-                if move[0] is 0 or move[0] is board.get_size() - 1:
+            for move in possible_moves:  # Move records from board.generate_moves
+                value=move.flip_count
+                if move.position[0] == 0 or move.position[0] == board.get_size() - 1:
                     value *= 1.4
-                if move[1] is 0 or move[1] is board.get_size() - 1:
+                if move.position[1] == 0 or move.position[1] == board.get_size() - 1:
                     value *= 1.4
                 heapq.heappush(moves_values_queue, (value, move))
             best_moves = heapq.nlargest(n, moves_values_queue)
@@ -163,6 +479,31 @@ class MinimaxPlayerG3:
 
 
 
+    def evaluate_children(self, board, moves, symbol):
+        # the value of each move for symbol, scoring all the resulting positions with one
+        # evaluate_batch call; the same values searching each child to depth 0 would give, so a
+        # child where neither side can move is worth its disc difference, as in final_score
+        from reversi import evaluation
+
+        size = board.get_size()
+        geometry = bitboard_ops.get_geometry(size)
+        x_bits, o_bits = board.get_bitboards()
+        own, opp = (x_bits, o_bits) if symbol == "X" else (o_bits, x_bits)
+        children = []
+        for move in moves:
+            # a list backend Move has its flips as a list, so those are worked out again here
+            flips = move.flips if isinstance(move.flips, int) else bitboard_ops.flip_mask(own, opp, move.square, geometry)
+            children.append((opp & ~flips, own | flips | geometry.square_bits[move.square]))
+        self.nodes += len(children)
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        values = [-value for value in self.evaluator.evaluate_batch(evaluation.pack_boards(children)).tolist()]
+        for i, (child_own, child_opp) in enumerate(children):
+            if not bitboard_ops.valid_moves_mask(child_own, child_opp, geometry) and \
+                    not bitboard_ops.valid_moves_mask(child_opp, child_own, geometry):
+                values[i] = bitboard_ops.popcount(child_opp) - bitboard_ops.popcount(child_own)
+        return values
+
     #returns how many more pieces player 1 has than player 2
     def eval_board(self, board):
         scores = board.calc_scores()
@@ -170,33 +511,19 @@ class MinimaxPlayerG3:
             return scores.get("X")-scores.get("O")
         return scores.get("O")-scores.get("X")
 
-    def rotate(self, board):
-        new_board = []
-        row = []
-        for i in range(len(board._board)):
-            row = []
-            for j in range(len(board._board)):
-                row.insert(0, board._board[j][i])
-            new_board.append(row)
-
-        board._board = new_board
-
-    def in_transposition_table(self, board):
-        #rotate and check all 4 possible perspectives
-        #return true if it was already in the transposition table
-        #false if it is new
-
-        if tuple(map(tuple, board._board)) in self.seen_boards: #actual state
-            return self.seen_boards.get(tuple(map(tuple, board._board)))
+    def eval_for(self, board, symbol):
+        # eval_board from the point of view of symbol
+        if self.evaluator is not None:
+            return self.evaluator.evaluate_board(board, symbol)
+        if symbol == self.symbol:
+            return self.eval_board(board)
+        return -self.eval_board(board)
 
-        board2 = copy.deepcopy(board)
-        for i in range(3): #equivilant states
-            self.rotate(board2)
-            #will currently check board from one perspective, rotate implementation next
-            if tuple(map(tuple, board2._board)) in self.seen_boards:
-                return self.seen_boards.get(tuple(map(tuple, board._board)))
-
-        return None
+    def final_score(self, board, symbol):
+        # a finished game is worth its disc difference, whatever the evaluator
+        if symbol == self.symbol:
+            return self.eval_board(board)
+        return -self.eval_board(board)
 
 def get_default_player(symbol):
     """
@@ -246,4 +573,29 @@ def get_combined_player(symbol):
     """
     :returns: the best combination of the minimax enhancements that your team can create
     """
-    return MinimaxPlayerG3(symbol,ab_pruning=True,beam_search_enabled=True,transposition_table=False,move_ordering_enabled=True,max_depth=7)
\ No newline at end of file
+    return MinimaxPlayerG3(symbol,ab_pruning=True,beam_search_enabled=True,transposition_table=False,move_ordering_enabled=True,max_depth=7)
+
+
+def get_book_player(symbol):
+    """
+    :returns: get_combined_player playing from the opening book of reversi/opening_book.py while the
+        position is in it
+    """
+    return MinimaxPlayerG3(symbol,ab_pruning=True,beam_search_enabled=True,transposition_table=False,move_ordering_enabled=True,max_depth=7,book_enabled=True)
+
+
+def get_pattern_player(symbol):
+    """
+    :returns: get_player_d's search with the pattern evaluator of reversi/pattern_eval.py at the leaves
+    """
+    from reversi import pattern_eval
+    return MinimaxPlayerG3(symbol, ab_pruning=True, transposition_table=False, beam_search_enabled=False,move_ordering_enabled=True,max_depth=4,evaluator=pattern_eval.PatternEvaluator())
+
+
+def get_timed_player(symbol, time_limit=2):
+    """
+    :returns: a player searching as deep as it can in time_limit seconds per move, with
+        ProbCut forward pruning instead of the fixed beam of get_combined_player, and solving
+        the last 12 empty squares exactly
+    """
+    return MinimaxPlayerG3(symbol,ab_pruning=True,beam_search_enabled=False,probcut_enabled=True,transposition_table=True,move_ordering_enabled=True,time_limit=time_limit,endgame_empties=12,book_enabled=True)
\ No newline at end of file
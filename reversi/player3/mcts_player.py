@@ -0,0 +1,194 @@
+"""
+Monte Carlo Tree Search (UCT) player.
+
+Instead of searching to a fixed depth with a disc-count heuristic, the player grows a game tree
+one leaf at a time, picking the child with the best upper confidence bound, and values each leaf
+by finishing the game with random moves (playouts). It stops when its wall-clock or playout budget
+runs out, so it gives an answer at any time, and more time only makes the answer better.
+
+Leaves are collected in batches: each selection adds a virtual loss along its path, so the next
+selection in the same batch is steered to a different part of the tree. The whole batch is then
+played out at once, several playouts per leaf, either in this process or spread over a process
+pool (workers > 1). Playouts run on raw bitboards (see reversi/bitboard.py).
+"""
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from reversi import bitboard as bitboard_ops
+
+EXPLORATION = 1.4  # UCT exploration constant
+VIRTUAL_LOSS = 1  # visits added (without wins) along a path while its playouts are pending
+
+popcount = bitboard_ops.popcount
+
+
+def playouts(own, opp, count, size, seed):
+    """
+    Plays count random games from the position, own to move.
+    :returns: total score for own: 1 per win, 0.5 per draw
+    """
+    geometry = bitboard_ops.get_geometry(size)
+    rng = random.Random(seed)
+    score = 0.0
+    for _ in range(count):
+        player, other = own, opp
+        own_to_move = True
+        passed = False
+        while True:
+            moves = bitboard_ops.valid_moves_mask(player, other, geometry)
+            if not moves:
+                if passed:
+                    break
+                passed = True
+            else:
+                passed = False
+                squares = list(bitboard_ops.iter_squares(moves))
+                square = squares[rng.randrange(len(squares))]
+                flips = bitboard_ops.flip_mask(player, other, square, geometry)
+                player |= flips | geometry.square_bits[square]
+                other &= ~flips
+            player, other = other, player
+            own_to_move = not own_to_move
+        difference = popcount(player) - popcount(other)
+        if not own_to_move:
+            difference = -difference
+        if difference > 0:
+            score += 1
+        elif difference == 0:
+            score += 0.5
+    return score
+
+
+def _playout_batch(jobs):
+    # runs in a worker process
+    return [playouts(*job) for job in jobs]
+
+
+class Node:
+    __slots__ = ('own', 'opp', 'move', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, own, opp, move, parent, geometry):
+        # own is the side to move here; wins are counted for the side that moved into this node
+        self.own = own
+        self.opp = opp
+        self.move = move  # square played to get here, None for the root or a pass
+        self.parent = parent
+        self.children = []
+        self.untried = list(bitboard_ops.iter_squares(bitboard_ops.valid_moves_mask(own, opp, geometry)))
+        if not self.untried and bitboard_ops.valid_moves_mask(opp, own, geometry):
+            self.untried = [None]  # the only move is to pass
+        self.visits = 0
+        self.wins = 0.0
+
+    def best_child(self, exploration):
+        log_visits = math.log(self.visits)
+        best, best_value = None, -1.0
+        for child in self.children:
+            value = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+
+class MCTSPlayer:
+
+    def __init__(self, symbol, time_limit=None, max_playouts=20000, workers=1, batch_size=None, leaf_playouts=4,
+                 exploration=EXPLORATION, seed=None):
+        """
+        :param time_limit: seconds per move; when set it is the budget instead of max_playouts
+        :param max_playouts: playouts per move when there is no time limit
+        :param workers: processes running playouts; 1 plays them out in this process
+        :param batch_size: leaves selected before their playouts run (default 4 per worker)
+        :param leaf_playouts: playouts per leaf, each batch runs batch_size * leaf_playouts of them
+        """
+        self.symbol = symbol
+        self.time_limit = time_limit
+        self.max_playouts = max_playouts
+        self.workers = workers
+        self.batch_size = batch_size or 4 * workers
+        self.leaf_playouts = leaf_playouts
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.executor = None
+        self.playouts = 0  # playouts run for the last move
+
+    def get_move(self, board):
+        size = board.get_size()
+        geometry = bitboard_ops.get_geometry(size)
+        x_bits, o_bits = board.get_bitboards()
+        own, opp = (x_bits, o_bits) if self.symbol == 'X' else (o_bits, x_bits)
+        root = Node(own, opp, None, None, geometry)
+        if len(root.untried) == 1:
+            return bitboard_ops.square_to_position(root.untried[0], size)
+        if self.workers > 1 and self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers)
+
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.playouts = 0
+        while True:  # at least one batch, so there is always a visited child to pick
+            leaves = [self.select(root, geometry) for _ in range(self.batch_size)]
+            jobs = [(leaf.own, leaf.opp, self.leaf_playouts, size, self.rng.getrandbits(32)) for leaf in leaves]
+            if self.executor is None:
+                scores = _playout_batch(jobs)
+            else:
+                chunk = -(-len(jobs) // self.workers)
+                batches = [jobs[i:i + chunk] for i in range(0, len(jobs), chunk)]
+                scores = [score for batch in self.executor.map(_playout_batch, batches) for score in batch]
+            for leaf, score in zip(leaves, scores):
+                self.backpropagate(leaf, score)
+            self.playouts += len(jobs) * self.leaf_playouts
+            if deadline is not None:
+                if time.perf_counter() > deadline:
+                    break
+            elif self.playouts >= self.max_playouts:
+                break
+
+        best = max(root.children, key=lambda child: child.visits)
+        return bitboard_ops.square_to_position(best.move, size)
+
+    def select(self, node, geometry):
+        # walks down by UCT to a node with an untried move, expands it, and adds a virtual loss
+        # to every node on the path
+        node.visits += VIRTUAL_LOSS
+        while not node.untried and node.children:
+            node = node.best_child(self.exploration)
+            node.visits += VIRTUAL_LOSS
+        if node.untried:
+            move = node.untried.pop(self.rng.randrange(len(node.untried)))
+            own, opp = node.own, node.opp
+            if move is not None:
+                flips = bitboard_ops.flip_mask(own, opp, move, geometry)
+                own |= flips | geometry.square_bits[move]
+                opp &= ~flips
+            child = Node(opp, own, move, node, geometry)
+            node.children.append(child)
+            node = child
+            node.visits += VIRTUAL_LOSS
+        return node
+
+    def backpropagate(self, node, score):
+        # score is for the side to move at node, out of leaf_playouts playouts
+        wins = self.leaf_playouts - score
+        while node is not None:
+            node.visits += self.leaf_playouts - VIRTUAL_LOSS
+            node.wins += wins
+            wins = self.leaf_playouts - wins
+            node = node.parent
+
+    def game_over(self):
+        # called by ReversiGame when the game ends
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def get_mcts_player(symbol, time_limit=2, workers=1):
+    """
+    :returns: an MCTS player using time_limit seconds per move
+    """
+    return MCTSPlayer(symbol, time_limit=time_limit, workers=workers)
@@ -0,0 +1,165 @@
+"""
+Multi-ProbCut forward pruning for MinimaxPlayerG3.
+
+A shallow search predicts a deep one as  deep ~= a * shallow + b  with normal error sigma.
+Before searching a node to depth d, a null-window search to the paired shallow depth checks
+whether the deep value is almost certainly outside (alpha, beta); if so the node is cut.
+a, b and sigma are fitted per depth and per game stage from logged (shallow, deep) value pairs:
+
+    python -m reversi.probcut collect samples.json --positions 300
+    python -m reversi.probcut fit samples.json
+
+fit writes the parameters to probcut_params.json next to this file, which is what players load.
+"""
+import argparse
+import json
+import math
+import os
+import random
+
+from reversi.reversi_board import ReversiBoard
+
+PARAMS_FILE = os.path.join(os.path.dirname(__file__), 'probcut_params.json')
+STAGE_DISCS = 16  # discs per game stage bucket
+MIN_SAMPLES = 20  # fewer samples than this and the fit isn't trusted
+
+
+def shallow_depth(depth):
+    # about half the depth, but with the same parity: odd and even depths see the board after
+    # different sides' moves, which skews the disc count
+    shallow = depth // 2
+    if (depth - shallow) % 2:
+        shallow += 1
+    return max(1, shallow)
+
+
+class ProbCutModel:
+
+    def __init__(self, size, pairs):
+        """
+        :param pairs: {depth: {stage: (a, b, sigma)}}
+        """
+        self.size = size
+        self.pairs = pairs
+        self.min_depth = min(pairs) if pairs else None
+
+    def get(self, depth, discs):
+        """
+        :returns: (shallow_depth, a, b, sigma) for a search of depth with discs on the board, or None
+        """
+        stages = self.pairs.get(depth)
+        if stages is None:
+            return None
+        params = stages.get(discs // STAGE_DISCS)
+        if params is None:
+            return None
+        return (shallow_depth(depth),) + tuple(params)
+
+
+def load_model(size, filename=PARAMS_FILE):
+    # returns an empty model (which never cuts) if there are no parameters for this size
+    pairs = {}
+    if os.path.exists(filename):
+        with open(filename) as f:
+            data = json.load(f).get(str(size), {})
+        for depth, stages in data.items():
+            pairs[int(depth)] = {int(stage): tuple(params) for stage, params in stages.items()}
+    return ProbCutModel(size, pairs)
+
+
+def collect(filename, positions=300, depths=(3, 4, 5, 6), size=8, seed=0):
+    # Plays random games and logs shallow and deep negamax values (for the side to move)
+    # at random positions, appending to any samples already in filename.
+    from reversi.player3.all_players import MinimaxPlayerG3, INFINITY
+
+    rng = random.Random(seed)
+    samples = []
+    if os.path.exists(filename):
+        with open(filename) as f:
+            samples = json.load(f)
+    for i in range(positions):
+        board = ReversiBoard(size)
+        symbol = 'X'
+        for ply in range(rng.randint(0, size * size - 8)):
+            moves = board.calc_valid_moves(symbol)
+            if moves:
+                board.make_move(symbol, rng.choice(moves))
+            elif not board.game_continues():
+                break
+            symbol = board.get_opponent_symbol(symbol)
+        if not board.calc_valid_moves(symbol):
+            continue
+        searcher = MinimaxPlayerG3(symbol, ab_pruning=True, transposition_table=False,
+                                   beam_search_enabled=False, move_ordering_enabled=True)
+        searcher.reset_ordering(board)
+        discs = sum(board.calc_scores().values())
+        for depth in depths:
+            shallow = searcher.negamax(board, shallow_depth(depth), -INFINITY, INFINITY, symbol, 0)
+            deep = searcher.negamax(board, depth, -INFINITY, INFINITY, symbol, 0)
+            samples.append({'size': size, 'discs': discs, 'depth': depth, 'shallow': shallow, 'deep': deep})
+        if (i + 1) % 25 == 0:
+            print(i + 1, "positions searched")
+            with open(filename, 'w') as f:
+                json.dump(samples, f)
+    with open(filename, 'w') as f:
+        json.dump(samples, f)
+    return samples
+
+
+def fit(samples):
+    """
+    Least-squares fit of deep = a * shallow + b for each (size, depth, stage).
+    :returns: {size: {depth: {stage: [a, b, sigma]}}} in the layout of probcut_params.json
+    """
+    groups = {}
+    for sample in samples:
+        key = (sample['size'], sample['depth'], sample['discs'] // STAGE_DISCS)
+        groups.setdefault(key, []).append((sample['shallow'], sample['deep']))
+    params = {}
+    for (size, depth, stage), pairs in sorted(groups.items()):
+        if len(pairs) < MIN_SAMPLES:
+            continue
+        n = len(pairs)
+        mean_x = sum(x for x, _ in pairs) / n
+        mean_y = sum(y for _, y in pairs) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in pairs)
+        if var_x == 0:
+            continue
+        a = sum((x - mean_x) * (y - mean_y) for x, y in pairs) / var_x
+        if a <= 0:
+            continue
+        b = mean_y - a * mean_x
+        sigma = math.sqrt(sum((y - a * x - b) ** 2 for x, y in pairs) / (n - 2))
+        params.setdefault(str(size), {}).setdefault(str(depth), {})[str(stage)] = \
+            [round(a, 4), round(b, 4), round(sigma, 4)]
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect search samples and fit ProbCut parameters.")
+    subparsers = parser.add_subparsers(dest='command')
+    collect_parser = subparsers.add_parser('collect')
+    collect_parser.add_argument('samples')
+    collect_parser.add_argument('--positions', type=int, default=300)
+    collect_parser.add_argument('--size', type=int, default=8)
+    collect_parser.add_argument('--seed', type=int, default=0)
+    collect_parser.add_argument('--depths', type=int, nargs='+', default=[3, 4, 5, 6])
+    fit_parser = subparsers.add_parser('fit')
+    fit_parser.add_argument('samples')
+    fit_parser.add_argument('--out', default=PARAMS_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'collect':
+        collect(args.samples, args.positions, tuple(args.depths), args.size, args.seed)
+    elif args.command == 'fit':
+        with open(args.samples) as f:
+            params = fit(json.load(f))
+        with open(args.out, 'w') as f:
+            json.dump(params, f, indent=2, sort_keys=True)
+        print(params)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,314 @@
 # adapted by Toby Dragon from original source code by Al Sweigart, available with creative commons license: https://inventwithpython.com/#donate
 import json
+from collections import namedtuple
+
+from reversi import bitboard as bitboard_ops
+from reversi import zobrist
+
+
+# A valid move as generate_moves finds it: position [x, y], square x*size + y, the discs it flips
+# (a bitboard mask, or a list of [x, y] for the list backend) and how many that is. make_move takes
+# one in place of a position and uses its flips as they are.
+Move = namedtuple('Move', ['position', 'square', 'flips', 'flip_count'])
 
 
 class ReversiBoard:
 
-    def __init__(self, size=8, board_filename=None):
+    def __init__(self, size=8, board_filename=None, bitboard=True):
+        # bitboard=True keeps the position as two int masks (see reversi/bitboard.py),
+        # bitboard=False keeps the original list of lists of 'X'/'O'/' '.
         if board_filename is None:
-            self._board = _getNewBoard(size)
+            cells = _getNewBoard(size)
+        else:
+            cells = _board_from_json(board_filename)
+        self._bitboard = bitboard
+        self._size = len(cells)
+        self._history = []  # undo stack of the moves made with make_move
+        self._listeners = []  # see add_listener
+        self._zobrist = zobrist.get_keys(self._size)
+        self._hash = self._zobrist.hash_cells(cells)
+        self._counts = _getScoreOfBoard(cells)  # discs per symbol, kept up to date by make_move/undo_move
+        self._move_masks = {}  # symbol: valid moves mask for this position, filled in as they're asked for
+        self._shared = False  # see snapshot
+        if bitboard:
+            self._geometry = bitboard_ops.get_geometry(self._size)
+            self._bits = _bits_from_cells(cells)
         else:
-            self._board = _board_from_json(board_filename)
+            self._cells = cells
+            # the list backend only looks for moves on the frontier: empty squares next to a disc
+            self._rays = _getRayTable(self._size)
+            self._frontier = _frontierOf(cells, self._rays)
+
+    @property
+    def _board(self):
+        # The position as a list of lists. For the bitboard backend this is a fresh copy.
+        if self._bitboard:
+            return _cells_from_bits(self._bits, self._size)
+        if self._shared:  # the caller may change the lists, so they have to be this board's own
+            self._fork()
+        return self._cells
+
+    @_board.setter
+    def _board(self, cells):
+        self._size = len(cells)
+        self._history = []
+        self._listeners = []
+        self._zobrist = zobrist.get_keys(self._size)
+        self._hash = self._zobrist.hash_cells(cells)
+        self._counts = _getScoreOfBoard(cells)
+        self._move_masks = {}
+        self._shared = False
+        if self._bitboard:
+            self._geometry = bitboard_ops.get_geometry(self._size)
+            self._bits = _bits_from_cells(cells)
+        else:
+            self._cells = cells
+            # the list backend only looks for moves on the frontier: empty squares next to a disc
+            self._rays = _getRayTable(self._size)
+            self._frontier = _frontierOf(cells, self._rays)
+
+    def __getstate__(self):
+        # copies and pickles start without listeners: they track this board, not the copy.
+        # The ray table is shared by every board of the size, so it isn't copied either
+        state = self.__dict__.copy()
+        state['_listeners'] = []
+        state['_shared'] = False
+        state.pop('_rays', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if not self._bitboard:
+            self._rays = _getRayTable(self._size)
+
+    def __deepcopy__(self, memo):
+        # the copy takes its own copy of the position straight away, so unlike snapshot this board
+        # isn't marked shared; the per-size tables (geometry, Zobrist keys, rays) are shared rather than copied
+        board = object.__new__(ReversiBoard)
+        board.__dict__.update(self.__dict__)
+        board._listeners = []
+        board._fork()
+        return board
+
+    def snapshot(self):
+        """
+        A copy of the board that is cheap to make: it shares the position with this board until either
+        of them changes, and whichever changes first (make_move, undo_move, or handing out the list
+        backend's lists through _board) copies what it changes first, so neither can alter the other.
+        ReversiGame gives every player a snapshot.
+        :returns: the new board, without this board's listeners
+        """
+        board = object.__new__(ReversiBoard)
+        board.__dict__.update(self.__dict__)
+        board._listeners = []
+        board._shared = True
+        self._shared = True
+        return board
+
+    def _fork(self):
+        # copy-on-write: gives this board its own copy of everything make_move and undo_move change
+        self._history = list(self._history)
+        self._counts = dict(self._counts)
+        self._move_masks = dict(self._move_masks)
+        if self._bitboard:
+            self._bits = dict(self._bits)
+        else:
+            self._cells = [row[:] for row in self._cells]
+            self._frontier = set(self._frontier)
+        self._shared = False
+
+    def add_listener(self, listener):
+        """
+        Keeps listener up to date with the moves made on the board: make_move calls
+        listener.on_move(symbol, placed, flips) and undo_move calls listener.on_undo(symbol, placed, flips),
+        with placed and flips as bitboard masks (see reversi/bitboard.py). Setting _board drops the listeners.
+        """
+        self._listeners.append(listener)
+
+    def get_listeners(self):
+        return self._listeners
 
     def draw_board(self):
         _drawBoard(self._board)
 
     def is_valid_move(self, symbol, position):
-        return _isValidMove(self._board, symbol, position[0], position[1])
+        if self._bitboard:
+            flips = self._flip_mask(symbol, position)
+            if not flips:
+                return False
+            return [bitboard_ops.square_to_position(sq, self._size) for sq in bitboard_ops.iter_squares(flips)]
+        # walks the rays rather than calling _isValidMove, which writes to the (maybe shared) lists
+        x, y = position[0], position[1]
+        if not _isOnBoard(x, y, self._size) or self._cells[x][y] != ' ':
+            return False
+        return self._flips(symbol, x, y) or False
+
+    def count_flips(self, symbol, position):
+        # how many discs the move would flip (0 if it is not valid), without building the list
+        if self._bitboard:
+            return bitboard_ops.popcount(self._flip_mask(symbol, position))
+        tiles_to_flip = self.is_valid_move(symbol, position)
+        if tiles_to_flip == False:
+            return 0
+        return len(tiles_to_flip)
 
     def calc_scores(self):
-        return _getScoreOfBoard(self._board)
+        return dict(self._counts)
+
+    def generate_moves(self, symbol):
+        """
+        :returns: a Move for each valid move of symbol, in calc_valid_moves order
+        """
+        size = self._size
+        if self._bitboard:
+            own = self._bits[symbol]
+            opp = self._bits[self.get_opponent_symbol(symbol)]
+            moves = []
+            for square in bitboard_ops.iter_squares(self._valid_moves_mask(symbol)):
+                flips = bitboard_ops.flip_mask(own, opp, square, self._geometry)
+                moves.append(Move([square // size, square % size], square, flips, bitboard_ops.popcount(flips)))
+            return moves
+        moves = []
+        for x, y in sorted(self._frontier):
+            flips = self._flips(symbol, x, y)
+            if flips:
+                moves.append(Move([x, y], x * size + y, flips, len(flips)))
+        return moves
+
+    def preview(self, symbol, move):
+        """
+        :param move: a Move from generate_moves, or a position
+        :returns: the scores (as calc_scores) after symbol plays move, without playing it
+        """
+        flipped = move.flip_count if isinstance(move, Move) else self.count_flips(symbol, move)
+        scores = dict(self._counts)
+        if flipped:
+            scores[symbol] += flipped + 1
+            scores[self.get_opponent_symbol(symbol)] -= flipped
+        return scores
 
     def make_move(self, symbol, position):
-        return _makeMove(self._board, symbol, position[0], position[1])
+        # Plays the move in place and records it so undo_move can take it back.
+        # position is [x, y], or a Move from generate_moves for this position
+        if self._shared:
+            self._fork()
+        if self._bitboard:
+            if isinstance(position, Move):
+                flips = position.flips
+                position = position.position
+            else:
+                flips = self._flip_mask(symbol, position)
+            if not flips:
+                return False
+            opponent = self.get_opponent_symbol(symbol)
+            square = position[0] * self._size + position[1]
+            placed = self._geometry.square_bits[square]
+            self._bits[symbol] |= flips | placed
+            self._bits[opponent] &= ~flips
+            flipped = bitboard_ops.popcount(flips)
+            self._counts[symbol] += flipped + 1
+            self._counts[opponent] -= flipped
+            self._move_masks.clear()
+            self._history.append((symbol, placed, flips, self._hash, None))
+            self._hash ^= self._zobrist.square_keys[symbol][square]
+            for sq in bitboard_ops.iter_squares(flips):
+                self._hash ^= self._zobrist.flip_keys[sq]
+            for listener in self._listeners:
+                listener.on_move(symbol, placed, flips)
+            return True
+        if isinstance(position, Move):
+            tiles_to_flip = position.flips
+            position = position.position
+        else:
+            tiles_to_flip = _isValidMove(self._cells, symbol, position[0], position[1])
+        if tiles_to_flip == False:
+            return False
+        _placeTiles(self._cells, symbol, position[0], position[1], tiles_to_flip)
+        self._counts[symbol] += len(tiles_to_flip) + 1
+        self._counts[self.get_opponent_symbol(symbol)] -= len(tiles_to_flip)
+        # the new disc's empty neighbours join the frontier; undo_move takes them out again
+        added = []
+        for x, y in self._rays.neighbours[position[0] * self._size + position[1]]:
+            if self._cells[x][y] == ' ' and (x, y) not in self._frontier:
+                self._frontier.add((x, y))
+                added.append((x, y))
+        self._frontier.discard((position[0], position[1]))
+        self._history.append((symbol, (position[0], position[1]), tiles_to_flip, self._hash, added))
+        self._hash ^= self._zobrist.square_keys[symbol][position[0] * self._size + position[1]]
+        for x, y in tiles_to_flip:
+            self._hash ^= self._zobrist.flip_keys[x * self._size + y]
+        for listener in self._listeners:
+            listener.on_move(symbol, *_masks(position, tiles_to_flip, self._size))
+        return True
+
+    def undo_move(self):
+        # Takes back the last move made with make_move.
+        if self._shared:
+            self._fork()
+        symbol, placed, flips, self._hash, added = self._history.pop()
+        opponent = self.get_opponent_symbol(symbol)
+        if self._bitboard:
+            self._bits[symbol] &= ~(flips | placed)
+            self._bits[opponent] |= flips
+            flipped = bitboard_ops.popcount(flips)
+            self._counts[symbol] -= flipped + 1
+            self._counts[opponent] += flipped
+            self._move_masks.clear()
+            for listener in self._listeners:
+                listener.on_undo(symbol, placed, flips)
+        else:
+            self._cells[placed[0]][placed[1]] = ' '
+            for x, y in flips:
+                self._cells[x][y] = opponent
+            self._frontier.difference_update(added)
+            self._frontier.add((placed[0], placed[1]))  # a move is always next to a disc
+            self._counts[symbol] -= len(flips) + 1
+            self._counts[opponent] += len(flips)
+            for listener in self._listeners:
+                listener.on_undo(symbol, *_masks(placed, flips, self._size))
+
+    def get_move_count(self):
+        # number of moves on the undo stack
+        return len(self._history)
+
+    def get_empty_count(self):
+        return self._size * self._size - self._counts['X'] - self._counts['O']
 
     def calc_valid_moves(self, symbol):
-        return _checkValidMoves(self._board, symbol)
+        if self._bitboard:
+            moves = self._valid_moves_mask(symbol)
+            return [bitboard_ops.square_to_position(sq, self._size) for sq in bitboard_ops.iter_squares(moves)]
+        return [[x, y] for x, y in sorted(self._frontier) if self._has_flips(symbol, x, y)]
 
     def game_continues(self):
-        return self.calc_valid_moves("X") != [] or self.calc_valid_moves("O") != []
+        # stops at the first valid move found
+        if self._bitboard:
+            return self._valid_moves_mask("X") != 0 or self._valid_moves_mask("O") != 0
+        return any(self._has_flips(symbol, x, y) for symbol in "XO" for x, y in self._frontier)
+
+    def get_hash(self):
+        # Zobrist hash of the discs on the board, kept up to date by make_move/undo_move.
+        return self._hash
+
+    def get_bitboards(self):
+        # (X mask, O mask) with square [x, y] at bit x*size + y, whichever backend is in use
+        if self._bitboard:
+            return self._bits['X'], self._bits['O']
+        bits = _bits_from_cells(self._cells)
+        return bits['X'], bits['O']
 
     def get_size(self):
-        return len(self._board)
+        return self._size
 
     def get_symbol_for_position(self, position):
-        return self._board[position[0]][position[1]]
+        if self._bitboard:
+            bit = self._geometry.square_bits[position[0] * self._size + position[1]]
+            if self._bits['X'] & bit:
+                return 'X'
+            if self._bits['O'] & bit:
+                return 'O'
+            return ' '
+        return self._cells[position[0]][position[1]]
 
     def get_opponent_symbol(self, symbol):
         if symbol == 'X':
@@ -44,6 +320,66 @@ class ReversiBoard:
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(self._board, f, ensure_ascii=False)
 
+    def _valid_moves_mask(self, symbol):
+        moves = self._move_masks.get(symbol)
+        if moves is None:
+            moves = bitboard_ops.valid_moves_mask(self._bits[symbol], self._bits[self.get_opponent_symbol(symbol)],
+                                                  self._geometry)
+            self._move_masks[symbol] = moves
+        return moves
+
+    def _has_flips(self, symbol, x, y):
+        # list backend: whether symbol playing on the empty square [x, y] flips anything, walking
+        # the square's precomputed rays
+        cells = self._cells
+        opponent = self.get_opponent_symbol(symbol)
+        for ray in self._rays.rays[x * self._size + y]:
+            rx, ry = ray[0]
+            if cells[rx][ry] != opponent:
+                continue
+            for rx, ry in ray:
+                tile = cells[rx][ry]
+                if tile != opponent:
+                    if tile == symbol:
+                        return True
+                    break
+        return False
+
+    def _flips(self, symbol, x, y):
+        # list backend: the [x, y] discs symbol flips by playing on the empty square [x, y]
+        cells = self._cells
+        opponent = self.get_opponent_symbol(symbol)
+        flips = []
+        for ray in self._rays.rays[x * self._size + y]:
+            rx, ry = ray[0]
+            if cells[rx][ry] != opponent:
+                continue
+            for i, (rx, ry) in enumerate(ray):
+                tile = cells[rx][ry]
+                if tile != opponent:
+                    if tile == symbol:
+                        flips.extend([fx, fy] for fx, fy in ray[:i])
+                    break
+        return flips
+
+    def _flip_mask(self, symbol, position):
+        x, y = position[0], position[1]
+        if not _isOnBoard(x, y, self._size):
+            return 0
+        square = x * self._size + y
+        own = self._bits[symbol]
+        opp = self._bits[self.get_opponent_symbol(symbol)]
+        if (own | opp) & self._geometry.square_bits[square]:
+            return 0
+        return bitboard_ops.flip_mask(own, opp, square, self._geometry)
+
+
+def _masks(position, tiles_to_flip, size):
+    # the list backend's move as (placed, flips) bitboard masks
+    flips = 0
+    for x, y in tiles_to_flip:
+        flips |= 1 << (x * size + y)
+    return 1 << (position[0] * size + position[1]), flips
 
 
 def _getNewBoard(size):
@@ -134,10 +470,13 @@ def _makeMove(board, tile, xstart, ystart):
     if tilesToFlip == False:
         return False
 
+    _placeTiles(board, tile, xstart, ystart, tilesToFlip)
+    return True
+
+def _placeTiles(board, tile, xstart, ystart, tilesToFlip):
     board[xstart][ystart] = tile
     for x, y in tilesToFlip:
         board[x][y] = tile
-    return True
 
 def _checkValidMoves(board, tile):
     # Returns a list of [x,y] lists of valid moves for the given player on the given board.
@@ -160,6 +499,72 @@ def _getScoreOfBoard(board):
                 oscore += 1
     return {'X':xscore, 'O':oscore}
 
+class _RayTable:
+    # Per-size tables for the list backend, by square x*size + y: the [x, y] cells along each
+    # direction that has at least two squares on the board, nearest first, and the neighbours.
+
+    def __init__(self, size):
+        self.rays = []
+        self.neighbours = []
+        for x in range(size):
+            for y in range(size):
+                square_rays = []
+                neighbours = []
+                for xdirection, ydirection in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
+                    ray = []
+                    rx, ry = x + xdirection, y + ydirection
+                    while _isOnBoard(rx, ry, size):
+                        ray.append((rx, ry))
+                        rx += xdirection
+                        ry += ydirection
+                    if ray:
+                        neighbours.append(ray[0])
+                    if len(ray) >= 2:
+                        square_rays.append(ray)
+                self.rays.append(square_rays)
+                self.neighbours.append(neighbours)
+
+
+_ray_tables = {}
+
+
+def _getRayTable(size):
+    table = _ray_tables.get(size)
+    if table is None:
+        table = _RayTable(size)
+        _ray_tables[size] = table
+    return table
+
+
+def _frontierOf(board, rays):
+    # the set of empty (x, y) next to at least one disc
+    size = len(board)
+    frontier = set()
+    for x in range(size):
+        for y in range(size):
+            if board[x][y] == ' ' and any(board[nx][ny] != ' ' for nx, ny in rays.neighbours[x * size + y]):
+                frontier.add((x, y))
+    return frontier
+
+
 def _board_from_json(board_filename):
     with open(board_filename) as json_file:
         return json.load(json_file)
+
+
+def _bits_from_cells(cells):
+    size = len(cells)
+    bits = {'X': 0, 'O': 0}
+    for x in range(size):
+        for y in range(size):
+            if cells[x][y] in bits:
+                bits[cells[x][y]] |= 1 << (x * size + y)
+    return bits
+
+
+def _cells_from_bits(bits, size):
+    cells = [[' '] * size for _ in range(size)]
+    for symbol in bits:
+        for sq in bitboard_ops.iter_squares(bits[symbol]):
+            cells[sq // size][sq % size] = symbol
+    return cells
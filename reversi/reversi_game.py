@@ -1,10 +1,9 @@
 # Written by Toby Dragon
 
-import copy
 from datetime import datetime
 
 from reversi.player3.all_players import *
-from reversi.reversi_board import ReversiBoard
+from reversi.reversi_board import Move, ReversiBoard
 from reversi.reversi_players import RandomComputerPlayer
 from reversi.reversi_players import HumanPlayer
 
@@ -12,10 +11,11 @@ MAX_TIME=2.5
 
 class ReversiGame:
 
-    def __init__(self, player1, player2, show_status=True, board_size=8):
+    def __init__(self, player1, player2, show_status=True, board_size=8, board=None):
+        # board: a position to play on instead of the start position, with player1 to move
         self.player1 = player1
         self.player2 = player2
-        self.board = ReversiBoard(board_size)
+        self.board = board if board is not None else ReversiBoard(board_size)
         self.decision_times = {self.player1.symbol: 0, self.player2.symbol: 0}
         self.show_status = show_status
         self.play_game()
@@ -25,17 +25,22 @@ class ReversiGame:
             self.board.draw_board()
         while self.board.game_continues():
             self.play_round()
+        for player in (self.player1, self.player2):
+            if hasattr(player, "game_over"):
+                player.game_over()
         if self.show_status:
             print("Game over, Final Scores:")
             print_scores(self.board.calc_scores())
 
     def play_round(self):
+        self.stop_pondering(self.player2)
         start = datetime.now()
         self.play_move(self.player1)
         dt=(datetime.now()-start).total_seconds()
         if dt>MAX_TIME:
             print(self.player1.symbol,"took",dt,"seconds.")
         self.decision_times[self.player1.symbol] +=dt
+        self.stop_pondering(self.player1)
         start = datetime.now()
         self.play_move(self.player2)
         dt = (datetime.now() - start).total_seconds()
@@ -43,12 +48,27 @@ class ReversiGame:
             print(self.player2.symbol, "took", dt, "seconds.")
         self.decision_times[self.player2.symbol] += dt
 
+    def stop_pondering(self, waiting_player):
+        # a player pondering in a thread takes the GIL, and so clock time, from a computer player
+        # in this process; only a human's thinking time is free to ponder on
+        mover = self.player1 if waiting_player is self.player2 else self.player2
+        if hasattr(waiting_player, "stop_pondering") and not isinstance(mover, HumanPlayer):
+            waiting_player.stop_pondering()
+
     def play_move(self, player):
         if self.board.calc_valid_moves(player.symbol):
-            chosen_move = player.get_move(copy.deepcopy(self.board))
+            # a snapshot costs next to nothing until the player changes it, and then it changes its own copy
+            chosen_move = player.get_move(self.board.snapshot())
+            if isinstance(chosen_move, Move):  # its flips are the player's word, so play the position
+                chosen_move = chosen_move.position
             if not self.board.make_move(player.symbol, chosen_move):
                 print("Error: invalid move made")
-            elif self.show_status:
+                return
+            # let the other player know, e.g. so it can check the move it was pondering
+            opponent = self.player2 if player is self.player1 else self.player1
+            if hasattr(opponent, "opponent_moved"):
+                opponent.opponent_moved(chosen_move)
+            if self.show_status:
                 self.board.draw_board()
                 print_scores(self.board.calc_scores())
         elif self.show_status:
@@ -1,6 +1,5 @@
 # adapted by Toby Dragon from original source code by Al Sweigart, available with creative commons license: https://inventwithpython.com/#donate
 import random
-import copy
 import heapq
 
 
@@ -51,10 +50,10 @@ class ReallyGreatPlayer:
     def get_move(self, board):
         max_move=None
         max_move_val=0
-        for move in board.calc_valid_moves(self.symbol):
-            m_val=len(board.is_valid_move(self.symbol,move))
+        for move in board.generate_moves(self.symbol):
+            m_val=move.flip_count
             if m_val>max_move_val:
-                max_move=move
+                max_move=move.position
                 max_move_val=m_val
         return max_move
 
@@ -70,13 +69,11 @@ class GreedyComputerPlayer:
     def get_move(self, board):
         score=board.calc_scores()[self.symbol]
         max_pieces_captured=0
-        for move in board.calc_valid_moves(self.symbol):
-            board_copy=copy.deepcopy(board)
-            board_copy.make_move(self.symbol,move)
-            pieces_captured=board_copy.calc_scores()[self.symbol]-score
+        for move in board.generate_moves(self.symbol):
+            pieces_captured=board.preview(self.symbol,move)[self.symbol]-score
             if pieces_captured>max_pieces_captured:
                 max_pieces_captured=pieces_captured
-                best_move=move
+                best_move=move.position
         return best_move
 
 
@@ -93,13 +90,14 @@ class FantasticPlayerWow:
         # print('fantastic move wow')
         max_move = None
         max_move_val = 0
-        for move in board.calc_valid_moves(self.symbol):
-            m_val = len(board.is_valid_move(self.symbol, move))
-            if move[0] is 0 or move[0] is board.get_size()-1:
+        for move in board.generate_moves(self.symbol):
+            m_val = move.flip_count
+            x, y = move.position
+            if x == 0 or x == board.get_size()-1:
                 m_val*=1.2
-            if move[1] is 0 or move[1] is board.get_size()-1:
+            if y == 0 or y == board.get_size()-1:
                 m_val*=1.2
             if m_val > max_move_val:
-                max_move = move
+                max_move = move.position
                 max_move_val = m_val
         return max_move
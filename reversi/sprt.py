@@ -0,0 +1,215 @@
+"""
+Sequential probability ratio test for player comparisons.
+
+Instead of a fixed number of games, games are played until the results accept one of two Elo
+hypotheses for player 1 against player 2:
+    H0: the Elo difference is elo0 (e.g. 0, "no better")
+    H1: the Elo difference is elo1 (e.g. 20, "better by 20")
+with false positive rate alpha and false negative rate beta. The log-likelihood ratio uses the normal
+approximation of the generalized SPRT on the mean score, so lopsided matches stop after a handful of
+games and close ones keep going until max_games.
+
+Games come in pairs with the first move swapped (as compare_players already alternates), or after a
+random opening of opening_plies moves, with colours swapped. Deterministic players replay the same
+game from the start position every time, so the random openings are what make the games independent
+samples. With pentanomial statistics each pair counts as one sample scored 0, 1/4, 1/2, 3/4 or 1,
+which removes the first-move (or opening) advantage from the variance; with trinomial statistics
+each game counts on its own.
+
+    python -m reversi.sprt get_timed_player get_combined_player --elo0 0 --elo1 30 --workers 4
+"""
+import argparse
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from reversi import tournament
+
+ACCEPT_H0 = "H0"
+ACCEPT_H1 = "H1"
+CONTINUE = None
+
+
+def elo_to_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def _normal_quantile(p):
+    # inverse of the standard normal CDF by bisection on math.erf, plenty for confidence intervals
+    low, high = -10.0, 10.0
+    for _ in range(100):
+        mid = (low + high) / 2
+        if 0.5 * (1 + math.erf(mid / math.sqrt(2))) < p:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+class SPRT:
+
+    def __init__(self, elo0=0, elo1=10, alpha=0.05, beta=0.05, pentanomial=True):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.pentanomial = pentanomial
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.trinomial_counts = [0, 0, 0]  # player 1 losses, draws, wins
+        self.pentanomial_counts = [0, 0, 0, 0, 0]  # game pairs by player 1's total: 0, 0.5, 1, 1.5, 2
+
+    def add_pair(self, first_score, second_score):
+        # player 1's score (0, 0.5 or 1) in the two games of a pair
+        for score in (first_score, second_score):
+            self.trinomial_counts[int(score * 2)] += 1
+        self.pentanomial_counts[int((first_score + second_score) * 2)] += 1
+
+    def _samples(self):
+        # (sample scores, counts) for the chosen statistics
+        if self.pentanomial:
+            return (0, 0.25, 0.5, 0.75, 1), self.pentanomial_counts
+        return (0, 0.5, 1), self.trinomial_counts
+
+    def stats(self):
+        """
+        :returns: (number of samples, mean score, variance of one sample)
+        """
+        scores, counts = self._samples()
+        n = sum(counts)
+        if n == 0:
+            return 0, 0.5, 0.0
+        mean = sum(score * count for score, count in zip(scores, counts)) / n
+        # one sample's worth of prior spread evenly over the outcomes keeps the variance above zero
+        # when every game so far went the same way
+        prior = 1 / len(scores)
+        variance = sum((count + prior) * (score - mean) ** 2 for score, count in zip(scores, counts)) / (n + 1)
+        return n, mean, variance
+
+    def llr(self):
+        n, mean, variance = self.stats()
+        if n == 0:
+            return 0.0
+        s0 = elo_to_score(self.elo0)
+        s1 = elo_to_score(self.elo1)
+        return n * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+    def status(self):
+        """
+        :returns: ACCEPT_H0, ACCEPT_H1 or CONTINUE
+        """
+        llr = self.llr()
+        if llr >= self.upper:
+            return ACCEPT_H1
+        if llr <= self.lower:
+            return ACCEPT_H0
+        return CONTINUE
+
+    def elo(self, confidence=0.95):
+        """
+        :returns: (Elo difference, lower bound, upper bound) of player 1 over player 2
+        """
+        n, mean, variance = self.stats()
+        if n == 0:
+            return 0.0, -math.inf, math.inf
+        margin = _normal_quantile(0.5 + confidence / 2) * math.sqrt(variance / n)
+        return score_to_elo(mean), score_to_elo(mean - margin), score_to_elo(mean + margin)
+
+    def report(self):
+        elo, low, high = self.elo()
+        return "games %d  W-D-L %d-%d-%d  pairs %s  elo %.1f [%.1f, %.1f]  LLR %.2f [%.2f, %.2f]" % (
+            sum(self.trinomial_counts), self.trinomial_counts[2], self.trinomial_counts[1],
+            self.trinomial_counts[0], self.pentanomial_counts, elo, low, high, self.llr(), self.lower, self.upper)
+
+
+def _score(winner, symbol):
+    if winner == "TIE":
+        return 0.5
+    return 1.0 if winner == symbol else 0.0
+
+
+def _play_pair(jobs):
+    # runs in a worker process: both games of a pair
+    return [tournament.play_game(job) for job in jobs]
+
+
+def _pair_jobs(spec1, spec2, board_size, opening):
+    # the two games of a pair, and spec1's symbol in each
+    if opening:
+        return [(spec1, "X", spec2, "O", board_size, opening), (spec1, "O", spec2, "X", board_size, opening)], ("X", "O")
+    return tournament.match_jobs(spec1, "X", spec2, "O", 2, board_size), ("X", "X")
+
+
+def sprt_compare(spec1, spec2, elo0=0, elo1=10, alpha=0.05, beta=0.05, pentanomial=True, max_games=1000,
+                 workers=None, board_size=8, opening_plies=4, seed=0, verbose=True):
+    """
+    Plays game pairs between two player specs (see tournament.py) until the test decides or
+    max_games have been played, keeping one pair per worker in flight.
+    :returns: (ACCEPT_H0, ACCEPT_H1 or CONTINUE, the SPRT with the counts)
+    """
+    test = SPRT(elo0, elo1, alpha, beta, pentanomial)
+    rng = random.Random(seed)
+    pairs = max_games // 2
+    workers = workers or os.cpu_count()
+    executor = ProcessPoolExecutor(workers)
+    try:
+        running = set()
+        submitted = 0
+        status = CONTINUE
+        while status is CONTINUE and (submitted < pairs or running):
+            while submitted < pairs and len(running) < workers:
+                opening = tournament.random_opening(opening_plies, board_size, rng)
+                jobs, symbols = _pair_jobs(spec1, spec2, board_size, opening)
+                future = executor.submit(_play_pair, jobs)
+                future.symbols = symbols
+                running.add(future)
+                submitted += 1
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                first, second = future.result()
+                test.add_pair(_score(first[0], future.symbols[0]), _score(second[0], future.symbols[1]))
+            status = test.status()
+            if verbose:
+                print(test.report())
+        for future in running:
+            future.cancel()
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return status, test
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two players with a sequential probability ratio test.")
+    parser.add_argument("player1")
+    parser.add_argument("player2")
+    parser.add_argument("--elo0", type=float, default=0)
+    parser.add_argument("--elo1", type=float, default=10)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--trinomial", action="store_true", help="count games instead of game pairs")
+    parser.add_argument("--max-games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--size", type=int, default=8)
+    parser.add_argument("--opening-plies", type=int, default=4, help="random moves before each pair (0 for none)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    status, test = sprt_compare(args.player1, args.player2, args.elo0, args.elo1, args.alpha, args.beta,
+                                not args.trinomial, args.max_games, args.workers, args.size,
+                                args.opening_plies, args.seed)
+    if status is ACCEPT_H1:
+        print("H1 accepted: %s is %g Elo stronger rather than %g" % (args.player1, args.elo1, args.elo0))
+    elif status is ACCEPT_H0:
+        print("H0 accepted: %s is %g Elo stronger rather than %g" % (args.player1, args.elo0, args.elo1))
+    else:
+        print("no decision after %d games" % sum(test.trinomial_counts))
+
+
+if __name__ == "__main__":
+    main()
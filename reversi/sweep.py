@@ -0,0 +1,225 @@
+"""
+Parameter sweeps over MinimaxPlayerG3 configurations.
+
+Every cell of a grid of constructor arguments plays a match against one opponent spec (see
+tournament.py). Cells run in parallel and each finished cell is saved in the cache directory under a
+key made from its configuration, the match settings and a hash of the code the match runs, so an
+interrupted sweep picks up where it stopped, a grown grid only plays the new cells, and a change to
+that code plays everything again. The code is the modules this one imports, those the tournament
+loads players from and the opponent's, everything they import in turn, and the data files next to
+them that they name (fitted parameters, the opening book); other modules can change freely.
+
+    python -m reversi.sweep --grid max_depth=3,4,5 ab_pruning=True,False --opponent get_default_player --games 10
+"""
+import argparse
+import ast
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from reversi import tournament
+from reversi.player3.all_players import MinimaxPlayerG3
+from reversi.reversi_game import ReversiGame
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = ".sweep_cache"
+DATA_SUFFIXES = (".json", ".bin")
+
+
+def _module_file(name):
+    # the source file of a module of this package, or None
+    if name.split(".")[0] != "reversi":
+        return None
+    path = os.path.join(os.path.dirname(PACKAGE_DIR), *name.split(".")) + ".py"
+    return path if os.path.isfile(path) else None
+
+
+def _imported_modules(path):
+    # names of everything the file imports, function-level imports included; "from a import b" gives
+    # both a and a.b, since b may be a module
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+            names += [node.module + "." + alias.name for alias in node.names]
+    return names
+
+
+def code_files(modules):
+    """
+    :param modules: module names to start from
+    :returns: sorted paths of the package's modules they import, directly or not, and the data files
+        those modules name
+    """
+    sources = set()
+    todo = [path for path in map(_module_file, modules) if path is not None]
+    while todo:
+        path = todo.pop()
+        if path not in sources:
+            sources.add(path)
+            todo += [found for found in map(_module_file, _imported_modules(path)) if found is not None]
+    text = ""
+    for path in sources:
+        with open(path) as f:
+            text += f.read()
+    data = set()
+    for root, dirs, files in os.walk(PACKAGE_DIR):
+        data.update(os.path.join(root, name) for name in files if name.endswith(DATA_SUFFIXES) and name in text)
+    return sorted(sources | data)
+
+
+def code_hash(opponent):
+    # the code a cell against opponent runs: this module, the player modules and the opponent's
+    module = tournament.parse_spec(opponent)[0]
+    modules = ["reversi.sweep"] + list(tournament.DEFAULT_MODULES) + ([module] if module else [])
+    digest = hashlib.sha1()
+    for path in code_files(modules):
+        digest.update(os.path.relpath(path, PACKAGE_DIR).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def grid_configs(grid):
+    """
+    :param grid: {argument: [values]}
+    :returns: a list of {argument: value}, one per combination
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def cell_key(config, opponent, games, board_size, code):
+    text = json.dumps({"config": config, "opponent": opponent, "games": games, "size": board_size, "code": code},
+                      sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _other_nodes(player):
+    # running totals of the nodes searched outside player.nodes: by the endgame solver, and by
+    # helper processes (see reversi/parallel_search.py)
+    nodes = 0
+    if player.endgame_solver is not None:
+        nodes += player.endgame_solver.nodes
+    if player.parallel is not None:
+        nodes += player.parallel.helper_nodes
+    return nodes
+
+
+def run_cell(job):
+    """
+    Runs in a worker process: games between MinimaxPlayerG3(**config) as X and the opponent as O,
+    alternating who moves first.
+    :returns: totals for the cell
+    """
+    config, opponent_spec, games, board_size = job
+    record = {"wins": 0, "losses": 0, "ties": 0, "time": 0.0, "moves": 0, "nodes": 0}
+    for i in range(games):
+        player = MinimaxPlayerG3("X", **config)
+        opponent = tournament.make_player(opponent_spec, "O")
+        get_move = player.get_move
+
+        def counted_get_move(board):
+            # get_move starts player.nodes from 0, so a book move adds none
+            other_nodes = _other_nodes(player)
+            move = get_move(board)
+            record["moves"] += 1
+            record["nodes"] += player.nodes + _other_nodes(player) - other_nodes
+            return move
+
+        player.get_move = counted_get_move
+        players = (opponent, player) if i % 2 == 0 else (player, opponent)
+        game = ReversiGame(players[0], players[1], show_status=False, board_size=board_size)
+        winner = game.calc_winner()
+        if winner == "TIE":
+            record["ties"] += 1
+        elif winner == "X":
+            record["wins"] += 1
+        else:
+            record["losses"] += 1
+        record["time"] += game.get_decision_times()["X"]
+    return record
+
+
+def run_sweep(grid, opponent, games=10, board_size=8, workers=None, cache_dir=CACHE_DIR):
+    """
+    :returns: [(config, record)] for every cell of the grid, from the cache where possible
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    code = code_hash(opponent)
+    configs = grid_configs(grid)
+    records = {}
+    missing = []
+    for index, config in enumerate(configs):
+        path = os.path.join(cache_dir, cell_key(config, opponent, games, board_size, code) + ".json")
+        if os.path.exists(path):
+            with open(path) as f:
+                records[index] = json.load(f)["record"]
+        else:
+            missing.append((index, path))
+    print(len(configs) - len(missing), "of", len(configs), "cells cached")
+    if missing:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = {executor.submit(run_cell, (configs[index], opponent, games, board_size)): (index, path)
+                       for index, path in missing}
+            for future in as_completed(futures):
+                index, path = futures[future]
+                records[index] = future.result()
+                # write then rename, so an interrupted sweep never leaves half a cell behind
+                with open(path + ".tmp", "w") as f:
+                    json.dump({"config": configs[index], "opponent": opponent, "games": games,
+                               "size": board_size, "code": code, "record": records[index]}, f)
+                os.replace(path + ".tmp", path)
+                print("finished", configs[index])
+    return [(config, records[index]) for index, config in enumerate(configs)]
+
+
+def format_table(results):
+    names = sorted(results[0][0]) if results else []
+    header = names + ["win rate", "time (s)", "per move (ms)", "nodes", "nodes/move"]
+    rows = []
+    for config, record in results:
+        games = max(record["wins"] + record["losses"] + record["ties"], 1)
+        moves = max(record["moves"], 1)
+        rows.append([str(config[name]) for name in names] + [
+            "%.2f" % ((record["wins"] + 0.5 * record["ties"]) / games),
+            "%.1f" % record["time"],
+            "%.1f" % (1000 * record["time"] / moves),
+            str(record["nodes"]),
+            "%.0f" % (record["nodes"] / moves)])
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    lines = ["  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in [header] + rows]
+    return "\n".join(lines)
+
+
+def parse_grid(arguments):
+    # ["max_depth=3,4", "ab_pruning=True,False"] -> {"max_depth": [3, 4], "ab_pruning": [True, False]}
+    grid = {}
+    for argument in arguments:
+        name, values = argument.split("=", 1)
+        grid[name] = [ast.literal_eval(value) for value in values.split(",")]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep MinimaxPlayerG3 constructor arguments.")
+    parser.add_argument("--grid", nargs="+", required=True, help="argument=value,value,...")
+    parser.add_argument("--opponent", default="get_default_player")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--size", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    results = run_sweep(parse_grid(args.grid), args.opponent, args.games, args.size, args.workers, args.cache)
+    print(format_table(results))
+
+
+if __name__ == "__main__":
+    main()
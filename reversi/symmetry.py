@@ -0,0 +1,155 @@
+"""
+The eight symmetries of the square board (rotations and reflections).
+
+Positions are handled as (x_bits, o_bits) bitboards in the layout of reversi/bitboard.py.
+On 8x8 each transform is a handful of shifts and masks; other sizes use a precomputed
+square permutation table per transform. canonical() picks the smallest of the eight images,
+so symmetric positions share one key, and reports which transform got there so moves can be
+mapped back with transform_position(move, inverse(transform), size).
+"""
+from reversi import bitboard as bitboard_ops
+from reversi import zobrist
+
+IDENTITY = 0
+ROTATE_90 = 1
+ROTATE_180 = 2
+ROTATE_270 = 3
+FLIP_X = 4
+FLIP_Y = 5
+TRANSPOSE = 6
+ANTI_TRANSPOSE = 7
+
+TRANSFORMS = range(8)
+
+_INVERSES = [IDENTITY, ROTATE_270, ROTATE_180, ROTATE_90, FLIP_X, FLIP_Y, TRANSPOSE, ANTI_TRANSPOSE]
+
+
+def inverse(transform):
+    return _INVERSES[transform]
+
+
+def transform_position(position, transform, size):
+    # Where the square [x, y] ends up under the transform.
+    x, y = position[0], position[1]
+    last = size - 1
+    if transform == IDENTITY:
+        return [x, y]
+    if transform == ROTATE_90:
+        return [y, last - x]
+    if transform == ROTATE_180:
+        return [last - x, last - y]
+    if transform == ROTATE_270:
+        return [last - y, x]
+    if transform == FLIP_X:
+        return [last - x, y]
+    if transform == FLIP_Y:
+        return [x, last - y]
+    if transform == TRANSPOSE:
+        return [y, x]
+    return [last - y, last - x]
+
+
+_permutations = {}
+
+
+def _get_permutations(size):
+    # _get_permutations(size)[t][square] is the square that `square` moves to under transform t
+    tables = _permutations.get(size)
+    if tables is None:
+        tables = []
+        for t in TRANSFORMS:
+            table = []
+            for square in range(size * size):
+                x, y = transform_position(bitboard_ops.square_to_position(square, size), t, size)
+                table.append(x * size + y)
+            tables.append(table)
+        _permutations[size] = tables
+    return tables
+
+
+def _permute(bits, table):
+    result = 0
+    for square in bitboard_ops.iter_squares(bits):
+        result |= 1 << table[square]
+    return result
+
+
+# 8x8: bit x*8+y, so each x is one byte and y is the bit inside it
+
+def _flip_x_64(bits):
+    return int.from_bytes(bits.to_bytes(8, 'little'), 'big')
+
+
+def _flip_y_64(bits):
+    bits = ((bits >> 1) & 0x5555555555555555) | ((bits & 0x5555555555555555) << 1)
+    bits = ((bits >> 2) & 0x3333333333333333) | ((bits & 0x3333333333333333) << 2)
+    return ((bits >> 4) & 0x0F0F0F0F0F0F0F0F) | ((bits & 0x0F0F0F0F0F0F0F0F) << 4)
+
+
+def _transpose_64(bits):
+    t = 0x0F0F0F0F00000000 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bits ^ (bits << 7))
+    return bits ^ t ^ (t >> 7)
+
+
+def _transform_64(bits, transform):
+    if transform == IDENTITY:
+        return bits
+    if transform == ROTATE_90:
+        return _flip_y_64(_transpose_64(bits))
+    if transform == ROTATE_180:
+        return _flip_x_64(_flip_y_64(bits))
+    if transform == ROTATE_270:
+        return _flip_x_64(_transpose_64(bits))
+    if transform == FLIP_X:
+        return _flip_x_64(bits)
+    if transform == FLIP_Y:
+        return _flip_y_64(bits)
+    if transform == TRANSPOSE:
+        return _transpose_64(bits)
+    return _flip_x_64(_flip_y_64(_transpose_64(bits)))
+
+
+def transform_bits(bits, transform, size):
+    if size == 8:
+        return _transform_64(bits, transform)
+    return _permute(bits, _get_permutations(size)[transform])
+
+
+def canonical(x_bits, o_bits, size):
+    """
+    :returns: (x_bits, o_bits, transform) for the smallest of the eight images of the position
+    """
+    best = (x_bits, o_bits, IDENTITY)
+    for t in range(1, 8):
+        image = (transform_bits(x_bits, t, size), transform_bits(o_bits, t, size), t)
+        if image < best:
+            best = image
+    return best
+
+
+def canonical_board(board):
+    x_bits, o_bits = board.get_bitboards()
+    return canonical(x_bits, o_bits, board.get_size())
+
+
+def canonical_hash(board, symbol_to_move=None):
+    """
+    :returns: (Zobrist hash of the canonical position, transform that produced it)
+    """
+    x_bits, o_bits, transform = canonical_board(board)
+    return hash_bits(x_bits, o_bits, board.get_size(), symbol_to_move), transform
+
+
+def hash_bits(x_bits, o_bits, size, symbol_to_move=None):
+    # the Zobrist hash a board with these discs would have
+    keys = zobrist.get_keys(size)
+    h = keys.side_to_move(symbol_to_move)
+    for square in bitboard_ops.iter_squares(x_bits):
+        h ^= keys.square_keys['X'][square]
+    for square in bitboard_ops.iter_squares(o_bits):
+        h ^= keys.square_keys['O'][square]
+    return h
@@ -0,0 +1,234 @@
+"""
+Tournaments spread over a process pool.
+
+Players are given as specs instead of objects so they can be sent to worker processes: the name of
+a factory function, optionally with keyword arguments and a module path, e.g.
+    get_combined_player
+    get_timed_player(time_limit=1)
+    reversi.player3.mcts_player:get_mcts_player(time_limit=0.5)
+Factories without a module are looked up in reversi.player3.all_players, then reversi.reversi_players.
+Every game builds fresh players from the specs.
+
+    python -m reversi.tournament compare get_default_player get_combined_player --games 50 --workers 4
+    python -m reversi.tournament round-robin get_player_b get_player_d get_combined_player --games 10
+    python -m reversi.tournament gauntlet get_timed_player get_player_b get_player_d --games 10
+"""
+import argparse
+import ast
+import importlib
+import itertools
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from reversi.reversi_board import ReversiBoard
+from reversi.reversi_game import ReversiGame
+
+DEFAULT_MODULES = ("reversi.player3.all_players", "reversi.reversi_players")
+
+
+def parse_spec(spec):
+    """
+    :returns: (module, factory name, kwargs) for a spec string; module is None if not given
+    """
+    module = None
+    if ":" in spec:
+        module, spec = spec.split(":", 1)
+    call = ast.parse(spec, mode="eval").body
+    if isinstance(call, ast.Name):
+        return module, call.id, {}
+    if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Name) or call.args:
+        raise ValueError("player spec must look like factory or factory(key=value, ...): %r" % spec)
+    return module, call.func.id, {keyword.arg: ast.literal_eval(keyword.value) for keyword in call.keywords}
+
+
+def make_player(spec, symbol):
+    module, name, kwargs = parse_spec(spec)
+    for module_name in ([module] if module else DEFAULT_MODULES):
+        factory = getattr(importlib.import_module(module_name), name, None)
+        if factory is not None:
+            return factory(symbol, **kwargs)
+    raise ValueError("no player factory named %r" % name)
+
+
+def play_game(job):
+    """
+    Runs in a worker process.
+    :param job: (first spec, first symbol, second spec, second symbol, board size, opening). The opening
+        is a list of moves played alternately from the start, X first, before the players take over;
+        after an opening the side to move goes first, otherwise the first player does
+    :returns: (winning symbol or "TIE", {symbol: decision time})
+    """
+    first_spec, first_symbol, second_spec, second_symbol, board_size, opening = job
+    first = make_player(first_spec, first_symbol)
+    second = make_player(second_spec, second_symbol)
+    board, symbol = play_opening(opening, board_size)
+    if opening and first.symbol != symbol:
+        first, second = second, first
+    game = ReversiGame(first, second, show_status=False, board=board)
+    return game.calc_winner(), game.get_decision_times()
+
+
+def play_opening(opening, board_size):
+    """
+    :returns: (board with the opening played on it, X first; symbol to move next)
+    :raises ValueError: for a move that isn't valid
+    """
+    board = ReversiBoard(board_size)
+    symbol = "X"
+    for move in opening:
+        if not board.make_move(symbol, move):
+            raise ValueError("invalid opening move %s for %s" % (move, symbol))
+        symbol = board.get_opponent_symbol(symbol)
+    return board, symbol
+
+
+def _play_games(jobs, workers):
+    if workers == 1:
+        return map(play_game, jobs)
+    executor = ProcessPoolExecutor(workers)
+    try:
+        return list(executor.map(play_game, jobs))
+    finally:
+        executor.shutdown()
+
+
+def match_jobs(spec1, symbol1, spec2, symbol2, count, board_size, opening=()):
+    # alternate who moves first the same way compare_players does: the second player starts game 1.
+    # After an opening the side to move is fixed, so the players swap symbols instead
+    jobs = []
+    for i in range(1, count + 1):
+        if opening:
+            if i % 2:
+                jobs.append((spec1, symbol2, spec2, symbol1, board_size, opening))
+            else:
+                jobs.append((spec1, symbol1, spec2, symbol2, board_size, opening))
+        elif i % 2:
+            jobs.append((spec2, symbol2, spec1, symbol1, board_size, opening))
+        else:
+            jobs.append((spec1, symbol1, spec2, symbol2, board_size, opening))
+    return jobs
+
+
+def pairing_jobs(pairings, count, board_size=8, openings=None):
+    """
+    :returns: count games for each (spec1, spec2) pairing and each opening (a list of moves),
+        spec1 playing X (or both colours in turn after an opening)
+    :raises ValueError: for an opening that can't be played, or a spec paired with itself (standings
+        are kept per spec, so both sides would land in one row), before any game is
+    """
+    for spec1, spec2 in pairings:
+        if spec1 == spec2:
+            raise ValueError("%s can't play itself in a tournament" % spec1)
+    openings = [tuple(map(tuple, opening)) for opening in openings or [()]]
+    for opening in openings:
+        play_opening(opening, board_size)
+    jobs = []
+    for spec1, spec2 in pairings:
+        for opening in openings:
+            jobs += match_jobs(spec1, "X", spec2, "O", count, board_size, opening)
+    return jobs
+
+
+def random_opening(plies, board_size=8, rng=random):
+    """
+    :returns: up to plies random moves from the start position, X first, as an opening for play_game
+    """
+    board = ReversiBoard(board_size)
+    symbol = "X"
+    opening = []
+    for _ in range(plies):
+        moves = board.calc_valid_moves(symbol)
+        if not moves:
+            break
+        move = rng.choice(moves)
+        board.make_move(symbol, move)
+        opening.append(tuple(move))
+        symbol = board.get_opponent_symbol(symbol)
+    return tuple(opening)
+
+
+def standings(jobs, results):
+    """
+    :param results: (winner, decision_times) for each job
+    :returns: {spec: {"wins": n, "losses": n, "ties": n, "time": seconds}} over every game the spec played
+    """
+    table = {}
+    for job, (winner, decision_times) in zip(jobs, results):
+        for spec, symbol in ((job[0], job[1]), (job[2], job[3])):
+            record = table.setdefault(spec, {"wins": 0, "losses": 0, "ties": 0, "time": 0})
+            if winner == "TIE":
+                record["ties"] += 1
+            elif winner == symbol:
+                record["wins"] += 1
+            else:
+                record["losses"] += 1
+            record["time"] += decision_times[symbol]
+    return table
+
+
+def compare_players(spec1, spec2, count=1, workers=None, board_size=8, symbol1="X", symbol2="O"):
+    """
+    compare_players from reversi_game with the games played in parallel.
+    :returns: (game_count_map, time_elapsed_map) keyed by symbol, as printed by compare_players
+    """
+    game_count_map = {symbol1: 0, symbol2: 0, "TIE": 0}
+    time_elapsed_map = {symbol1: 0, symbol2: 0}
+    for winner, decision_times in _play_games(match_jobs(spec1, symbol1, spec2, symbol2, count, board_size), workers):
+        print(winner)
+        game_count_map[winner] += 1
+        for symbol in decision_times:
+            time_elapsed_map[symbol] += decision_times[symbol]
+    print(game_count_map)
+    print(time_elapsed_map)
+    return game_count_map, time_elapsed_map
+
+
+def run_pairings(pairings, count, workers=None, board_size=8):
+    """
+    Plays count games for each (spec1, spec2) pairing, all in one pool.
+    :returns: standings over every game
+    """
+    jobs = pairing_jobs(pairings, count, board_size)
+    return standings(jobs, _play_games(jobs, workers))
+
+
+def round_robin(specs, count, workers=None, board_size=8):
+    return run_pairings(list(itertools.combinations(specs, 2)), count, workers, board_size)
+
+
+def gauntlet(challenger, opponents, count, workers=None, board_size=8):
+    return run_pairings([(challenger, opponent) for opponent in opponents], count, workers, board_size)
+
+
+def print_standings(standings):
+    for spec, record in sorted(standings.items(), key=lambda item: -item[1]["wins"]):
+        print("%-40s %4d W %4d L %4d T %10.1f s" % (spec, record["wins"], record["losses"], record["ties"], record["time"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play tournaments between player factories in parallel.")
+    parser.add_argument("--games", type=int, default=2, help="games per pairing")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument("--size", type=int, default=8)
+    subparsers = parser.add_subparsers(dest="command")
+    compare_parser = subparsers.add_parser("compare")
+    compare_parser.add_argument("players", nargs=2)
+    round_robin_parser = subparsers.add_parser("round-robin")
+    round_robin_parser.add_argument("players", nargs="+")
+    gauntlet_parser = subparsers.add_parser("gauntlet")
+    gauntlet_parser.add_argument("challenger")
+    gauntlet_parser.add_argument("opponents", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        compare_players(args.players[0], args.players[1], args.games, args.workers, args.size)
+    elif args.command == "round-robin":
+        print_standings(round_robin(args.players, args.games, args.workers, args.size))
+    elif args.command == "gauntlet":
+        print_standings(gauntlet(args.challenger, args.opponents, args.games, args.workers, args.size))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
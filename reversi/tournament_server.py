@@ -0,0 +1,322 @@
+"""
+Tournaments over TCP: one coordinator hands out games, any number of workers on any machines play them.
+
+The protocol is one JSON object per line. A worker sends {"type": "request"} and gets back either
+    {"type": "job", "id": n, "job": [...]}   a game to play (see tournament.play_game)
+    {"type": "wait", "seconds": s}          every game is handed out but some results are missing
+    {"type": "done"}                        the tournament is over
+and after playing a game sends {"type": "result", "id": n, "winner": ..., "times": {...}}, or
+{"type": "error", "id": n, "message": ...} if the game raised an exception.
+
+A game is leased to one worker at a time. If the worker's connection drops, or the result takes longer
+than the lease, the game goes back in the queue for another worker; a late duplicate result is ignored.
+A game that raises, or whose worker drops, MAX_ATTEMPTS times is given up on, and the coordinator
+raises GameFailed once the other games are done.
+Every result is appended to the log file as it arrives, and a coordinator started with the same log
+and the same games only hands out the games that aren't in it yet.
+
+    python -m reversi.tournament_server coordinator --port 5151 --log results.jsonl --games 20 round-robin get_player_b get_player_d
+    python -m reversi.tournament_server worker --host coordinator-host --port 5151 --processes 8
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+
+from reversi import tournament
+
+DEFAULT_PORT = 5151
+LEASE_SECONDS = 600  # a game not reported back in this long is handed to another worker
+WAIT_SECONDS = 1.0
+MAX_ATTEMPTS = 3  # errors and dropped connections before a game is given up on
+
+
+class GameFailed(Exception):
+    # raised by Coordinator.run when some games could not be played
+
+    def __init__(self, failures):
+        """
+        :param failures: {job id: message of the last error}
+        """
+        self.failures = failures
+        super().__init__("%d game(s) failed: %s" % (len(failures), "; ".join(
+            "game %d: %s" % (job_id, message) for job_id, message in sorted(failures.items()))))
+
+
+def _send(stream, message):
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def _receive(stream):
+    # returns None when the other side has closed the connection
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True  # a restarted coordinator can take its port back straight away
+    daemon_threads = True
+
+
+def _as_job(job):
+    # JSON turns the job's tuples into lists
+    return tuple(job[:5]) + (tuple(tuple(move) for move in job[5]),)
+
+
+class Coordinator:
+
+    def __init__(self, jobs, host="127.0.0.1", port=DEFAULT_PORT, log_filename=None, lease=LEASE_SECONDS):
+        """
+        :param jobs: games to play, as built by tournament.pairing_jobs
+        :param port: 0 picks a free port (see self.address)
+        """
+        self.jobs = [_as_job(job) for job in jobs]
+        self.lease = lease
+        self.log_filename = log_filename
+        self.results = {}
+        if log_filename is not None and os.path.exists(log_filename):
+            with open(log_filename) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    job_id = entry["id"]
+                    if job_id < len(self.jobs) and _as_job(entry["job"]) == self.jobs[job_id]:
+                        self.results[job_id] = (entry["winner"], entry["times"])
+        self.pending = deque(job_id for job_id in range(len(self.jobs)) if job_id not in self.results)
+        self.leases = {}  # job id: (connection holding it, lease expiry time)
+        self.reissued = 0
+        self.attempts = {}  # job id: errors and dropped connections so far
+        self.failures = {}  # job id: last error, for games given up on
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        if not self.pending:
+            self.finished.set()
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator.handle(self.rfile, self.wfile)
+
+        self.server = _ThreadingTCPServer((host, port), Handler)
+        self.address = self.server.server_address
+
+    def handle(self, rfile, wfile):
+        # one worker connection; games it still holds when it drops go back in the queue
+        connection = object()  # owns the leases handed out on this connection
+        held = set()
+        try:
+            while True:
+                message = _receive(rfile)
+                if message is None:
+                    break
+                if message["type"] == "request":
+                    reply = self.next_job(connection)
+                    if reply["type"] == "job":
+                        held.add(reply["id"])
+                    _send(wfile, reply)
+                elif message["type"] == "result":
+                    held.discard(message["id"])
+                    self.record(message["id"], message["winner"], message["times"])
+                elif message["type"] == "error":
+                    held.discard(message["id"])
+                    self.fail(message["id"], message["message"], connection)
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self.release(held, connection)
+
+    def next_job(self, connection):
+        # connection identifies the asker, so that only it can fail or release the game it gets
+        with self.lock:
+            now = time.monotonic()
+            for job_id, (_, expiry) in list(self.leases.items()):
+                if expiry < now:
+                    del self.leases[job_id]
+                    self.pending.append(job_id)
+                    self.reissued += 1
+            if self.pending:
+                job_id = self.pending.popleft()
+                self.leases[job_id] = (connection, now + self.lease)
+                return {"type": "job", "id": job_id, "job": self.jobs[job_id]}
+            if self.finished.is_set():
+                return {"type": "done"}
+            return {"type": "wait", "seconds": WAIT_SECONDS}
+
+    def record(self, job_id, winner, times):
+        with self.lock:
+            if job_id in self.results:  # a reissued game reported twice
+                return
+            self.results[job_id] = (winner, times)
+            self.leases.pop(job_id, None)
+            self.failures.pop(job_id, None)
+            if job_id in self.pending:
+                self.pending.remove(job_id)
+            if self.log_filename is not None:
+                with open(self.log_filename, "a") as f:
+                    f.write(json.dumps({"id": job_id, "job": self.jobs[job_id], "winner": winner, "times": times}) + "\n")
+            self._check_finished()
+
+    def fail(self, job_id, message, connection):
+        # the worker's game raised: try it again elsewhere, up to MAX_ATTEMPTS times in all
+        with self.lock:
+            if self._holds(connection, job_id):
+                del self.leases[job_id]
+                self._retry(job_id, message, self.pending.append)
+
+    def release(self, job_ids, connection):
+        with self.lock:
+            for job_id in job_ids:
+                if self._holds(connection, job_id):
+                    del self.leases[job_id]
+                    self._retry(job_id, "worker connection lost", self.pending.appendleft)
+
+    def _holds(self, connection, job_id):
+        # with self.lock held. Once a lease runs out the game can be leased again, and then only
+        # the new holder may give it up
+        lease = self.leases.get(job_id)
+        return lease is not None and lease[0] is connection and job_id not in self.results
+
+    def _retry(self, job_id, message, requeue):
+        # with self.lock held
+        self.attempts[job_id] = self.attempts.get(job_id, 0) + 1
+        if self.attempts[job_id] < MAX_ATTEMPTS:
+            requeue(job_id)
+            self.reissued += 1
+        else:
+            self.failures[job_id] = message
+            self._check_finished()
+
+    def _check_finished(self):
+        # with self.lock held
+        if len(self.results) + len(self.failures) == len(self.jobs):
+            self.finished.set()
+
+    def run(self, linger=2 * WAIT_SECONDS):
+        """
+        Serves until every game has a result or has been given up on, then keeps answering "done"
+        for linger seconds so waiting workers hear about it.
+        :returns: [(winner, decision_times)] in job order
+        :raises GameFailed: if any game was given up on; the other results are in self.results
+        """
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.finished.wait()
+        time.sleep(linger)
+        self.server.shutdown()
+        self.server.server_close()
+        if self.failures:
+            raise GameFailed(dict(self.failures))
+        return [self.results[job_id] for job_id in range(len(self.jobs))]
+
+
+def run_worker(host="127.0.0.1", port=DEFAULT_PORT, connect_attempts=30):
+    """
+    Plays games for the coordinator at host:port until it says the tournament is over.
+    :returns: the number of games played
+    """
+    for attempt in range(connect_attempts):
+        try:
+            connection = socket.create_connection((host, port))
+            break
+        except OSError:
+            if attempt == connect_attempts - 1:
+                raise
+            time.sleep(WAIT_SECONDS)
+    played = 0
+    with connection, connection.makefile("rwb") as stream:
+        while True:
+            _send(stream, {"type": "request"})
+            reply = _receive(stream)
+            if reply is None or reply["type"] == "done":
+                break
+            if reply["type"] == "wait":
+                time.sleep(reply["seconds"])
+                continue
+            try:
+                winner, times = tournament.play_game(_as_job(reply["job"]))
+            except Exception as error:
+                # report it and carry on: the coordinator decides whether the game is tried again
+                _send(stream, {"type": "error", "id": reply["id"], "message": "%s: %s" % (type(error).__name__, error)})
+                continue
+            _send(stream, {"type": "result", "id": reply["id"], "winner": winner, "times": times})
+            played += 1
+    return played
+
+
+def run_workers(host, port, processes):
+    # several worker processes on this machine, each with its own connection
+    workers = [multiprocessing.Process(target=run_worker, args=(host, port)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def run_local(jobs, processes=2, log_filename=None):
+    """
+    Coordinator and worker processes all on localhost.
+    :returns: [(winner, decision_times)] in job order
+    :raises GameFailed: as Coordinator.run does
+    """
+    coordinator = Coordinator(jobs, port=0, log_filename=log_filename)
+    host, port = coordinator.address
+    workers = threading.Thread(target=run_workers, args=(host, port, processes))
+    workers.start()
+    try:
+        return coordinator.run()
+    finally:
+        workers.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed tournaments over TCP.")
+    subparsers = parser.add_subparsers(dest="command")
+    coordinator_parser = subparsers.add_parser("coordinator")
+    coordinator_parser.add_argument("--host", default="0.0.0.0")
+    coordinator_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator_parser.add_argument("--log", default=None, help="result log to append to and resume from")
+    coordinator_parser.add_argument("--games", type=int, default=2, help="games per pairing and opening")
+    coordinator_parser.add_argument("--size", type=int, default=8)
+    coordinator_parser.add_argument("--openings", default=None, help="JSON file with a list of move lists")
+    coordinator_parser.add_argument("--lease", type=float, default=LEASE_SECONDS)
+    coordinator_parser.add_argument("kind", choices=["round-robin", "gauntlet"])
+    coordinator_parser.add_argument("players", nargs="+", help="for a gauntlet the challenger comes first")
+    worker_parser = subparsers.add_parser("worker")
+    worker_parser.add_argument("--host", default="127.0.0.1")
+    worker_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    worker_parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "coordinator":
+        if args.kind == "round-robin":
+            pairings = list(itertools.combinations(args.players, 2))
+        else:
+            pairings = [(args.players[0], opponent) for opponent in args.players[1:]]
+        openings = None
+        if args.openings is not None:
+            with open(args.openings) as f:
+                openings = json.load(f)
+        jobs = tournament.pairing_jobs(pairings, args.games, args.size, openings)
+        coordinator = Coordinator(jobs, args.host, args.port, args.log, args.lease)
+        print(len(coordinator.pending), "of", len(jobs), "games to play on port", coordinator.address[1])
+        results = coordinator.run()
+        tournament.print_standings(tournament.standings(coordinator.jobs, results))
+    elif args.command == "worker":
+        run_workers(args.host, args.port, args.processes)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
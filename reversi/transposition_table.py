@@ -0,0 +1,149 @@
+"""
+Fixed-size transposition table keyed by Zobrist hash.
+
+The table is a preallocated array of two-slot buckets, so memory stays the same no matter how
+long a tournament runs. Each entry keeps the search depth, the value, whether the value is exact
+or only a lower/upper bound, and the best move found.
+
+SharedTranspositionTable has the same interface but lives in a multiprocessing.shared_memory
+segment, so several search processes can fill and read one table (see reversi/parallel_search.py).
+"""
+import struct
+from multiprocessing import shared_memory
+
+EXACT = 0
+LOWER_BOUND = 1  # the search failed high: the real value is at least this
+UPPER_BOUND = 2  # the search failed low: the real value is at most this
+
+DEPTH_PREFERRED = "depth"
+ALWAYS_REPLACE = "always"
+
+SHARED_SLOT = struct.Struct('<QQ')  # key ^ entry, entry
+
+
+class TranspositionTable:
+
+    def __init__(self, size=2 ** 16, replacement=DEPTH_PREFERRED):
+        """
+        :param size: number of buckets, rounded down to a power of two (each bucket has two slots)
+        :param replacement: DEPTH_PREFERRED keeps the deeper entry in the first slot and puts everything
+            else in the second; ALWAYS_REPLACE overwrites the first slot every time
+        """
+        buckets = 1
+        while buckets * 2 <= size:
+            buckets *= 2
+        self._mask = buckets - 1
+        self.replacement = replacement
+        slots = buckets * 2
+        self._keys = [None] * slots
+        self._depths = [0] * slots
+        self._values = [0] * slots
+        self._flags = [EXACT] * slots
+        self._moves = [None] * slots
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key):
+        """
+        :returns: (depth, value, flag, best_move) for key, or None if it is not in the table
+        """
+        slot = (key & self._mask) * 2
+        if self._keys[slot] != key:
+            slot += 1
+            if self._keys[slot] != key:
+                return None
+        self.hits += 1
+        return self._depths[slot], self._values[slot], self._flags[slot], self._moves[slot]
+
+    def store(self, key, depth, value, flag, best_move=None):
+        slot = (key & self._mask) * 2
+        if self.replacement == DEPTH_PREFERRED and self._keys[slot] != key and self._keys[slot] is not None \
+                and depth < self._depths[slot]:
+            slot += 1
+        self._keys[slot] = key
+        self._depths[slot] = depth
+        self._values[slot] = value
+        self._flags[slot] = flag
+        self._moves[slot] = best_move
+        self.stores += 1
+
+    def clear(self):
+        for i in range(len(self._keys)):
+            self._keys[i] = None
+            self._moves[i] = None
+        self.hits = 0
+        self.stores = 0
+
+
+class SharedTranspositionTable:
+    """
+    Lock-free table in shared memory. Each slot is two 64 bit words: the entry packed into one word,
+    and the key XORed with it. A reader recomputes the key from both words, so an entry torn by two
+    processes writing at once just reads as a miss instead of as a wrong value.
+    Entry word: depth (8 bits), flag (2 bits), value + 2**15 (16 bits), move as x << 8 | y plus one (16 bits).
+    """
+
+    def __init__(self, size=2 ** 16, replacement=DEPTH_PREFERRED, name=None):
+        """
+        :param size: number of buckets, rounded down to a power of two (each bucket has two slots)
+        :param name: attach to the existing segment with this name instead of creating one
+        """
+        buckets = 1
+        while buckets * 2 <= size:
+            buckets *= 2
+        self.size = size
+        self._mask = buckets - 1
+        self.replacement = replacement
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=buckets * 2 * 16)
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.name = self._memory.name
+        self.hits = 0
+        self.stores = 0
+
+    def __reduce__(self):
+        # other processes attach to the same segment instead of copying it
+        return SharedTranspositionTable, (self.size, self.replacement, self.name)
+
+    def probe(self, key):
+        """
+        :returns: (depth, value, flag, best_move) for key, or None if it is not in the table
+        """
+        buf = self._memory.buf
+        offset = (key & self._mask) * 32
+        check, data = SHARED_SLOT.unpack_from(buf, offset)
+        if check ^ data != key:
+            check, data = SHARED_SLOT.unpack_from(buf, offset + 16)
+            if check ^ data != key:
+                return None
+        self.hits += 1
+        move = data & 0xffff
+        if move:
+            move = [(move - 1) >> 8, (move - 1) & 0xff]
+        else:
+            move = None
+        return data >> 34, ((data >> 16) & 0xffff) - 0x8000, (data >> 32) & 3, move
+
+    def store(self, key, depth, value, flag, best_move=None):
+        buf = self._memory.buf
+        offset = (key & self._mask) * 32
+        if self.replacement == DEPTH_PREFERRED:
+            check, data = SHARED_SLOT.unpack_from(buf, offset)
+            if data and check ^ data != key and depth < data >> 34:
+                offset += 16
+        move = 0 if best_move is None else (best_move[0] << 8 | best_move[1]) + 1
+        data = min(depth, 255) << 34 | flag << 32 | (value + 0x8000) << 16 | move
+        SHARED_SLOT.pack_into(buf, offset, key ^ data, data)
+        self.stores += 1
+
+    def clear(self):
+        self._memory.buf[:] = bytes(len(self._memory.buf))
+        self.hits = 0
+        self.stores = 0
+
+    def close(self, unlink=False):
+        # unlink removes the segment for every process, so only the creator should do it
+        self._memory.close()
+        if unlink:
+            self._memory.unlink()
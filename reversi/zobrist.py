@@ -0,0 +1,49 @@
+"""
+Zobrist hashing for reversi positions.
+
+Every (square, symbol) pair gets a fixed random 64-bit key and a position hashes to the xor of
+the keys of its discs, so make_move/undo_move can update the hash with a few xors.
+The keys come from a seeded generator so hashes are the same in every process.
+"""
+import random
+
+SEED = 20191029
+
+
+class ZobristKeys:
+
+    def __init__(self, size):
+        rng = random.Random(SEED + size)
+        self.size = size
+        self.square_keys = {
+            'X': [rng.getrandbits(64) for _ in range(size * size)],
+            'O': [rng.getrandbits(64) for _ in range(size * size)],
+        }
+        # xor of both colours on a square, used to flip a disc in one step
+        self.flip_keys = [x ^ o for x, o in zip(self.square_keys['X'], self.square_keys['O'])]
+        # xored in when it is 'O' to move, so the same discs with a different side to move differ
+        self.side_key = rng.getrandbits(64)
+
+    def hash_cells(self, cells):
+        h = 0
+        for x in range(self.size):
+            for y in range(self.size):
+                if cells[x][y] in self.square_keys:
+                    h ^= self.square_keys[cells[x][y]][x * self.size + y]
+        return h
+
+    def side_to_move(self, symbol):
+        if symbol == 'O':
+            return self.side_key
+        return 0
+
+
+_keys = {}
+
+
+def get_keys(size):
+    keys = _keys.get(size)
+    if keys is None:
+        keys = ZobristKeys(size)
+        _keys[size] = keys
+    return keys
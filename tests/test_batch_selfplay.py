@@ -0,0 +1,27 @@
+import pytest
+
+from reversi.reversi_game import ReversiGame
+from reversi.reversi_players import FantasticPlayerWow, ReallyGreatPlayer
+
+np = pytest.importorskip("numpy")
+from reversi import batch_selfplay
+
+PLAYERS = {"greedy": ReallyGreatPlayer, "fantastic": FantasticPlayerWow}
+
+
+@pytest.mark.parametrize("size", [4, 6, 8])
+@pytest.mark.parametrize("x_policy, o_policy", [("greedy", "greedy"), ("greedy", "fantastic"),
+                                                ("fantastic", "greedy"), ("fantastic", "fantastic")])
+def test_deterministic_policies_match_reversi_game(size, x_policy, o_policy):
+    x_discs, o_discs, plies = batch_selfplay.play_batch(3, x_policy, o_policy, size, seed=0)
+    game = ReversiGame(PLAYERS[x_policy]("X"), PLAYERS[o_policy]("O"), show_status=False, board_size=size)
+    scores = game.board.calc_scores()
+    assert x_discs.tolist() == [scores["X"]] * 3
+    assert o_discs.tolist() == [scores["O"]] * 3
+    assert plies.tolist() == [game.board.get_move_count()] * 3
+
+
+def test_random_games_end_when_neither_side_can_move():
+    x_discs, o_discs, plies = batch_selfplay.play_batch(50, "random", "random", 6, seed=1)
+    assert ((x_discs + o_discs) <= 36).all()
+    assert (plies == x_discs + o_discs - 4).all()
@@ -0,0 +1,61 @@
+import copy
+
+from reversi import benchmark
+
+
+def results(perft_leaves=55092, perft_relative=400.0, micro_relative=0.008, move=(2, 4), nodes=72):
+    return {
+        'perft': [{'name': 'start 8x8', 'backend': backend, 'depth': 7, 'leaves': perft_leaves, 'seconds': 0.5,
+                   'relative': perft_relative} for backend in ('bitboard', 'list')],
+        'micro': [{'name': 'make_move+undo_move', 'backend': 'bitboard', 'microseconds': 8.0, 'relative': micro_relative}],
+        'search': [{'player': 'get_default_player', 'position': 'start', 'move': list(move), 'nodes': nodes,
+                    'seconds': 0.2, 'relative': 200.0}],
+    }
+
+
+def statuses(lines):
+    return [line.split()[0] for line in lines]
+
+
+def test_same_results_pass():
+    lines, failures = benchmark.compare(results(), results())
+    assert failures == 0
+    assert statuses(lines) == ['ok'] * 4
+
+
+def test_wrong_perft_count_is_an_error():
+    lines, failures = benchmark.compare(results(perft_leaves=55093), results(perft_leaves=55093))
+    # both backends disagree with KNOWN_PERFT
+    assert failures == 2 and statuses(lines).count('ERROR') == 2
+    lines, failures = benchmark.compare(results(perft_leaves=55093), results())
+    assert failures == 4
+
+
+def test_slower_fails_only_when_strict():
+    slower = results(perft_relative=600.0)
+    lines, failures = benchmark.compare(slower, results())
+    assert failures == 0 and statuses(lines).count('slower?') == 2
+    lines, failures = benchmark.compare(slower, results(), strict=True)
+    assert failures == 2 and statuses(lines).count('SLOWER') == 2
+    # half as slow again, but only 0.15 us per call, under the noise floor
+    quick, baseline = results(micro_relative=0.012), results()
+    quick['micro'][0]['microseconds'] = baseline['micro'][0]['microseconds'] = 0.3
+    lines, failures = benchmark.compare(quick, baseline, strict=True)
+    assert failures == 0 and statuses(lines).count('ok') == 4
+    lines, failures = benchmark.compare(results(perft_relative=200.0), results(), strict=True)
+    assert failures == 0 and statuses(lines).count('faster') == 2
+
+
+def test_changed_search_and_new_results_are_reported():
+    baseline = results()
+    del baseline['micro']
+    lines, failures = benchmark.compare(results(move=(3, 5), nodes=90), baseline)
+    assert failures == 0
+    assert 'new' in statuses(lines) and 'changed' in statuses(lines)
+
+
+def test_known_perft_from_the_start():
+    board = benchmark.make_board(8)
+    position = copy.deepcopy(board)
+    assert [benchmark.perft(board, 'X', depth) for depth in range(6)] == benchmark.KNOWN_PERFT[:6]
+    assert board.get_bitboards() == position.get_bitboards()
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from reversi import endgame
+
+
+def brute_force(board, symbol):
+    # exact final disc difference for symbol by plain negamax over every move
+    opponent = board.get_opponent_symbol(symbol)
+    moves = board.calc_valid_moves(symbol)
+    if not moves:
+        if not board.calc_valid_moves(opponent):
+            scores = board.calc_scores()
+            return scores[symbol] - scores[opponent]
+        return -brute_force(board, opponent)
+    best = None
+    for move in moves:
+        board.make_move(symbol, move)
+        value = -brute_force(board, opponent)
+        board.undo_move()
+        if best is None or value > best:
+            best = value
+    return best
+
+
+@pytest.mark.parametrize("size, empties", [(4, 10), (6, 7), (8, 7)])
+def test_solve_matches_brute_force(size, empties):
+    rng = random.Random(size)
+    solver = endgame.EndgameSolver(size)
+    solved = 0
+    while solved < 8:
+        position = endgame.random_position(empties, size, rng)
+        if position is None:
+            continue
+        board, symbol = position
+        expected = brute_force(board, symbol)
+        assert solver.solve_board(board, symbol) == expected
+        move, value = solver.best_move(board, symbol)
+        assert value == expected
+        board.make_move(symbol, move)
+        assert -brute_force(board, board.get_opponent_symbol(symbol)) == expected
+        solved += 1
+
+
+def test_solve_respects_the_window():
+    rng = random.Random(5)
+    solver = endgame.EndgameSolver(6)
+    board, symbol = None, None
+    while board is None:
+        board, symbol = endgame.random_position(7, 6, rng) or (None, None)
+    exact = brute_force(board, symbol)
+    # fail-soft bounds: a value outside the window is still on the right side of it
+    assert solver.solve_board(board, symbol, exact, exact + 1) <= exact
+    assert solver.solve_board(board, symbol, exact - 1, exact) >= exact
@@ -0,0 +1,51 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from reversi import evaluation
+from reversi import pattern_eval
+from reversi.player3.all_players import MinimaxPlayerG3
+from tests.test_search import POSITIONS, random_position, search
+
+
+def evaluators():
+    return [evaluation.DiscCountEvaluator(), pattern_eval.PatternEvaluator()]
+
+
+@pytest.mark.parametrize("evaluator", evaluators(), ids=["disc count", "pattern"])
+def test_batch_matches_one_at_a_time(evaluator):
+    positions = []
+    for plies, seed in POSITIONS + [(50, 5), (58, 6)]:
+        board, symbol = random_position(plies, seed)
+        x_bits, o_bits = board.get_bitboards()
+        positions.append((x_bits, o_bits) if symbol == "X" else (o_bits, x_bits))
+        assert evaluator.evaluate_board(board, symbol) == evaluator.evaluate(*positions[-1])
+    batch = evaluator.evaluate_batch(evaluation.pack_boards(positions)).tolist()
+    assert batch == [evaluator.evaluate(own, opp) for own, opp in positions]
+
+
+@pytest.mark.parametrize("evaluator", evaluators(), ids=["disc count", "pattern"])
+@pytest.mark.parametrize("plies, seed", POSITIONS + [(52, 7)])
+def test_batched_search_gives_the_same_move_and_value(evaluator, plies, seed):
+    board, symbol = random_position(plies, seed)
+    expected = search(board, symbol, 3, evaluator=evaluator)
+    assert search(board, symbol, 3, evaluator=evaluator, batch_eval=True) == expected
+
+
+@pytest.mark.parametrize("evaluator", evaluators(), ids=["disc count", "pattern"])
+def test_children_that_end_the_game_score_their_disc_difference(evaluator):
+    # the last empty squares, so some children end the game; every child is scored as search would
+    finished = 0
+    for plies, seed in [(56, 1), (57, 2), (58, 3), (59, 4)]:
+        board, symbol = random_position(plies, seed)
+        player = MinimaxPlayerG3(symbol, beam_search_enabled=False, evaluator=evaluator, batch_eval=True)
+        player.prepare_search(board)
+        moves = board.generate_moves(symbol)
+        values = player.evaluate_children(board, moves, symbol)
+        opponent = board.get_opponent_symbol(symbol)
+        for move, value in zip(moves, values):
+            board.make_move(symbol, move)
+            assert value == -player.negamax(board, 0, -10000, 10000, opponent, 1)
+            finished += not board.game_continues()
+            board.undo_move()
+    assert finished > 0
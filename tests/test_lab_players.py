@@ -0,0 +1,54 @@
+import pytest
+
+from reversi.individual_lab_players.g3_ab_pruning_player import G3MinimaxPlayerABPruning
+from reversi.individual_lab_players.g3_beam_search_player import G3MinimaxPlayerBeamSearch
+from reversi.individual_lab_players.g3_transposition_table_player import G3MinimaxPlayerTranspositionTable
+from reversi.reversi_board import ReversiBoard
+from reversi.reversi_players import ReallyGreatPlayer
+
+LAB_PLAYERS = [
+    G3MinimaxPlayerBeamSearch,
+    G3MinimaxPlayerTranspositionTable,
+    lambda symbol: G3MinimaxPlayerABPruning(symbol, max_depth=3),
+]
+
+
+def play_game(players, size, bitboard):
+    # plays to the end, checking every move is valid and that the player left the board as it was
+    board = ReversiBoard(size, bitboard=bitboard)
+    symbol = 'X'
+    while board.game_continues():
+        moves = board.calc_valid_moves(symbol)
+        if moves:
+            position = board.get_bitboards()
+            move = players[symbol].get_move(board)
+            assert board.get_bitboards() == position
+            assert list(move) in moves
+            board.make_move(symbol, move)
+        symbol = board.get_opponent_symbol(symbol)
+    return board
+
+
+@pytest.mark.parametrize("lab_player", LAB_PLAYERS)
+@pytest.mark.parametrize("bitboard", [True, False])
+def test_lab_player_plays_full_games(lab_player, bitboard):
+    for size, lab_symbol in ((6, 'X'), (8, 'O')):
+        other = 'O' if lab_symbol == 'X' else 'X'
+        board = play_game({lab_symbol: lab_player(lab_symbol), other: ReallyGreatPlayer(other)}, size, bitboard)
+        assert board.get_empty_count() == 0 or not board.game_continues()
+
+
+def test_transposition_table_gives_the_plain_minimax_values():
+    board = ReversiBoard(8)
+    for move, symbol in (((2, 4), 'X'), ((4, 5), 'O'), ((5, 5), 'X'), ((2, 3), 'O')):
+        board.make_move(symbol, move)
+    player = G3MinimaxPlayerTranspositionTable('X')
+
+    class NeverSeen(dict):
+        def __contains__(self, key):
+            return False
+
+    for move in board.calc_valid_moves('X'):
+        board.make_move('X', move)
+        assert player.minimax(board, 3, 1, False, {}) == player.minimax(board, 3, 1, False, NeverSeen())
+        board.undo_move()
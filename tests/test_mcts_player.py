@@ -0,0 +1,52 @@
+import pytest
+
+from reversi.player3.mcts_player import MCTSPlayer, playouts
+from reversi.reversi_game import ReversiGame
+from reversi.reversi_players import GreedyComputerPlayer
+from tests.test_search import random_position
+
+
+def test_playouts_of_a_finished_game_score_the_result():
+    size = 4
+    full = (1 << size * size) - 1
+    own = 0b1111111  # 7 squares against 9
+    assert playouts(own, full & ~own, 5, size, 0) == 0
+    assert playouts(full & ~own, own, 5, size, 0) == 5
+    half = (1 << 8) - 1
+    assert playouts(half, full & ~half, 3, size, 0) == 1.5
+
+
+@pytest.mark.parametrize("options", [{'time_limit': 0}, {'max_playouts': 0}])
+def test_an_empty_budget_still_gives_a_move(options):
+    board, symbol = random_position(10, 1)
+    player = MCTSPlayer(symbol, seed=1, **options)
+    move = player.get_move(board)
+    assert list(move) in board.calc_valid_moves(symbol)
+    assert player.playouts == player.batch_size * player.leaf_playouts
+
+
+def test_playout_budget_and_seed():
+    board, symbol = random_position(16, 2)
+    moves = set()
+    for _ in range(2):
+        player = MCTSPlayer(symbol, max_playouts=200, seed=7)
+        moves.add(tuple(player.get_move(board)))
+        assert 200 <= player.playouts < 200 + player.batch_size * player.leaf_playouts
+    assert len(moves) == 1
+
+
+def test_plays_full_games_and_closes_its_pool():
+    player = MCTSPlayer('X', max_playouts=64, workers=2, seed=3)
+    game = ReversiGame(player, GreedyComputerPlayer('O'), show_status=False, board_size=6)
+    assert not game.board.game_continues()
+    assert sum(game.board.calc_scores().values()) > 4
+    assert player.executor is None
+
+
+def test_takes_the_only_move_without_searching():
+    board, symbol = random_position(12, 49)
+    moves = board.calc_valid_moves(symbol)
+    assert len(moves) == 1
+    player = MCTSPlayer(symbol, seed=0)
+    assert list(player.get_move(board)) == moves[0]
+    assert player.playouts == 0
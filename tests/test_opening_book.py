@@ -0,0 +1,46 @@
+import pytest
+
+from reversi import opening_book
+from reversi.player3.all_players import get_book_player
+from reversi.reversi_board import ReversiBoard
+
+
+def colour_swapped(board):
+    # board with every X an O and every O an X
+    size = board.get_size()
+    swapped = ReversiBoard(size)
+    swapped._board = [[{'X': 'O', 'O': 'X'}.get(board.get_symbol_for_position([x, y]), ' ')
+                       for y in range(size)] for x in range(size)]
+    return swapped
+
+
+@pytest.mark.parametrize("first", ['X', 'O'])
+def test_book_covers_the_opening_whoever_moves_first(first):
+    book = opening_book.load_default_book(8)
+    assert book is not None
+    board = ReversiBoard(8)
+    symbol = first
+    for ply in range(6):
+        move = book.lookup(board, symbol)
+        assert move is not None, "ply %d not in the book" % ply
+        assert board.make_move(symbol, move)
+        symbol = board.get_opponent_symbol(symbol)
+
+
+def test_colour_swapped_positions_share_a_key():
+    board = ReversiBoard(8)
+    for move, symbol in (((2, 4), 'X'), ((4, 5), 'O'), ((5, 5), 'X')):
+        board.make_move(symbol, move)
+    key = opening_book.book_key(board, 'O')[0]
+    assert opening_book.book_key(colour_swapped(board), 'X')[0] == key
+    # and the book move comes back as the same square on either board
+    book = opening_book.load_default_book(8)
+    assert book.lookup(board, 'O') == book.lookup(colour_swapped(board), 'X')
+    assert opening_book.book_key(board, 'X')[0] != key
+
+
+def test_book_player_plays_from_the_book_as_o():
+    player = get_book_player('O')
+    board = ReversiBoard(8)
+    move = player.get_move(board)
+    assert move == opening_book.load_default_book(8).lookup(board, 'O')
@@ -0,0 +1,45 @@
+import pytest
+
+from reversi import parallel_search
+from reversi.player3.all_players import MinimaxPlayerG3
+from tests.test_search import POSITIONS, random_position, search
+
+
+@pytest.fixture
+def players():
+    made = []
+
+    def make(symbol, **options):
+        player = MinimaxPlayerG3(symbol, beam_search_enabled=False, workers=2, **options)
+        made.append(player)
+        return player
+    yield make
+    for player in made:
+        if player.parallel is not None:
+            processes = player.parallel.processes
+            player.parallel.close()
+            assert not any(process.is_alive() for process in processes)
+
+
+def test_root_split_gives_the_single_process_value(players):
+    for plies, seed in POSITIONS:
+        board, symbol = random_position(plies, seed)
+        expected = search(board, symbol, 4, transposition_table=False)
+        player = players(symbol, max_depth=4, transposition_table=False)
+        move = player.get_move(board)
+        assert player.parallel.mode == parallel_search.ROOT_SPLIT
+        assert list(move) in board.calc_valid_moves(symbol)
+        # the helper's share can hold a move as good as the main process's, so compare values
+        board.make_move(symbol, move)
+        assert -search(board, board.get_opponent_symbol(symbol), 3, transposition_table=False)[1] == expected[1]
+        board.undo_move()
+
+
+def test_lazy_smp_helpers_search_the_shared_table(players):
+    board, symbol = random_position(20, 3)
+    player = players(symbol, max_depth=4)
+    move = player.get_move(board)
+    assert player.parallel.mode == parallel_search.LAZY_SMP
+    assert list(move) in board.calc_valid_moves(symbol)
+    assert player.parallel.helper_nodes > 0
+    assert player.table.stores > 0
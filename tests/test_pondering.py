@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from reversi.player3.all_players import MinimaxPlayerG3
+from reversi.reversi_board import ReversiBoard
+from reversi.reversi_game import ReversiGame
+from reversi.reversi_players import HumanPlayer
+
+
+def pondering_player(symbol):
+    return MinimaxPlayerG3(symbol, max_depth=2, beam_search_enabled=False, ponder=True)
+
+
+class FirstMoveComputer:
+    # thinks for a moment and plays its first valid move, noting whether the opponent is pondering
+
+    def __init__(self, symbol, opponent):
+        self.symbol = symbol
+        self.opponent = opponent
+        self.ponders_seen = 0
+
+    def get_move(self, board):
+        time.sleep(0.02)
+        if self.opponent.ponder_thread is not None:
+            self.ponders_seen += 1
+        return board.calc_valid_moves(self.symbol)[0]
+
+
+class FirstMoveHuman(FirstMoveComputer, HumanPlayer):
+    pass
+
+
+def test_ponder_needs_a_table():
+    with pytest.raises(ValueError):
+        MinimaxPlayerG3('X', ponder=True, transposition_table=False)
+
+
+def test_ponder_keeps_its_own_statistics():
+    board = ReversiBoard(8)
+    player = pondering_player('X')
+    player.get_move(board)
+    nodes, history = player.nodes, {side: list(scores) for side, scores in player.history.items()}
+    assert player.ponder_thread is not None
+    time.sleep(0.05)
+    player.stop_pondering()
+    assert player.ponder_thread is None
+    assert player.ponder_nodes > 0
+    assert player.nodes == nodes
+    assert player.history == history
+
+
+@pytest.mark.parametrize("opponent_class, pondering", [(FirstMoveHuman, True), (FirstMoveComputer, False)])
+def test_ponder_only_runs_on_a_humans_time(opponent_class, pondering):
+    player = pondering_player('X')
+    opponent = opponent_class('O', player)
+    ReversiGame(player, opponent, show_status=False, board_size=6)
+    assert (opponent.ponders_seen > 0) == pondering
+    assert player.ponder_thread is None
@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from reversi import pattern_eval
+from reversi import zobrist
+from reversi.benchmark import GAME, KNOWN_PERFT, make_board, perft
+from reversi.reversi_board import ReversiBoard
+from reversi.reversi_game import ReversiGame
+
+BACKENDS = [True, False]
+
+
+def state(board):
+    # everything make_move/undo_move change, read through the public API
+    return (board.get_bitboards(), board.get_hash(), board.calc_scores(), board.get_move_count(),
+            board.get_empty_count(), board.calc_valid_moves('X'), board.calc_valid_moves('O'))
+
+
+def cells(board):
+    size = board.get_size()
+    return [[board.get_symbol_for_position((x, y)) for y in range(size)] for x in range(size)]
+
+
+def random_moves(board, symbol, count, rng):
+    # plays up to count random moves (passing where needed); returns the symbol to move after them
+    for _ in range(count):
+        if not board.game_continues():
+            break
+        moves = board.calc_valid_moves(symbol)
+        if moves:
+            board.make_move(symbol, rng.choice(moves))
+        symbol = board.get_opponent_symbol(symbol)
+    return symbol
+
+
+@pytest.mark.parametrize("bitboard", BACKENDS)
+def test_perft_start_position(bitboard):
+    for depth in range(7):
+        assert perft(ReversiBoard(8, bitboard=bitboard), 'X', depth) == KNOWN_PERFT[depth]
+
+
+@pytest.mark.parametrize("size, plies, depth", [(6, 0, 6), (8, 20, 3), (8, 44, 4)])
+def test_perft_backends_agree(size, plies, depth):
+    counts = [perft(make_board(size, plies, bitboard), 'X', depth) for bitboard in BACKENDS]
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.parametrize("bitboard", BACKENDS)
+def test_make_undo_restores_state(bitboard):
+    rng = random.Random(1)
+    for _ in range(20):
+        board = ReversiBoard(8, bitboard=bitboard)
+        symbol = random_moves(board, 'X', rng.randrange(50), rng)
+        before = state(board)
+        moves = board.calc_valid_moves(symbol)
+        if not moves:
+            continue
+        for move in moves:
+            board.make_move(symbol, move)
+            assert board.get_hash() == zobrist.get_keys(8).hash_cells(cells(board))
+            assert board.calc_scores() == {s: sum(row.count(s) for row in cells(board)) for s in 'XO'}
+            board.undo_move()
+            assert state(board) == before
+
+
+@pytest.mark.parametrize("bitboard", BACKENDS)
+def test_listener_indices_follow_make_and_undo(bitboard):
+    patterns = pattern_eval.get_patterns()
+    rng = random.Random(2)
+    board = ReversiBoard(8, bitboard=bitboard)
+    tracker = pattern_eval.PatternIndices(patterns, *board.get_bitboards())
+    board.add_listener(tracker)
+    symbol = 'X'
+    for _ in range(60):
+        moves = board.calc_valid_moves(symbol)
+        if moves:
+            board.make_move(symbol, rng.choice(moves))
+            assert tracker.indices == patterns.indices(*board.get_bitboards())
+            if rng.random() < 0.3:
+                board.undo_move()
+                assert tracker.indices == patterns.indices(*board.get_bitboards())
+                continue
+        elif not board.game_continues():
+            break
+        symbol = board.get_opponent_symbol(symbol)
+    while board.get_move_count():
+        board.undo_move()
+        assert tracker.indices == patterns.indices(*board.get_bitboards())
+
+
+@pytest.mark.parametrize("bitboard", BACKENDS)
+def test_snapshot_is_isolated(bitboard):
+    board = make_board(8, 20, bitboard)
+    before = state(board)
+    snapshot = board.snapshot()
+    random_moves(snapshot, 'X', 10, random.Random(3))
+    snapshot.undo_move()
+    assert state(board) == before
+    # and the other way round: the snapshot keeps the position it was taken at
+    snapshot = board.snapshot()
+    taken = state(snapshot)
+    board.make_move('X', board.calc_valid_moves('X')[0])
+    assert state(snapshot) == taken
+    board.undo_move()
+    assert state(board) == before
+
+
+def test_snapshot_list_backend_cells_are_copied_on_write():
+    board = make_board(8, 20, bitboard=False)
+    before = state(board)
+    snapshot = board.snapshot()
+    snapshot._board[0][0] = 'X'
+    assert state(board) == before
+
+
+class FirstMovePlayer:
+
+    def __init__(self, symbol, messy=False):
+        self.symbol = symbol
+        self.messy = messy
+        self.rng = random.Random(4)
+
+    def get_move(self, board):
+        move = board.calc_valid_moves(self.symbol)[0]
+        if self.messy:
+            # play on in the board we were given and leave the moves there
+            random_moves(board, self.symbol, 5, self.rng)
+        return move
+
+
+def test_players_cannot_change_the_game_board():
+    clean = ReversiGame(FirstMovePlayer('X'), FirstMovePlayer('O'), show_status=False, board_size=6)
+    messy = ReversiGame(FirstMovePlayer('X', True), FirstMovePlayer('O', True), show_status=False, board_size=6)
+    assert state(messy.board) == state(clean.board)
@@ -0,0 +1,152 @@
+import random
+import time
+
+import pytest
+
+from reversi.player3.all_players import MinimaxPlayerG3
+from reversi.reversi_board import ReversiBoard
+from reversi.transposition_table import TranspositionTable, SharedTranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+
+def random_position(plies, seed, size=8):
+    # the position after plies random moves, with the side to move
+    rng = random.Random(seed)
+    board = ReversiBoard(size)
+    symbol = 'X'
+    while board.get_move_count() < plies and board.game_continues():
+        moves = board.calc_valid_moves(symbol)
+        if moves:
+            board.make_move(symbol, rng.choice(moves))
+        symbol = board.get_opponent_symbol(symbol)
+    if not board.calc_valid_moves(symbol):
+        symbol = board.get_opponent_symbol(symbol)
+    return board, symbol
+
+
+def search(board, symbol, depth, **options):
+    options.setdefault('beam_search_enabled', False)
+    return search_with(MinimaxPlayerG3(symbol, max_depth=depth, **options), board, depth)
+
+
+def search_with(player, board, depth):
+    # (best move, value) of player's search_root, which must leave the board as it was
+    position = board.get_bitboards()
+    player.prepare_search(board)
+    result = player.search_root(board, depth, board.calc_valid_moves(player.symbol))
+    assert board.get_bitboards() == position
+    return result
+
+
+def plain_search(board, symbol, depth):
+    return search(board, symbol, depth, ab_pruning=False, transposition_table=False, move_ordering_enabled=False)
+
+
+POSITIONS = [(0, 1), (9, 2), (20, 3), (31, 4)]
+
+
+@pytest.mark.parametrize("table_class", [TranspositionTable, SharedTranspositionTable])
+def test_table_keeps_the_deeper_entry(table_class):
+    table = table_class(4)
+    try:
+        table.store(1, 5, -7, LOWER_BOUND, [2, 3])
+        assert table.probe(1) == (5, -7, LOWER_BOUND, [2, 3])
+        # same bucket, shallower: goes in the second slot and the first one stays
+        table.store(5, 2, 11, UPPER_BOUND)
+        assert table.probe(5) == (2, 11, UPPER_BOUND, None)
+        assert table.probe(1) == (5, -7, LOWER_BOUND, [2, 3])
+        table.store(1, 6, 0, EXACT, [0, 0])
+        assert table.probe(1) == (6, 0, EXACT, [0, 0])
+        assert table.probe(9) is None
+    finally:
+        if isinstance(table, SharedTranspositionTable):
+            table.close(unlink=True)
+
+
+@pytest.mark.parametrize("plies, seed", POSITIONS)
+def test_table_gives_the_same_move_and_value(plies, seed):
+    board, symbol = random_position(plies, seed)
+    expected = plain_search(board, symbol, 3)
+    assert search(board, symbol, 3, ab_pruning=False, move_ordering_enabled=False) == expected
+    assert search(board, symbol, 3, ab_pruning=True, move_ordering_enabled=False) == expected
+
+
+def test_table_is_reused_from_one_move_to_the_next():
+    board, symbol = random_position(12, 5)
+    player = MinimaxPlayerG3(symbol, max_depth=3, beam_search_enabled=False)
+    first = player.get_move(board)
+    hits = player.table.hits
+    assert player.get_move(board) == first
+    assert player.table.hits > hits
+
+
+@pytest.mark.parametrize("plies, seed", POSITIONS)
+def test_iterative_deepening_returns_the_last_finished_search(plies, seed):
+    board, symbol = random_position(plies, seed)
+    player = MinimaxPlayerG3(symbol, beam_search_enabled=False, time_limit=0.3)
+    position = board.get_bitboards()
+    player.prepare_search(board)
+    player.set_deadline(time.perf_counter() + 0.3)
+    move, score = player.iterative_deepening(board, symbol, board.calc_valid_moves(symbol))
+    assert board.get_bitboards() == position
+    assert player.deadline is None
+    assert player.completed_depth >= 1
+    assert list(move) in board.calc_valid_moves(symbol)
+    assert score == search(board, symbol, player.completed_depth, transposition_table=False)[1]
+
+
+def test_timed_move_stops_on_time():
+    board, symbol = random_position(20, 3)
+    player = MinimaxPlayerG3(symbol, beam_search_enabled=False, time_limit=0.2)
+    start = time.perf_counter()
+    move = player.get_move(board)
+    assert time.perf_counter() - start < 1
+    assert list(move) in board.calc_valid_moves(symbol)
+
+
+@pytest.mark.parametrize("plies, seed", POSITIONS)
+def test_alpha_beta_gives_the_minimax_move_and_value(plies, seed):
+    board, symbol = random_position(plies, seed)
+    expected = plain_search(board, symbol, 4)
+    assert search(board, symbol, 4, transposition_table=False, move_ordering_enabled=False) == expected
+
+
+@pytest.mark.parametrize("plies, seed", POSITIONS)
+@pytest.mark.parametrize("guess", [-20, 0, 20])
+def test_aspiration_window_gives_the_full_window_value(plies, seed, guess):
+    # a wrong guess falls outside the window and has to be searched again
+    board, symbol = random_position(plies, seed)
+    expected = plain_search(board, symbol, 4)
+    player = MinimaxPlayerG3(symbol, beam_search_enabled=False, transposition_table=False, move_ordering_enabled=False)
+    player.prepare_search(board)
+    assert player.aspiration_search(board, 4, board.calc_valid_moves(symbol), expected[1] + guess, symbol) == expected
+
+
+@pytest.mark.parametrize("plies, seed", POSITIONS)
+def test_move_ordering_keeps_the_move_and_searches_less(plies, seed):
+    board, symbol = random_position(plies, seed)
+    results = []
+    for options in ({'move_ordering_enabled': False}, {}, {'killer_moves': True}):
+        player = MinimaxPlayerG3(symbol, beam_search_enabled=False, transposition_table=False, **options)
+        player.prepare_search(board)
+        results.append((player.search_root(board, 5, board.calc_valid_moves(symbol)), player.nodes))
+    unordered, nodes = results[0]
+    for result, ordered_nodes in results[1:]:
+        assert result == unordered
+        assert ordered_nodes < nodes
+
+
+def test_probcut_cuts_only_disc_count_searches():
+    from reversi import evaluation
+    cuts = 0
+    for plies, seed in POSITIONS:
+        board, symbol = random_position(plies, seed)
+        player = MinimaxPlayerG3(symbol, beam_search_enabled=False, probcut_enabled=True)
+        move, _ = search_with(player, board, 6)
+        assert list(move) in board.calc_valid_moves(symbol)
+        cuts += player.probcut_cuts
+        # the cut thresholds were fitted on disc-count values, so another evaluator turns the cuts off
+        player = MinimaxPlayerG3(symbol, beam_search_enabled=False, probcut_enabled=True,
+                                 evaluator=evaluation.DiscCountEvaluator())
+        search_with(player, board, 6)
+        assert player.probcut_cuts == 0
+    assert cuts > 0
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from reversi import sprt
+
+
+def simulate(test, elo, rng, max_pairs=20000):
+    # feeds test pairs of games from a player elo stronger than its opponent (no draws) until it decides
+    p = sprt.elo_to_score(elo)
+    for _ in range(max_pairs):
+        test.add_pair(float(rng.random() < p), float(rng.random() < p))
+        status = test.status()
+        if status is not sprt.CONTINUE:
+            return status
+    return sprt.CONTINUE
+
+
+def test_elo_and_score_convert_both_ways():
+    assert sprt.elo_to_score(0) == 0.5
+    for elo in (-300, -20, 5, 150):
+        assert sprt.score_to_elo(sprt.elo_to_score(elo)) == pytest.approx(elo)
+    assert sprt._normal_quantile(0.975) == pytest.approx(1.959964, abs=1e-5)
+
+
+@pytest.mark.parametrize("pentanomial", [True, False])
+@pytest.mark.parametrize("elo, expected", [(80, sprt.ACCEPT_H1), (-80, sprt.ACCEPT_H0), (40, sprt.ACCEPT_H1), (-10, sprt.ACCEPT_H0)])
+def test_reaches_the_right_bound(pentanomial, elo, expected):
+    rng = random.Random(elo)
+    test = sprt.SPRT(elo0=0, elo1=20, pentanomial=pentanomial)
+    assert simulate(test, elo, rng) == expected
+    llr = test.llr()
+    assert llr >= test.upper if expected == sprt.ACCEPT_H1 else llr <= test.lower
+
+
+def test_a_one_sided_match_stops_early():
+    test = sprt.SPRT(elo0=0, elo1=20)
+    pairs = 0
+    while test.status() is sprt.CONTINUE:
+        test.add_pair(1.0, 1.0)
+        pairs += 1
+    assert test.status() == sprt.ACCEPT_H1
+    assert pairs < 20
+
+
+def test_pairs_count_as_games_and_as_pairs():
+    test = sprt.SPRT()
+    test.add_pair(1.0, 0.5)
+    test.add_pair(0.0, 1.0)
+    assert test.trinomial_counts == [1, 1, 2]
+    assert test.pentanomial_counts == [0, 0, 1, 1, 0]
+    n, mean, _ = test.stats()
+    assert (n, mean) == (2, 0.625)
+
+
+def test_sprt_compare_plays_up_to_max_games():
+    status, test = sprt.sprt_compare("ReallyGreatPlayer", "RandomComputerPlayer", max_games=4, workers=1,
+                                     board_size=4, opening_plies=2, verbose=False)
+    assert status in (sprt.ACCEPT_H0, sprt.ACCEPT_H1, sprt.CONTINUE)
+    assert sum(test.trinomial_counts) == 2 * sum(test.pentanomial_counts) <= 4
@@ -0,0 +1,44 @@
+from reversi import opening_book
+from reversi import sweep
+from reversi.player3.all_players import MinimaxPlayerG3
+from reversi.reversi_board import ReversiBoard
+
+
+def test_second_sweep_reads_every_cell_from_the_cache(tmp_path, capsys):
+    grid = {"max_depth": [1, 2], "beam_search_enabled": [False]}
+    first = sweep.run_sweep(grid, "ReallyGreatPlayer", games=2, board_size=4, workers=1, cache_dir=str(tmp_path))
+    assert "0 of 2 cells cached" in capsys.readouterr().out
+    assert all(record["wins"] + record["losses"] + record["ties"] == 2 for _, record in first)
+    assert all(record["nodes"] > 0 for _, record in first)
+    second = sweep.run_sweep(grid, "ReallyGreatPlayer", games=2, board_size=4, workers=1, cache_dir=str(tmp_path))
+    assert "2 of 2 cells cached" in capsys.readouterr().out
+    assert second == first
+    # another opponent is another cell
+    sweep.run_sweep({"max_depth": [1]}, "RandomComputerPlayer", games=1, board_size=4, workers=1, cache_dir=str(tmp_path))
+    assert "0 of 1 cells cached" in capsys.readouterr().out
+
+
+def test_code_hash_follows_the_player_modules():
+    files = [path.replace("\\", "/") for path in sweep.code_files(["reversi.sweep"])]
+    assert any(path.endswith("reversi/player3/all_players.py") for path in files)
+    assert any(path.endswith("reversi/opening_book.bin") for path in files)
+    assert not any(path.endswith("reversi/benchmark.py") for path in files)
+    assert sweep.code_hash("ReallyGreatPlayer") == sweep.code_hash("RandomComputerPlayer")
+    assert sweep.code_hash("reversi.player3.mcts_player:get_mcts_player") != sweep.code_hash("ReallyGreatPlayer")
+
+
+def test_book_moves_search_no_nodes():
+    player = MinimaxPlayerG3("X", max_depth=2, beam_search_enabled=False, book_enabled=True)
+    board = ReversiBoard(8)
+    player.book_enabled = False
+    player.get_move(board)
+    assert player.nodes > 0
+    player.book_enabled = True
+    assert player.get_move(board) == opening_book.load_default_book(8).lookup(board, "X")
+    assert player.nodes == 0
+
+
+def test_format_table_with_no_games():
+    record = {"wins": 0, "losses": 0, "ties": 0, "time": 0.0, "moves": 0, "nodes": 0}
+    lines = sweep.format_table([({"max_depth": 3}, record)]).splitlines()
+    assert len(lines) == 2 and lines[1].split()[:2] == ["3", "0.00"]
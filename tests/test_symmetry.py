@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from reversi import bitboard as bitboard_ops
+from reversi import symmetry
+from tests.test_search import POSITIONS, random_position, search
+
+
+@pytest.mark.parametrize("size", [4, 6, 8])
+def test_transforms_match_the_square_tables(size):
+    rng = random.Random(size)
+    for _ in range(20):
+        bits = rng.getrandbits(size * size)
+        for t in symmetry.TRANSFORMS:
+            image = symmetry.transform_bits(bits, t, size)
+            assert image == symmetry._permute(bits, symmetry._get_permutations(size)[t])
+            assert symmetry.transform_bits(image, symmetry.inverse(t), size) == bits
+            for square in bitboard_ops.iter_squares(bits):
+                x, y = symmetry.transform_position(bitboard_ops.square_to_position(square, size), t, size)
+                assert image >> (x * size + y) & 1
+
+
+@pytest.mark.parametrize("plies, seed", POSITIONS)
+def test_symmetric_positions_share_a_canonical_key(plies, seed):
+    board, symbol = random_position(plies, seed)
+    size = board.get_size()
+    key, transform = symmetry.canonical_hash(board, symbol)
+    x_bits, o_bits = board.get_bitboards()
+    for t in symmetry.TRANSFORMS:
+        images = (symmetry.transform_bits(x_bits, t, size), symmetry.transform_bits(o_bits, t, size))
+        canonical = symmetry.canonical(images[0], images[1], size)
+        assert canonical[:2] == symmetry.canonical(x_bits, o_bits, size)[:2]
+        # and the transform maps the position onto the canonical one
+        assert (symmetry.transform_bits(images[0], canonical[2], size),
+                symmetry.transform_bits(images[1], canonical[2], size)) == canonical[:2]
+    assert symmetry.canonical_hash(board, board.get_opponent_symbol(symbol))[0] != key
+
+
+@pytest.mark.parametrize("plies, seed", POSITIONS)
+def test_symmetric_table_gives_the_same_move_and_value(plies, seed):
+    board, symbol = random_position(plies, seed)
+    expected = search(board, symbol, 4, move_ordering_enabled=False)
+    assert search(board, symbol, 4, move_ordering_enabled=False, symmetric_table=True) == expected
+    assert search(board, symbol, 4, symmetric_table=True) == search(board, symbol, 4)
@@ -0,0 +1,30 @@
+import pytest
+
+from reversi import tournament
+
+
+def test_pairing_jobs_reject_self_play():
+    with pytest.raises(ValueError):
+        tournament.pairing_jobs([("get_player_b", "get_player_d"), ("get_player_b", "get_player_b")], 2)
+    with pytest.raises(ValueError):
+        tournament.round_robin(["get_player_b", "get_player_b"], 2, workers=1)
+
+
+def test_match_jobs_alternate_the_first_player():
+    jobs = tournament.match_jobs("a", "X", "b", "O", 4, 8)
+    assert [job[0] for job in jobs] == ["b", "a", "b", "a"]
+    assert all(job[1] == "O" for job in jobs if job[0] == "b")
+    # after an opening the side to move is fixed, so the symbols swap instead
+    jobs = tournament.match_jobs("a", "X", "b", "O", 2, 8, ((2, 3),))
+    assert [(job[0], job[1]) for job in jobs] == [("a", "O"), ("a", "X")]
+
+
+def test_standings_count_each_spec_on_both_colours():
+    jobs = tournament.pairing_jobs([("a", "b"), ("a", "c")], 2)
+    results = [("X", {"X": 1, "O": 2}), ("O", {"X": 1, "O": 2}), ("TIE", {"X": 1, "O": 2}), ("X", {"X": 1, "O": 2})]
+    table = tournament.standings(jobs, results)
+    # a plays X in every game here: b and c start the odd games as O
+    assert table["a"] == {"wins": 2, "losses": 1, "ties": 1, "time": 4}
+    assert table["b"] == {"wins": 1, "losses": 1, "ties": 0, "time": 4}
+    assert table["c"] == {"wins": 0, "losses": 1, "ties": 1, "time": 4}
+    assert sum(record["wins"] for record in table.values()) == 3
@@ -0,0 +1,57 @@
+import pytest
+
+from reversi import tournament
+from reversi import tournament_server
+
+
+def test_run_local_plays_every_game():
+    jobs = tournament.pairing_jobs([("ReallyGreatPlayer", "FantasticPlayerWow")], 2, 4)
+    results = tournament_server.run_local(jobs, processes=2)
+    # deterministic players, so the winners are the ones playing the games here gives
+    assert [winner for winner, _ in results] == [tournament.play_game(job)[0] for job in jobs]
+    assert all(set(times) == {"X", "O"} for _, times in results)
+
+
+def test_run_local_gives_up_on_a_failing_game(tmp_path):
+    jobs = tournament.pairing_jobs([("ReallyGreatPlayer", "FantasticPlayerWow")], 2, 4)
+    failing = ("ReallyGreatPlayer", "X", "FantasticPlayerWow", "O", 4, ((0, 0),))  # not a valid opening
+    log = str(tmp_path / "results.jsonl")
+    with pytest.raises(tournament_server.GameFailed) as failed:
+        tournament_server.run_local(jobs + [failing], processes=2, log_filename=log)
+    assert list(failed.value.failures) == [len(jobs)]
+    assert "invalid opening move" in failed.value.failures[len(jobs)]
+    # the games that could be played were logged, so a rerun only has the failing one left
+    coordinator = tournament_server.Coordinator(jobs + [failing], port=0, log_filename=log)
+    assert list(coordinator.pending) == [len(jobs)]
+    coordinator.server.server_close()
+
+
+def test_pairing_jobs_rejects_invalid_openings():
+    with pytest.raises(ValueError):
+        tournament.pairing_jobs([("ReallyGreatPlayer", "FantasticPlayerWow")], 2, 8, [[(2, 3)]])
+
+
+def test_expired_lease_belongs_to_the_new_holder():
+    jobs = tournament.pairing_jobs([("ReallyGreatPlayer", "FantasticPlayerWow")], 1, 4)
+    coordinator = tournament_server.Coordinator(jobs, port=0, lease=-1)  # every lease has run out
+    try:
+        first, second = object(), object()
+        assert coordinator.next_job(first)["id"] == 0
+        assert coordinator.next_job(second)["id"] == 0
+        # the first worker dropping or failing no longer touches the game
+        coordinator.release({0}, first)
+        coordinator.fail(0, "late error", first)
+        assert coordinator.leases[0][0] is second
+        assert coordinator.attempts == {} and not coordinator.pending
+        coordinator.release({0}, second)
+        assert coordinator.attempts == {0: 1} and list(coordinator.pending) == [0]
+    finally:
+        coordinator.server.server_close()
+
+
+def test_server_class_is_left_alone():
+    import socketserver
+    coordinator = tournament_server.Coordinator([], port=0)
+    coordinator.server.server_close()
+    assert coordinator.server.allow_reuse_address
+    assert not socketserver.ThreadingTCPServer.allow_reuse_address